@@ -0,0 +1,128 @@
+"""
+Replay a recorded workload against mcpserver.py with no network access.
+
+Record one first by running the server with APPSIGNALS_RECORD set, e.g.
+
+    APPSIGNALS_RECORD=workload.jsonl python client.py
+
+Then re-drive its tool calls, with AWS answered from the recording:
+
+    python bench_replay.py workload.jsonl --runs 5
+    python bench_replay.py workload.jsonl --aws-speed 0 --pace none
+
+The server is started with APPSIGNALS_REPLAY pointing at the recording.
+--aws-speed scales recorded AWS latency (0 answers at once); --pace original
+starts tool calls at their recorded offsets, so that concurrent calls overlap
+as they did, and --pace none sends them back to back.
+
+Each run starts a fresh server with no shared cache and an empty SLO store, so
+nothing carries over between runs. Within a run the server's in-process tool
+cache still applies, as it would in production: identical calls made at the
+same time are coalesced into one execution, and repeats within a tool's TTL are
+answered from memory. Such calls are measured as they would be served, not as
+separate trips to the recording.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+from collections import defaultdict
+from time import perf_counter
+from typing import Dict, List
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from src.recordreplay import tool_calls
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def replay_once(server: str, recording: str, aws_speed: float, pace: str) -> Dict[str, List[float]]:
+    """Start a replaying server, call each recorded tool and return the latencies per tool."""
+    calls = tool_calls(recording)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    with tempfile.TemporaryDirectory() as state_dir, open(os.devnull, "w") as devnull:
+        params = StdioServerParameters(
+            command=sys.executable,
+            args=[server],
+            cwd=HERE,
+            env={
+                **os.environ,
+                "MCP_TRANSPORT": "stdio",
+                "APPSIGNALS_REPLAY": os.path.abspath(recording),
+                "APPSIGNALS_REPLAY_SPEED": str(aws_speed),
+                "APPSIGNALS_RECORD": "",
+                # Every call should reach the player, not state left by another run:
+                # no shared cache, and SLO definitions and snapshots start empty
+                "APPSIGNALS_SHARED_CACHE": "",
+                "APPSIGNALS_SLO_STORE": os.path.join(state_dir, "slo.sqlite3"),
+                "APPSIGNALS_SPAN_RING": "",
+            },
+        )
+        async with stdio_client(params, errlog=devnull) as (reader, writer):
+            async with ClientSession(reader, writer) as session:
+                await session.initialize()
+
+                async def call(record: dict, start: float) -> None:
+                    if pace == "original":
+                        await asyncio.sleep(max(record["t"] - calls[0]["t"] - (perf_counter() - start), 0))
+                    sent = perf_counter()
+                    result = await session.call_tool(record["name"], record["arguments"])
+                    latencies[record["name"]].append(perf_counter() - sent)
+                    if result.isError:
+                        failures[record["name"]] += 1
+
+                start = perf_counter()
+                if pace == "original":
+                    await asyncio.gather(*(call(record, start) for record in calls))
+                else:
+                    for record in calls:
+                        await call(record, start)
+    for name, count in failures.items():
+        print(f"  {name}: {count} calls returned an error", file=sys.stderr)
+    return latencies
+
+
+def report(recording: str, latencies: Dict[str, List[float]]) -> None:
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    for record in tool_calls(recording):
+        recorded[record["name"]].append(record["duration_s"])
+    print(f"{'tool':40} {'calls':>6} {'recorded p50':>13} {'replay p50':>11} {'replay p95':>11}")
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        p95 = values[min(int(0.95 * len(values)), len(values) - 1)]
+        print(
+            f"{name:40} {len(values):6} {statistics.median(recorded[name]) * 1000:11.0f}ms "
+            f"{statistics.median(values) * 1000:9.0f}ms {p95 * 1000:9.0f}ms"
+        )
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    if not tool_calls(args.recording):
+        sys.exit(f"{args.recording} has no tool calls")
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    for i in range(args.runs):
+        start = perf_counter()
+        run = await replay_once(args.server, args.recording, args.aws_speed, args.pace)
+        print(f"run {i + 1}: {sum(len(v) for v in run.values())} tool calls in {perf_counter() - start:.2f}s")
+        for name, values in run.items():
+            latencies[name].extend(values)
+    report(args.recording, latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="JSON lines file written with APPSIGNALS_RECORD")
+    parser.add_argument("--server", default="mcpserver.py")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--aws-speed", type=float, default=1.0, help="Recorded AWS latency divisor; 0 for none")
+    parser.add_argument("--pace", choices=("original", "none"), default="original")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure server cold start: the time from spawning mcpserver.py over stdio
+until the first tools/list response arrives.
+
+    python bench_startup.py --runs 10
+    python bench_startup.py --import-profile --top 25
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def time_to_first_tools_list(server: str) -> dict:
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[server],
+        cwd=HERE,
+        env={**os.environ, "MCP_TRANSPORT": "stdio"},
+    )
+    start = perf_counter()
+    # The server writes its spans to stderr; keep them out of the report
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (reader, writer):
+            async with ClientSession(reader, writer) as session:
+                await session.initialize()
+                initialized = perf_counter()
+                tools = await session.list_tools()
+                listed = perf_counter()
+    return {
+        "initialize": initialized - start,
+        "tools_list": listed - start,
+        "tools": len(tools.tools),
+    }
+
+
+async def run_benchmark(server: str, runs: int) -> None:
+    results = []
+    for i in range(runs):
+        result = await time_to_first_tools_list(server)
+        results.append(result)
+        print(
+            f"run {i + 1}: initialize {result['initialize'] * 1000:.0f}ms, "
+            f"first tools/list {result['tools_list'] * 1000:.0f}ms ({result['tools']} tools)"
+        )
+
+    for key in ("initialize", "tools_list"):
+        values = sorted(r[key] * 1000 for r in results)
+        print(
+            f"{key}: min {values[0]:.0f}ms, median {statistics.median(values):.0f}ms, "
+            f"max {values[-1]:.0f}ms over {runs} runs"
+        )
+
+
+def import_profile(module: str, top: int) -> None:
+    """Report the slowest imports of a module, as measured by ``python -X importtime``."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    if not rows:
+        print(completed.stderr, file=sys.stderr)
+        sys.exit(f"Could not import {module}")
+
+    total = max(cumulative for cumulative, _, _ in rows)
+    print(f"Importing {module} took {total / 1000:.0f}ms; slowest imports (cumulative, self):")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:8.1f}ms {self_us / 1000:8.1f}ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", default="mcpserver.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-profile", action="store_true", help="Report import times instead of timing the server")
+    parser.add_argument("--module", default="mcpserver", help="Module to profile with --import-profile")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.import_profile:
+        import_profile(args.module, args.top)
+    else:
+        asyncio.run(run_benchmark(args.server, args.runs))
+
+
+if __name__ == "__main__":
+    main()
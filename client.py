@@ -3,25 +3,16 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.mcpinstrumentor import MCPInstrumentor
 MCPInstrumentor().instrument()
+import argparse
 import asyncio
-import os
-from contextlib import AsyncExitStack
+import json
 from opentelemetry import trace
 from opentelemetry.sdk import trace as trace_sdk
 from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from mcp.types import (
-    ClientRequest,
-    ClientNotification,
-    ClientResult,
-    InitializedNotification,
-    ListToolsRequest,
-    ListToolsResult,
-    CallToolRequest
-)
+from src.mcpclient import MCPClient, stdio_transport
+
 
-async def main():
+async def main(args: argparse.Namespace):
     # Set up OpenTelemetry tracer
     console_exporter = ConsoleSpanExporter()
     tracer_provider = trace_sdk.TracerProvider(sampler=trace_sdk.sampling.ALWAYS_ON)
@@ -29,66 +20,46 @@ async def main():
     trace.set_tracer_provider(tracer_provider)
     tracer = trace.get_tracer("testclient")
 
-    # Connect to the server and manage session
-    async with AsyncExitStack() as exit_stack:
-        server_params = StdioServerParameters(
-            command="python",
-            args=["mcpserver.py"],
-            env={
-                **os.environ,
-                "MCP_TRANSPORT": "stdio",
-                "OTEL_TRACES_EXPORTER": "console",
-                "OTEL_LOG_LEVEL": "debug"
-            }
-        )
-        reader, writer = await exit_stack.enter_async_context(stdio_client(server_params))
-
-        # Open a client span to cover the whole session
+    transport = stdio_transport(
+        ["mcpserver.py"], env={"OTEL_TRACES_EXPORTER": "console", "OTEL_LOG_LEVEL": "debug"}
+    )
+    async with MCPClient(transport, sessions=args.sessions, max_in_flight=args.max_in_flight) as client:
+        # Open a client span to cover the whole session; each tool call is its child
         with tracer.start_as_current_span("client.session", kind=trace.SpanKind.CLIENT) as span:
             span.set_attribute("client_side", True)
-            span.set_attribute("tool_name", "list_application_signals_services")
+            span.set_attribute("tool_name", args.tool)
 
-            session = await exit_stack.enter_async_context(ClientSession(reader, writer))
+            tools = await client.list_tools()
+            print("Tools available:", [tool.name for tool in tools])
 
-            await session.send_notification(
-                ClientNotification(
-                    InitializedNotification(method="notifications/initialized")
-                )
-            )
+            span.add_event("Sending tool call requests")
+            results = await client.call_many([(args.tool, json.loads(args.arguments))] * args.calls)
+            span.add_event("Received tool call responses")
 
-            # List tools
-            tools_result = await session.send_request(
-                ClientRequest(
-                    root=ListToolsRequest(method="tools/list")
-                ),
-                ListToolsResult,
-            )
-            print("Tools available:", [tool.name for tool in tools_result.tools])
-
-            # Call the tool while span is active
-            span.add_event("Sending tool call request")
-            response = await session.send_request(
-                ClientRequest(
-                    root=CallToolRequest(
-                        method="tools/call",
-                        params={
-                            "name": "list_application_signals_services",
-                            "arguments": {}
-                        }
-                   )
-                ),
-                ClientResult,
-            )
-            span.add_event("Received tool call response")
-
-    # Print tool result
+    # Print the first tool result
     print("\nTool execution result:")
-    if hasattr(response.root, 'content') and response.root.content:
-        for item in response.root.content:
-            if item.get('type') == 'text':
-                print(item.get('text', ''))
+    response = results[0]
+    if isinstance(response, Exception):
+        print(f"Tool call failed: {response}")
+    elif response.content:
+        for item in response.content:
+            if item.type == "text":
+                print(item.text)
     else:
         print("No content found in response")
 
+    print("\nLatency per tool:")
+    for row in client.stats():
+        print(
+            f"{row['tool']}: {row['calls']} calls, {row['errors']} errors, "
+            f"p50 {row['p50_ms']:.0f}ms, p95 {row['p95_ms']:.0f}ms, max {row['max_ms']:.0f}ms"
+        )
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Call a tool of mcpserver.py over pooled stdio sessions")
+    parser.add_argument("--tool", default="list_application_signals_services")
+    parser.add_argument("--arguments", default="{}", help="Tool arguments as JSON")
+    parser.add_argument("--calls", type=int, default=1, help="Concurrent calls to make")
+    parser.add_argument("--sessions", type=int, default=1, help="Server processes to spread the calls over")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="Calls in flight per session")
+    asyncio.run(main(parser.parse_args()))
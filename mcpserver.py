@@ -2,16 +2,53 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src import recordreplay
+# Record tool calls and AWS responses, or answer AWS calls from a recording
+# (see bench_replay.py). Installed first so AWS call spans cover replayed calls.
+recordreplay.configure_from_env()
 from src.mcpinstrumentor import MCPInstrumentor
-MCPInstrumentor().instrument()
+# Per-session limits: how many tool calls one session may run at once, and how
+# many more may wait for a slot before being rejected. Unset means unbounded.
+MCPInstrumentor().instrument(
+    session_queue_size=int(os.environ["MCP_SESSION_QUEUE_SIZE"]) if os.environ.get("MCP_SESSION_QUEUE_SIZE") else None,
+    max_concurrent_tool_calls=(
+        int(os.environ["MCP_MAX_CONCURRENT_TOOL_CALLS"]) if os.environ.get("MCP_MAX_CONCURRENT_TOOL_CALLS") else None
+    ),
+    # Opt-in stack sampling of slow tool calls (and of a random fraction of calls)
+    profile_threshold=(
+        int(os.environ["MCP_PROFILE_THRESHOLD_MS"]) / 1000 if os.environ.get("MCP_PROFILE_THRESHOLD_MS") else None
+    ),
+    profile_sample_rate=float(os.environ.get("MCP_PROFILE_SAMPLE_RATE", "0")),
+    profile_file=os.environ.get("MCP_PROFILE_FILE") or None,
+    # Message size counters re-serialize every message; off unless asked for
+    record_message_size=os.environ.get("MCP_RECORD_MESSAGE_SIZE") != "0",
+)
+from src import deadlines, sharedcache
+from src.awsclients import (
+    Target,
+    caller_account,
+    caller_identity,
+    fan_out,
+    format_fan_out_summary,
+    get_client,
+    parse_targets,
+    prewarm,
+)
+from src.querycache import QueryResultCache, snap_range
+from src.servicemap import ServiceMap
+from src.slostore import budget_consumed, budget_remaining_fraction, burn_rate, interval_hours, slo_store
+from src.snapshot import BackgroundRefresher
+from src.toolcache import cached_tool
 import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+import math
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from time import perf_counter as timer
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
-import boto3
 from botocore.exceptions import ClientError
 
 
@@ -24,35 +61,206 @@ from mcp.server.fastmcp import FastMCP
 import sys
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from src.ringexporter import DEFAULT_PATH as DEFAULT_SPAN_RING_PATH
+from src.ringexporter import DEFAULT_SLOTS as DEFAULT_SPAN_RING_SLOTS
+from src.ringexporter import RingBufferReader, RingBufferSpanExporter, tool_call_stats
 
 # Send spans to stderr instead of stdout (default)
 exporter = ConsoleSpanExporter(out=sys.stderr)
 
-trace.set_tracer_provider(TracerProvider())
-trace.get_tracer_provider().add_span_processor(
+# Configure the provider before installing it; HTTP worker processes import this
+# module twice, and only the first provider is kept.
+tracer_provider = TracerProvider()
+tracer_provider.add_span_processor(
     SimpleSpanProcessor(exporter)
 )
 
+# Optionally keep the most recent spans in a memory-mapped ring buffer file, so
+# that get_recent_tool_calls can look at this server's own traces. Off unless a
+# path is set ("1" for the default path). Spans are written from the batch
+# processor's thread, so the file lock is never taken on the event loop.
+SPAN_RING_PATH = os.environ.get("APPSIGNALS_SPAN_RING", "")
+if SPAN_RING_PATH == "1":
+    SPAN_RING_PATH = DEFAULT_SPAN_RING_PATH
+SPAN_RING_SLOTS = int(os.environ.get("APPSIGNALS_SPAN_RING_SLOTS", str(DEFAULT_SPAN_RING_SLOTS)))
+if SPAN_RING_PATH:
+    tracer_provider.add_span_processor(
+        BatchSpanProcessor(RingBufferSpanExporter(SPAN_RING_PATH, SPAN_RING_SLOTS), schedule_delay_millis=1000)
+    )
+trace.set_tracer_provider(tracer_provider)
+
+# Optional background refresh of the service list and SLI status, so that
+# get_sli_status can answer from a warm snapshot. Disabled unless an interval is set.
+SLI_REFRESH_SECONDS = int(os.environ.get("APPSIGNALS_SLI_REFRESH_SECONDS", "0"))
+SLI_REFRESH_HOURS = int(os.environ.get("APPSIGNALS_SLI_REFRESH_HOURS", "24"))
+sli_refresher = (
+    BackgroundRefresher("sli_status", lambda: asyncio.to_thread(collect_sli_status, SLI_REFRESH_HOURS), SLI_REFRESH_SECONDS)
+    if SLI_REFRESH_SECONDS > 0
+    else None
+)
+
+
+# The service dependency map is refreshed incrementally when a query finds it
+# older than this, and in the background if an interval is set.
+SERVICE_MAP_MAX_AGE = int(os.environ.get("APPSIGNALS_SERVICE_MAP_MAX_AGE", "300"))
+SERVICE_MAP_REFRESH_SECONDS = int(os.environ.get("APPSIGNALS_SERVICE_MAP_REFRESH_SECONDS", "0"))
+_service_map: Optional[ServiceMap] = None
+
+
+def refresh_service_map() -> ServiceMap:
+    """Create the service map on first use and fetch what changed since its last refresh. Runs synchronously."""
+    global _service_map
+    if _service_map is None:
+        _service_map = ServiceMap(
+            get_client("application-signals"),
+            get_client("xray"),
+            lambda start_time, end_time: list_services(Target(), start_time, end_time),
+        )
+    _service_map.refresh()
+    return _service_map
+
+
+service_map_refresher = BackgroundRefresher(
+    "service_map", lambda: asyncio.to_thread(refresh_service_map), SERVICE_MAP_REFRESH_SECONDS
+)
+
+# Services and their details are shared between server processes for this long
+SHARED_CATALOG_TTL = int(os.environ.get("APPSIGNALS_SHARED_CACHE_CATALOG_TTL", "300"))
+# Metric query results are shared for this long; their time ranges are cut to whole
+# minutes so that sessions asking within the same minute make the same query
+SHARED_METRICS_TTL = 60
+
+# run_transaction_search widens time ranges to multiples of this many seconds so that
+# re-runs with slightly shifted ranges share a cached result; results for ranges that
+# reach into the last few minutes are kept for the short TTL, older ones for the long one
+QUERY_SNAP_SECONDS = int(os.environ.get("APPSIGNALS_QUERY_SNAP_SECONDS", "60"))
+QUERY_CACHE_OPEN_TTL = int(os.environ.get("APPSIGNALS_QUERY_CACHE_OPEN_TTL", "60"))
+QUERY_CACHE_CLOSED_TTL = int(os.environ.get("APPSIGNALS_QUERY_CACHE_CLOSED_TTL", "86400"))
+_query_cache: Optional[QueryResultCache] = None
+
+
+def query_cache() -> Optional[QueryResultCache]:
+    """The Logs Insights result cache, or None if the shared cache is disabled."""
+    global _query_cache
+    if _query_cache is None:
+        cache = sharedcache.shared_cache()
+        if cache is not None:
+            _query_cache = QueryResultCache(cache, QUERY_CACHE_OPEN_TTL, QUERY_CACHE_CLOSED_TTL)
+    return _query_cache
+
+# How long an SLO definition in the local SLO store is used before it is fetched again
+SLO_DEFINITION_TTL = int(os.environ.get("APPSIGNALS_SLO_DEFINITION_TTL", "3600"))
+
+# Create the AWS clients in the background once the server is up, rather than
+# on the first tool call. Off by default: clients are created on first use.
+PREWARM_CLIENTS = os.environ.get("APPSIGNALS_PREWARM_CLIENTS", "0") == "1"
+
+
+@asynccontextmanager
+async def server_lifespan(server):
+    """Start background refreshers; they outlive individual sessions."""
+    if PREWARM_CLIENTS:
+        prewarm(["application-signals", "cloudwatch", "logs", "xray"])
+    if sli_refresher is not None:
+        sli_refresher.ensure_started()
+    if SERVICE_MAP_REFRESH_SECONDS > 0:
+        service_map_refresher.ensure_started()
+    yield {}
+
+
 # Initialize FastMCP server
-mcp = FastMCP("appsignals")
+mcp = FastMCP("appsignals", lifespan=server_lifespan)
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
-# Initialize AWS clients
-logs_client = boto3.client("logs", region_name="us-east-1")
-
-
 def remove_null_values(data: dict) -> dict:
     """Remove keys with None values from a dictionary."""
     return {k: v for k, v in data.items() if v is not None}
 
 
+def window_minutes(start_time, end_time) -> int:
+    """Length of a time range given as datetimes or Unix timestamps, in whole minutes."""
+    if isinstance(start_time, datetime):
+        return round((end_time - start_time).total_seconds() / 60)
+    return round((end_time - start_time) / 60)
+
+
+def shared(target: Target, namespace: str, ttl: float, compute, **params):
+    """``compute()`` through the shared cache, keyed by ``params`` and the identity and
+    region the target is queried as, so that processes running under other credentials
+    never read each other's entries. Runs synchronously.
+    """
+    if sharedcache.shared_cache() is None:
+        return compute()
+    key = sharedcache.cache_key(namespace, identity=caller_identity(target.account), region=target.region, **params)
+    return sharedcache.cached(key, ttl, compute)
+
+
+def list_services(target: Target, start_time, end_time) -> list:
+    """List the Application Signals services of one region/account, following every page.
+
+    The list is shared with other server processes through the shared cache for
+    SHARED_CATALOG_TTL seconds, keyed by the length of the time range.
+    """
+
+    def fetch() -> list:
+        appsignals = get_client("application-signals", target.region, target.account)
+        services = []
+        kwargs = {"StartTime": start_time, "EndTime": end_time, "MaxResults": 100}
+        while True:
+            response = appsignals.list_services(**kwargs)
+            services.extend(response.get("ServiceSummaries", []))
+            if not response.get("NextToken"):
+                return services
+            deadlines.checkpoint()
+            kwargs["NextToken"] = response["NextToken"]
+
+    return shared(target, "list_services", SHARED_CATALOG_TTL, fetch, minutes=window_minutes(start_time, end_time))
+
+
+def get_service(target: Target, key_attributes: dict, start_time, end_time) -> dict:
+    """Fetch a service's details, shared with other server processes like list_services."""
+
+    def fetch() -> dict:
+        appsignals = get_client("application-signals", target.region, target.account)
+        return appsignals.get_service(StartTime=start_time, EndTime=end_time, KeyAttributes=key_attributes)["Service"]
+
+    return shared(
+        target,
+        "get_service",
+        SHARED_CATALOG_TTL,
+        fetch,
+        minutes=window_minutes(start_time, end_time),
+        key_attributes=key_attributes,
+    )
+
+
+def find_service(services: list, service_name: str) -> Optional[dict]:
+    """Find the service summary with a matching name."""
+    for service in services:
+        key_attrs = service.get("KeyAttributes", {})
+        if key_attrs.get("Name") == service_name:
+            return service
+    return None
+
+
+def is_cacheable_result(result) -> bool:
+    """Only successful tool output is cached; error messages are always recomputed."""
+    if isinstance(result, str):
+        return not result.startswith(("AWS Error:", "Error")) and not result.startswith('{\n  "error"')
+    return True
+
+
+def is_cacheable_sli_status(result) -> bool:
+    """SLI reports read from the background snapshot are not cached, so their stated age stays current."""
+    return is_cacheable_result(result) and not result.startswith("Snapshot v")
 
 
 @mcp.tool()
-async def list_application_signals_services() -> str:
+@cached_tool(ttl=60, cache_if=is_cacheable_result)
+async def list_application_signals_services(regions: str = "", accounts: str = "") -> str:
     """List all services monitored by AWS Application Signals.
 
     Use this tool to:
@@ -66,21 +274,36 @@ async def list_application_signals_services() -> str:
     - Key attributes (Environment, Platform, etc.)
     - Total count of services
 
-    This is typically the first tool to use when starting monitoring or investigation."""
+    This is typically the first tool to use when starting monitoring or investigation.
+
+    Args:
+        regions: Comma-separated AWS regions to query concurrently (default: us-east-1)
+        accounts: Comma-separated account ids or role ARNs to query through an assumed role
+    """
     logger.info("Listing Application Signals services")
     try:
-        appsignals = boto3.client("application-signals", region_name="us-east-1")
-
         # Calculate time range (last 24 hours)
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=24)
+        summary = ""
 
-        # Get all services
-        response = appsignals.list_services(StartTime=start_time, EndTime=end_time, MaxResults=100)
-        services = response.get("ServiceSummaries", [])
+        if regions or accounts:
+            results = await fan_out(
+                parse_targets(regions, accounts), lambda target: list_services(target, start_time, end_time)
+            )
+            # Tag each service with the region/account it came from
+            services = [dict(service, Origin=r.target.label) for r in results if r.error is None for service in r.value]
+            summary = format_fan_out_summary(results)
+        elif sli_refresher is not None and SLI_REFRESH_HOURS == 24:
+            # The background refresher lists services over its own look-back window;
+            # its list can stand in for this one only when that window is the same 24 hours.
+            services = (await sli_refresher.get()).value["services"]
+        else:
+            services = await asyncio.to_thread(list_services, Target(), start_time, end_time)
 
         if not services:
-            return "No services found in Application Signals."
+            result = "No services found in Application Signals."
+            return f"{result}\n\n{summary}" if summary else result
 
         result = f"Application Signals Services ({len(services)} total):\n\n"
 
@@ -92,6 +315,8 @@ async def list_application_signals_services() -> str:
 
             result += f"• Service: {service_name}\n"
             result += f"  Type: {service_type}\n"
+            if "Origin" in service:
+                result += f"  Origin: {service['Origin']}\n"
 
             # Add key attributes
             if key_attrs:
@@ -101,7 +326,7 @@ async def list_application_signals_services() -> str:
 
             result += "\n"
 
-        return result
+        return result + summary
 
     except ClientError as e:
         return f"AWS Error: {e.response['Error']['Message']}"
@@ -109,8 +334,195 @@ async def list_application_signals_services() -> str:
         return f"Error: {str(e)}"
 
 
+# How long get_service_details(enrich=True) waits for metric values and SLOs
+ENRICH_BUDGET_SECONDS = float(os.environ.get("APPSIGNALS_ENRICH_BUDGET_SECONDS", "5"))
+# SLOs listed by get_service_details(enrich=True); breached ones come first
+ENRICH_MAX_SLOS = 20
+# How far back get_service_details(enrich=True) looks for the latest metric datapoint
+LATEST_METRIC_LOOKBACK = timedelta(minutes=30)
+
+
+def metric_data_query(query_id: str, metric: dict, stat: str, period: int) -> dict:
+    """A GetMetricData query for an Application Signals metric reference."""
+    return {
+        "Id": query_id,
+        "MetricStat": {
+            "Metric": {
+                "Namespace": metric.get("Namespace", ""),
+                "MetricName": metric.get("MetricName", ""),
+                "Dimensions": metric.get("Dimensions", []),
+            },
+            "Period": period,
+            "Stat": stat,
+        },
+        "ReturnData": True,
+    }
+
+
+def get_metric_data_batched(
+    cloudwatch,
+    queries: list,
+    start_time: datetime,
+    end_time: datetime,
+    scan_by: str = "TimestampAscending",
+    cache_scope: Optional[Target] = None,
+) -> Tuple[Dict[str, dict], int]:
+    """Run any number of GetMetricData queries, 500 per call, following every page. Runs synchronously.
+
+    With a cache_scope (the target the client queries), the time range is cut to
+    whole minutes and the results are shared with other server processes for SHARED_METRICS_TTL.
+
+    Returns:
+        The timestamps and values of each query by its Id, and the number of API calls made
+    """
+    if cache_scope is not None:
+        start_time = start_time.replace(second=0, microsecond=0)
+        end_time = end_time.replace(second=0, microsecond=0)
+        calls = 0
+
+        def fetch() -> Dict[str, dict]:
+            nonlocal calls
+            results, calls = get_metric_data_batched(cloudwatch, queries, start_time, end_time, scan_by)
+            return results
+
+        results = shared(
+            cache_scope,
+            "get_metric_data",
+            SHARED_METRICS_TTL,
+            fetch,
+            queries=queries,
+            start=start_time,
+            end=end_time,
+            scan_by=scan_by,
+        )
+        return results, calls
+
+    results: Dict[str, dict] = {}
+    calls = 0
+    # GetMetricData accepts at most 500 queries per call
+    for i in range(0, len(queries), 500):
+        kwargs = {
+            "MetricDataQueries": queries[i : i + 500],
+            "StartTime": start_time,
+            "EndTime": end_time,
+            "ScanBy": scan_by,
+        }
+        while True:
+            deadlines.checkpoint()
+            response = cloudwatch.get_metric_data(**kwargs)
+            calls += 1
+            for data in response.get("MetricDataResults", []):
+                merged = results.setdefault(data["Id"], {"Timestamps": [], "Values": []})
+                merged["Timestamps"].extend(data.get("Timestamps", []))
+                merged["Values"].extend(data.get("Values", []))
+            next_token = response.get("NextToken")
+            if not next_token:
+                break
+            kwargs["NextToken"] = next_token
+    return results, calls
+
+
+def latest_metric_values(cloudwatch, metric_refs: list, end_time: datetime, cache_scope: Optional[Target] = None) -> list:
+    """Fetch the latest datapoint of each referenced metric with batched GetMetricData calls.
+
+    Latency metrics are read as p99, others as averages. Runs synchronously.
+    cache_scope is passed on to get_metric_data_batched.
+
+    Returns:
+        One (statistic, timestamp, value) tuple per metric reference, or None if it has no recent data
+    """
+    queries = [
+        metric_data_query(f"m{i}", metric, "p99" if metric.get("MetricType", "").upper() == "LATENCY" else "Average", 300)
+        for i, metric in enumerate(metric_refs)
+    ]
+    results, _ = get_metric_data_batched(
+        cloudwatch,
+        queries,
+        end_time - LATEST_METRIC_LOOKBACK,
+        end_time,
+        scan_by="TimestampDescending",
+        cache_scope=cache_scope,
+    )
+    latest = []
+    for query in queries:
+        data = results.get(query["Id"])
+        if data and data["Values"]:
+            latest.append((query["MetricStat"]["Stat"], data["Timestamps"][0], data["Values"][0]))
+        else:
+            latest.append(None)
+    return latest
+
+
+async def fetch_service_enrichment(service: dict, end_time: datetime) -> Tuple[object, object]:
+    """Fetch a service's latest metric values and SLO budget reports concurrently.
+
+    Both are given ENRICH_BUDGET_SECONDS; one that fails or does not finish in time is
+    returned as an "unavailable (...)" message instead, and its worker thread stops at its
+    next checkpoint.
+
+    Returns:
+        The latest_metric_values list or a message, and the budget reports or a message
+    """
+    cloudwatch = get_client("cloudwatch")
+    appsignals = get_client("application-signals")
+    # Tasks copy the context, so their threads see the budget as the request's deadline
+    with deadlines.deadline(ENRICH_BUDGET_SECONDS):
+        metrics_task = asyncio.ensure_future(
+            asyncio.to_thread(
+                latest_metric_values, cloudwatch, service.get("MetricReferences", []), end_time, Target()
+            )
+        )
+        slos_task = asyncio.ensure_future(
+            asyncio.to_thread(service_budget_reports, appsignals, service["KeyAttributes"], end_time)
+        )
+    await asyncio.wait([metrics_task, slos_task], timeout=ENRICH_BUDGET_SECONDS)
+
+    def outcome(task):
+        if not task.done():
+            task.cancel()
+            return f"unavailable (not fetched within the {ENRICH_BUDGET_SECONDS:g}s budget)"
+        error = task.exception()
+        if isinstance(error, ClientError):
+            return f"unavailable (AWS Error: {error.response['Error']['Message']})"
+        if isinstance(error, deadlines.DeadlineExceeded):
+            return f"unavailable (not fetched within the {ENRICH_BUDGET_SECONDS:g}s budget)"
+        if error is not None:
+            return f"unavailable (Error: {str(error)})"
+        return task.result()
+
+    slos = outcome(slos_task)
+    return outcome(metrics_task), slos if isinstance(slos, str) else slos[1]
+
+
+def format_slo_reports(budget_reports: list) -> str:
+    """Render budget reports as one line per SLO, breached first, at most ENRICH_MAX_SLOS."""
+    order = {"BREACHED": 0, "WARNING": 1, "OK": 2}
+    reports = sorted(budget_reports, key=lambda r: order.get(r.get("BudgetStatus"), 3))
+    result = ""
+    for report in reports[:ENRICH_MAX_SLOS]:
+        result += f"  • {report.get('Name', report.get('Arn', 'Unknown'))}: {report.get('BudgetStatus', 'UNKNOWN')}"
+        if report.get("Attainment") is not None:
+            result += f", attainment {report['Attainment']:.3f}%"
+        goal = report.get("Goal", {}).get("AttainmentGoal")
+        if goal is not None:
+            result += f" (goal {goal}%)"
+        remaining = budget_remaining_fraction(report)
+        if remaining is not None:
+            result += f", {remaining:.0%} of budget left"
+        result += "\n"
+    if len(reports) > ENRICH_MAX_SLOS:
+        result += f"  ... and {len(reports) - ENRICH_MAX_SLOS} more (see get_sli_status)\n"
+    return result
+
+
+def is_cacheable_service_details(result) -> bool:
+    """Service details are cached unless enrichment ran out of time or failed."""
+    return is_cacheable_result(result) and "unavailable (" not in result
+
+
 @mcp.tool()
-async def get_service_details(service_name: str) -> str:
+@cached_tool(ttl=120, cache_if=is_cacheable_service_details)
+async def get_service_details(service_name: str, enrich: bool = False) -> str:
     """Get detailed information about a specific Application Signals service.
 
     Use this tool when you need to:
@@ -128,36 +540,38 @@ async def get_service_details(service_name: str) -> str:
     This tool is essential before querying specific metrics, as it shows
     which metrics are available for the service.
 
+    With enrich=True it also returns the latest value of every referenced metric
+    (p99 for latency, average otherwise) and the budget status of the service's SLOs,
+    fetched concurrently in one call. This usually replaces a get_service_metrics call
+    per metric plus get_service_level_objective calls. Anything not fetched within a few seconds is left out
+    and says so.
+
     Args:
         service_name: Name of the service to get details for (case-sensitive)
+        enrich: Also fetch current metric values and SLO status (default False)
     """
     try:
-        appsignals = boto3.client("application-signals", region_name="us-east-1")
-
         # Calculate time range (last 24 hours)
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=24)
 
         # First, get all services to find the one we want
-        services_response = appsignals.list_services(StartTime=start_time, EndTime=end_time, MaxResults=100)
-
-        # Find the service with matching name
-        target_service = None
-        for service in services_response.get("ServiceSummaries", []):
-            key_attrs = service.get("KeyAttributes", {})
-            if key_attrs.get("Name") == service_name:
-                target_service = service
-                break
+        # Worker threads, since a shared cache miss may wait on another process's fetch
+        services = await asyncio.to_thread(list_services, Target(), start_time, end_time)
+        target_service = find_service(services, service_name)
 
         if not target_service:
             return f"Service '{service_name}' not found in Application Signals."
 
         # Get detailed service information
-        service_response = appsignals.get_service(
-            StartTime=start_time, EndTime=end_time, KeyAttributes=target_service["KeyAttributes"]
+        service_details = await asyncio.to_thread(
+            get_service, Target(), target_service["KeyAttributes"], start_time, end_time
         )
 
-        service_details = service_response["Service"]
+        latest_values = None
+        slo_reports = None
+        if enrich:
+            latest_values, slo_reports = await fetch_service_enrichment(service_details, end_time)
 
         # Build detailed response
         result = f"Service Details: {service_name}\n\n"
@@ -183,9 +597,17 @@ async def get_service_details(service_name: str) -> str:
         metric_refs = service_details.get("MetricReferences", [])
         if metric_refs:
             result += f"Metric References ({len(metric_refs)} total):\n"
-            for metric in metric_refs:
+            if isinstance(latest_values, str):
+                result += f"  Latest values {latest_values}\n"
+            for i, metric in enumerate(metric_refs):
                 result += f"  • {metric.get('Namespace', '')}/{metric.get('MetricName', '')}\n"
                 result += f"    Type: {metric.get('MetricType', '')}\n"
+                if isinstance(latest_values, list):
+                    if latest_values[i] is None:
+                        result += "    Latest: no data in the last 30 minutes\n"
+                    else:
+                        stat, timestamp, value = latest_values[i]
+                        result += f"    Latest ({stat}, {timestamp.strftime('%H:%M')} UTC): {value:.4g}\n"
                 dimensions = metric.get("Dimensions", [])
                 if dimensions:
                     result += "    Dimensions: "
@@ -202,6 +624,12 @@ async def get_service_details(service_name: str) -> str:
                 result += f"  • {log_group}\n"
             result += "\n"
 
+        if isinstance(slo_reports, str):
+            result += f"Service Level Objectives: {slo_reports}\n"
+        elif slo_reports is not None:
+            result += f"Service Level Objectives ({len(slo_reports)} total):\n"
+            result += format_slo_reports(slo_reports) if slo_reports else "  None defined\n"
+
         return result
 
     except ClientError as e:
@@ -210,9 +638,177 @@ async def get_service_details(service_name: str) -> str:
         return f"Error: {str(e)}"
 
 
+# GetMetricStatistics returns at most this many datapoints per call
+MAX_METRIC_DATAPOINTS = 1440
+# Spikes listed per statistic, largest first
+MAX_LISTED_SPIKES = 5
+
+
+def datapoint_value(datapoint: dict, stat: str) -> Optional[float]:
+    """A statistic of a GetMetricStatistics datapoint; extended statistics (p99, ...) are nested."""
+    value = datapoint.get(stat)
+    return value if value is not None else datapoint.get("ExtendedStatistics", {}).get(stat)
+
+
+def service_metrics_report(
+    target: Target, service_name: str, metric_name: str, statistic: str, extended_statistic: str, hours: int
+) -> str:
+    """Build the get_service_metrics report for one region/account. Runs synchronously."""
+    cloudwatch = get_client("cloudwatch", target.region, target.account)
+
+    # Calculate time range
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(hours=hours)
+
+    # Get service details to find metrics
+    target_service = find_service(list_services(target, start_time, end_time), service_name)
+
+    if not target_service:
+        return f"Service '{service_name}' not found in Application Signals."
+
+    # Get detailed service info for metric references
+    metric_refs = get_service(target, target_service["KeyAttributes"], start_time, end_time).get("MetricReferences", [])
+
+    if not metric_refs:
+        return f"No metrics found for service '{service_name}'."
+
+    # If no specific metric requested, show available metrics
+    if not metric_name:
+        result = f"Available metrics for service '{service_name}':\n\n"
+        for metric in metric_refs:
+            result += f"• {metric.get('MetricName', 'Unknown')}\n"
+            result += f"  Namespace: {metric.get('Namespace', 'Unknown')}\n"
+            result += f"  Type: {metric.get('MetricType', 'Unknown')}\n"
+            result += "\n"
+        return result
+
+    # Find the specific metric
+    target_metric = None
+    for metric in metric_refs:
+        if metric.get("MetricName") == metric_name:
+            target_metric = metric
+            break
+
+    if not target_metric:
+        available = [m.get("MetricName", "Unknown") for m in metric_refs]
+        return f"Metric '{metric_name}' not found for service '{service_name}'. Available: {', '.join(available)}"
+
+    # The finest whole-minute period that fits the window in one response;
+    # the summary below keeps the output bounded however many points there are
+    period = max(60, math.ceil(hours * 3600 / MAX_METRIC_DATAPOINTS / 60) * 60)
+
+    # Get both standard and extended statistics in a single call, over whole
+    # minutes so that other server processes can share the result
+    params = {
+        "Namespace": target_metric["Namespace"],
+        "MetricName": target_metric["MetricName"],
+        "Dimensions": target_metric.get("Dimensions", []),
+        "StartTime": start_time.replace(second=0, microsecond=0),
+        "EndTime": end_time.replace(second=0, microsecond=0),
+        "Period": period,
+        "Statistics": [statistic],
+        "ExtendedStatistics": [extended_statistic],
+    }
+    response = shared(
+        target, "get_metric_statistics", SHARED_METRICS_TTL, lambda: cloudwatch.get_metric_statistics(**params), **params
+    )
+
+    datapoints = response.get("Datapoints", [])
+
+    if not datapoints:
+        return f"No data points found for metric '{metric_name}' on service '{service_name}' in the last {hours} hour(s)."
+
+    # Sort by timestamp
+    datapoints.sort(key=lambda x: x["Timestamp"])
+
+    # Build response
+    result = f"Metrics for {service_name} - {metric_name}\n"
+    result += f"Time Range: Last {hours} hour(s)\n"
+    result += f"Period: {period} seconds\n\n"
+
+    # numpy is only imported once metrics are first summarized, to keep start-up fast
+    import numpy as np
+
+    from src.seriesstats import DEFAULT_POINT_BUDGET, PERCENTILES, change_points, lttb, spikes, summarize
+
+    unit = datapoints[-1].get("Unit", "")
+    times = np.array([dp["Timestamp"].timestamp() for dp in datapoints])
+    series = {}
+    for stat in (statistic, extended_statistic):
+        values = np.array([datapoint_value(dp, stat) for dp in datapoints], dtype=float)
+        present = np.isfinite(values)
+        if present.any():
+            series[stat] = (times[present], values[present])
+
+    result += "Summary:\n"
+    for stat, (_, values) in series.items():
+        summary = summarize(values)
+        result += f"{stat} Statistics:\n"
+        result += f"• Latest: {summary['latest']:.2f}\n"
+        result += f"• Average: {summary['mean']:.2f}\n"
+        result += f"• Maximum: {summary['max']:.2f}\n"
+        result += f"• Minimum: {summary['min']:.2f}\n"
+        result += f"• Percentiles over the window: " + ", ".join(
+            f"p{q} {summary[f'p{q}']:.2f}" for q in PERCENTILES
+        ) + "\n\n"
+
+    result += f"• Data Points: {len(datapoints)}\n\n"
+
+    def at(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%m/%d %H:%M")
+
+    for stat, (stat_times, values) in series.items():
+        shifts = change_points(values)
+        if shifts:
+            result += f"Level Shifts ({stat}):\n"
+            for shift in shifts:
+                change = f" ({(shift.after - shift.before) / shift.before:+.0%})" if shift.before else ""
+                result += f"• {at(stat_times[shift.index])}: {shift.before:.2f} -> {shift.after:.2f}{change}\n"
+            result += "\n"
+        found = spikes(values)
+        if found:
+            result += f"Spikes ({stat}, {len(found)} found):\n"
+            for spike in sorted(found, key=lambda spike: values[spike.peak], reverse=True)[:MAX_LISTED_SPIKES]:
+                result += (
+                    f"• {at(stat_times[spike.start])} to {at(stat_times[spike.end])}: "
+                    f"peak {values[spike.peak]:.2f} at {at(stat_times[spike.peak])}\n"
+                )
+            result += "\n"
+
+    # Downsample on the extended statistic, whose outliers matter most, and
+    # keep every spike peak so none is lost between the selected points
+    shape_stat = extended_statistic if extended_statistic in series else statistic
+    if len(datapoints) <= DEFAULT_POINT_BUDGET or shape_stat not in series:
+        selected = np.arange(len(datapoints))
+        result += "Values:\n"
+    else:
+        stat_times, values = series[shape_stat]
+        keep = lttb(stat_times, values)
+        keep = np.union1d(keep, np.array([spike.peak for spike in spikes(values)], dtype=int))
+        selected = np.searchsorted(times, stat_times[keep])
+        result += f"Values ({len(selected)} of {len(datapoints)} points, downsampled keeping the shape):\n"
+    for i in selected:
+        dp = datapoints[i]
+        values_str = []
+        for stat in (statistic, extended_statistic):
+            value = datapoint_value(dp, stat)
+            if value is not None:
+                values_str.append(f"{stat}: {value:.2f}")
+        result += f"• {dp['Timestamp'].strftime('%m/%d %H:%M')}: {', '.join(values_str)} {unit}\n"
+
+    return result
+
+
 @mcp.tool()
+@cached_tool(ttl=60, cache_if=is_cacheable_result)
 async def get_service_metrics(
-    service_name: str, metric_name: str, statistic: str = "Average", extended_statistic: str = "p99", hours: int = 1
+    service_name: str,
+    metric_name: str,
+    statistic: str = "Average",
+    extended_statistic: str = "p99",
+    hours: int = 1,
+    regions: str = "",
+    accounts: str = "",
 ) -> str:
     """Get CloudWatch metrics for a specific Application Signals service.
 
@@ -228,14 +824,18 @@ async def get_service_metrics(
     - 'Fault': Percentage of server errors (5xx)
 
     Returns:
-    - Summary statistics (latest, average, min, max)
-    - Recent data points with timestamps
+    - Summary statistics (latest, average, min, max, percentiles)
+    - Level shifts and spikes
+    - Data points across the window with timestamps
     - Both standard and percentile values when available
 
-    The tool automatically adjusts the granularity based on time range:
-    - Up to 3 hours: 1-minute resolution
-    - Up to 24 hours: 5-minute resolution
-    - Over 24 hours: 1-hour resolution
+    The tool uses the finest granularity CloudWatch returns in one call: 1-minute
+    resolution up to 24 hours, and up to 7-minute resolution for a week. Long
+    windows are summarized rather than truncated:
+    - Percentiles (p50/p90/p99) of each statistic over the window
+    - Level shifts: when the metric moved to a new sustained level
+    - Spikes: short runs far above the surrounding values, with their peak
+    - At most ~30 values, downsampled so that the shape and every spike are kept
 
     Args:
         service_name: Name of the service to get metrics for
@@ -243,139 +843,195 @@ async def get_service_metrics(
         statistic: Standard statistic type (Average, Sum, Maximum, Minimum, SampleCount)
         extended_statistic: Extended statistic (p99, p95, p90, p50, etc)
         hours: Number of hours to look back (default 1, max 168 for 1 week)
+        regions: Comma-separated AWS regions to query concurrently (default: us-east-1)
+        accounts: Comma-separated account ids or role ARNs to query through an assumed role
     """
     try:
-        appsignals = boto3.client("application-signals", region_name="us-east-1")
-        cloudwatch = boto3.client("cloudwatch", region_name="us-east-1")
-
-        # Calculate time range
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(hours=hours)
-
-        # Get service details to find metrics
-        services_response = appsignals.list_services(StartTime=start_time, EndTime=end_time, MaxResults=100)
-
-        # Find the target service
-        target_service = None
-        for service in services_response.get("ServiceSummaries", []):
-            key_attrs = service.get("KeyAttributes", {})
-            if key_attrs.get("Name") == service_name:
-                target_service = service
-                break
-
-        if not target_service:
-            return f"Service '{service_name}' not found in Application Signals."
+        if not (regions or accounts):
+            return await asyncio.to_thread(
+                service_metrics_report, Target(), service_name, metric_name, statistic, extended_statistic, hours
+            )
 
-        # Get detailed service info for metric references
-        service_response = appsignals.get_service(
-            StartTime=start_time, EndTime=end_time, KeyAttributes=target_service["KeyAttributes"]
+        results = await fan_out(
+            parse_targets(regions, accounts),
+            lambda target: service_metrics_report(
+                target, service_name, metric_name, statistic, extended_statistic, hours
+            ),
         )
+        result = ""
+        for r in results:
+            result += f"=== {r.target.label} ===\n"
+            result += (r.value if r.error is None else f"Error: {r.error}") + "\n\n"
+        return result + format_fan_out_summary(results)
 
-        metric_refs = service_response["Service"].get("MetricReferences", [])
-
-        if not metric_refs:
-            return f"No metrics found for service '{service_name}'."
-
-        # If no specific metric requested, show available metrics
-        if not metric_name:
-            result = f"Available metrics for service '{service_name}':\n\n"
-            for metric in metric_refs:
-                result += f"• {metric.get('MetricName', 'Unknown')}\n"
-                result += f"  Namespace: {metric.get('Namespace', 'Unknown')}\n"
-                result += f"  Type: {metric.get('MetricType', 'Unknown')}\n"
-                result += "\n"
-            return result
-
-        # Find the specific metric
-        target_metric = None
-        for metric in metric_refs:
-            if metric.get("MetricName") == metric_name:
-                target_metric = metric
-                break
-
-        if not target_metric:
-            available = [m.get("MetricName", "Unknown") for m in metric_refs]
-            return f"Metric '{metric_name}' not found for service '{service_name}'. Available: {', '.join(available)}"
+    except ClientError as e:
+        return f"AWS Error: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"Error: {str(e)}"
 
-        # Calculate appropriate period based on time range
-        if hours <= 3:
-            period = 60  # 1 minute
-        elif hours <= 24:
-            period = 300  # 5 minutes
-        else:
-            period = 3600  # 1 hour
-
-        # Get both standard and extended statistics in a single call
-        response = cloudwatch.get_metric_statistics(
-            Namespace=target_metric["Namespace"],
-            MetricName=target_metric["MetricName"],
-            Dimensions=target_metric.get("Dimensions", []),
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=period,
-            Statistics=[statistic],
-            ExtendedStatistics=[extended_statistic],
-        )
 
-        datapoints = response.get("Datapoints", [])
+# Metrics screen_services compares, with the statistic read for each, and the
+# smallest baseline spread they are scored against (milliseconds, or a rate)
+FLEET_METRICS = {"Latency": "p99", "Fault": "Average", "Error": "Average"}
+FLEET_SPREAD_FLOOR = {"Latency": 1.0, "Fault": 0.001, "Error": 0.001}
+# A z-score from which a service is flagged as deviating from its baseline
+FLEET_Z_THRESHOLD = 3.0
 
-        if not datapoints:
-            return f"No data points found for metric '{metric_name}' on service '{service_name}' in the last {hours} hour(s)."
 
-        # Sort by timestamp
-        datapoints.sort(key=lambda x: x["Timestamp"])
+def fleet_metric_ref(service: dict, metric_name: str) -> dict:
+    """The service-level reference of an Application Signals metric, built from key attributes if not listed."""
+    for metric in service.get("MetricReferences", []):
+        dimensions = metric.get("Dimensions", [])
+        if metric.get("MetricName") == metric_name and not any(d.get("Name") == "Operation" for d in dimensions):
+            return metric
+    key_attrs = service.get("KeyAttributes", {})
+    return {
+        "Namespace": "ApplicationSignals",
+        "MetricName": metric_name,
+        "Dimensions": [
+            {"Name": "Service", "Value": key_attrs.get("Name", "")},
+            {"Name": "Environment", "Value": key_attrs.get("Environment", "")},
+        ],
+    }
 
-        # Build response
-        result = f"Metrics for {service_name} - {metric_name}\n"
-        result += f"Time Range: Last {hours} hour(s)\n"
-        result += f"Period: {period} seconds\n\n"
 
-        # Calculate summary statistics for both standard and extended statistics
-        standard_values = [dp.get(statistic) for dp in datapoints if dp.get(statistic) is not None]
-        extended_values = [dp.get(extended_statistic) for dp in datapoints if dp.get(extended_statistic) is not None]
+def screen_fleet(target: Target, hours: int, baseline_hours: int) -> dict:
+    """Score every service's latency, fault and error rates against its own baseline. Runs synchronously.
 
-        result += "Summary:\n"
+    Returns:
+        One row per service and metric with its z-score, the number of services and the API calls made
+    """
+    import numpy as np
+
+    from src.seriesstats import baseline_zscores
+
+    cloudwatch = get_client("cloudwatch", target.region, target.account)
+    window = hours + baseline_hours
+    # At most 1440 points per series, and whole minutes
+    period = max(60, math.ceil(window * 3600 / MAX_METRIC_DATAPOINTS / 60) * 60)
+    end_time = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    end_time -= timedelta(seconds=int(end_time.timestamp()) % period)
+    start_time = end_time - timedelta(hours=window)
+
+    services = list_services(target, start_time, end_time)
+    queries = []
+    rows = []
+    for service in services:
+        for metric_name, stat in FLEET_METRICS.items():
+            queries.append(
+                metric_data_query(f"q{len(queries)}", fleet_metric_ref(service, metric_name), stat, period)
+            )
+            rows.append((service, metric_name))
+    if not queries:
+        return {"rows": [], "services": 0, "calls": 0}
+    results, calls = get_metric_data_batched(cloudwatch, queries, start_time, end_time, cache_scope=target)
+
+    # One row per query, one column per period; NaN where there is no datapoint
+    bins = int((end_time - start_time).total_seconds() // period)
+    matrix = np.full((len(queries), bins), np.nan)
+    for row, query in enumerate(queries):
+        data = results.get(query["Id"])
+        if not data or not data["Values"]:
+            continue
+        offsets = np.array([t.timestamp() for t in data["Timestamps"]]) - start_time.timestamp()
+        columns = (offsets // period).astype(int)
+        inside = (columns >= 0) & (columns < bins)
+        matrix[row, columns[inside]] = np.asarray(data["Values"], dtype=float)[inside]
+
+    recent = max(1, math.ceil(hours * 3600 / period))
+    metric_names = np.array([metric_name for _, metric_name in rows])
+    z = np.full(len(rows), np.nan)
+    current = np.full(len(rows), np.nan)
+    baseline = np.full(len(rows), np.nan)
+    for metric_name in FLEET_METRICS:
+        selected = metric_names == metric_name
+        z[selected], current[selected], baseline[selected] = baseline_zscores(
+            matrix[selected], recent, FLEET_SPREAD_FLOOR[metric_name]
+        )
 
-        if standard_values:
-            latest_standard = datapoints[-1].get(statistic)
-            avg_of_standard = sum(standard_values) / len(standard_values)
-            max_standard = max(standard_values)
-            min_standard = min(standard_values)
+    scored = []
+    for i, (service, metric_name) in enumerate(rows):
+        if np.isnan(z[i]):
+            continue
+        scored.append(
+            {
+                "service": service["KeyAttributes"].get("Name", "Unknown"),
+                "environment": service["KeyAttributes"].get("Environment", ""),
+                "metric": metric_name,
+                "stat": FLEET_METRICS[metric_name],
+                "z": float(z[i]),
+                "current": float(current[i]),
+                "baseline": float(baseline[i]),
+                "origin": target.label,
+            }
+        )
+    return {"rows": scored, "services": len(services), "calls": calls}
 
-            result += f"{statistic} Statistics:\n"
-            result += f"• Latest: {latest_standard:.2f}\n"
-            result += f"• Average: {avg_of_standard:.2f}\n"
-            result += f"• Maximum: {max_standard:.2f}\n"
-            result += f"• Minimum: {min_standard:.2f}\n\n"
 
-        if extended_values:
-            latest_extended = datapoints[-1].get(extended_statistic)
-            avg_extended = sum(extended_values) / len(extended_values)
-            max_extended = max(extended_values)
-            min_extended = min(extended_values)
+def format_metric_value(metric_name: str, value: float) -> str:
+    return f"{value:.0f}ms" if metric_name == "Latency" else f"{value:.2%}"
 
-            result += f"{extended_statistic} Statistics:\n"
-            result += f"• Latest: {latest_extended:.2f}\n"
-            result += f"• Average: {avg_extended:.2f}\n"
-            result += f"• Maximum: {max_extended:.2f}\n"
-            result += f"• Minimum: {min_extended:.2f}\n\n"
 
-        result += f"• Data Points: {len(datapoints)}\n\n"
+@mcp.tool()
+@cached_tool(ttl=60, cache_if=is_cacheable_result)
+async def screen_services(
+    hours: int = 1, baseline_hours: int = 24, top_k: int = 10, regions: str = "", accounts: str = ""
+) -> str:
+    """Find the services whose latency, faults or errors deviate most from their own recent baseline.
 
-        # Show recent values (last 10) with both metrics
-        result += "Recent Values:\n"
-        for dp in datapoints[-10:]:
-            timestamp = dp["Timestamp"].strftime("%m/%d %H:%M")
-            unit = dp.get("Unit", "")
+    Use this first when something is wrong but you do not know which service: it checks every
+    Application Signals service in a few batched metric requests, instead of calling
+    get_service_metrics service by service.
 
-            values_str = []
-            if dp.get(statistic) is not None:
-                values_str.append(f"{statistic}: {dp[statistic]:.2f}")
-            if dp.get(extended_statistic) is not None:
-                values_str.append(f"{extended_statistic}: {dp[extended_statistic]:.2f}")
+    For each service, p99 latency and average fault and error rates over the last `hours` are
+    compared with the `baseline_hours` before, as a z-score (deviation in baseline standard
+    deviations). Services are ranked by their largest z-score.
 
-            result += f"• {timestamp}: {', '.join(values_str)} {unit}\n"
+    Args:
+        hours: Recent window to screen (default 1)
+        baseline_hours: Window before it that each service is compared with (default 24)
+        top_k: Number of services to list (default 10)
+        regions: Comma-separated AWS regions to query concurrently (default: us-east-1)
+        accounts: Comma-separated account ids or role ARNs to query through an assumed role
 
+    Returns:
+        The top services with their deviating metrics, current and baseline values
+    """
+    try:
+        targets = parse_targets(regions, accounts) if regions or accounts else [Target()]
+        results = await fan_out(targets, lambda target: screen_fleet(target, hours, baseline_hours))
+        if len(results) == 1 and results[0].error is not None:
+            return f"Error: {results[0].error}"
+
+        rows = [row for r in results if r.error is None for row in r.value["rows"]]
+        service_count = sum(r.value["services"] for r in results if r.error is None)
+        calls = sum(r.value["calls"] for r in results if r.error is None)
+
+        by_service: Dict[tuple, list] = {}
+        for row in rows:
+            by_service.setdefault((row["origin"], row["service"], row["environment"]), []).append(row)
+        ranked = sorted(by_service.items(), key=lambda item: max(row["z"] for row in item[1]), reverse=True)
+
+        result = f"Fleet screen: last {hours}h against the {baseline_hours}h before\n"
+        result += f"{service_count} services, {len(rows)} metric series with data, {calls} GetMetricData request(s)\n\n"
+        if not ranked:
+            return result + "No metric data found for any service."
+
+        flagged = sum(1 for _, service_rows in ranked if max(row["z"] for row in service_rows) >= FLEET_Z_THRESHOLD)
+        result += f"Services deviating from baseline (z >= {FLEET_Z_THRESHOLD:g}): {flagged}\n\n"
+        for rank, ((origin, name, environment), service_rows) in enumerate(ranked[:top_k], 1):
+            label = f"{name} ({environment})" if environment else name
+            if len(targets) > 1:
+                label += f" [{origin}]"
+            result += f"{rank}. {label}\n"
+            for row in sorted(service_rows, key=lambda row: row["z"], reverse=True):
+                result += (
+                    f"   • {row['metric']} {row['stat']}: {format_metric_value(row['metric'], row['current'])} "
+                    f"vs baseline {format_metric_value(row['metric'], row['baseline'])} (z={row['z']:+.1f})\n"
+                )
+
+        if len(targets) > 1:
+            result += "\n" + format_fan_out_summary(results)
         return result
 
     except ClientError as e:
@@ -384,9 +1040,15 @@ async def get_service_metrics(
         return f"Error: {str(e)}"
 
 
-def get_trace_summaries_paginated(xray_client, start_time, end_time, filter_expression, max_traces: int = 100) -> list:
+def get_trace_summaries_paginated(
+    xray_client, start_time, end_time, filter_expression, max_traces: int = 100
+) -> Tuple[list, Optional[str]]:
     """Get trace summaries with pagination to avoid exceeding response size limits.
 
+    Throttled pages are retried by the shared AWS retry policy. If a later page
+    still fails, the traces retrieved so far are returned with the error; a
+    failure on the first page is raised.
+
     Args:
         xray_client: Boto3 X-Ray client
         start_time: Start time for trace query
@@ -395,7 +1057,7 @@ def get_trace_summaries_paginated(xray_client, start_time, end_time, filter_expr
         max_traces: Maximum number of traces to retrieve (default 100)
 
     Returns:
-        List of trace summaries
+        Trace summaries, and the error that stopped pagination early if any
     """
     all_traces = []
     next_token = None
@@ -431,15 +1093,18 @@ def get_trace_summaries_paginated(xray_client, start_time, end_time, filter_expr
                 all_traces = all_traces[:max_traces]
                 break
 
-        return all_traces
+        return all_traces, None
 
     except Exception as e:
-        # Return what we have so far if there's an error
-        print(f"Error during paginated trace retrieval: {str(e)}")
-        return all_traces
+        if not all_traces:
+            raise
+        # Return what we have so far, saying why it is incomplete
+        logger.warning(f"Error during paginated trace retrieval: {str(e)}")
+        return all_traces, str(e)
 
 
 @mcp.tool()
+@cached_tool(ttl=300, cache_if=is_cacheable_result)
 async def get_service_level_objective(slo_id: str) -> str:
     """Get detailed information about a specific Service Level Objective (SLO).
 
@@ -470,194 +1135,394 @@ async def get_service_level_objective(slo_id: str) -> str:
         slo_id: The ARN or name of the SLO to retrieve
     """
     try:
-        appsignals = boto3.client("application-signals", region_name="us-east-1")
+        slo = await asyncio.to_thread(fetch_slo_definition, slo_id)
+        if not slo:
+            return f"No SLO found with ID: {slo_id}"
+        return format_slo(slo)
+
+    except ClientError as e:
+        return f"AWS Error: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"Error: {str(e)}"
 
-        response = appsignals.get_service_level_objective(Id=slo_id)
-        slo = response.get("Slo", {})
 
+def fetch_slo_definition(slo_id: str, max_age: float = SLO_DEFINITION_TTL) -> dict:
+    """Return an SLO definition from the local SLO store, fetching it from AWS when missing or stale."""
+    store = slo_store()
+    slo = None
+    if store:
+        # A name is only looked up among this account's SLOs
+        account = None if slo_id.startswith("arn:") else caller_account()
+        slo = store.get_definition(slo_id, max_age, Target().region, account)
+    if slo is None:
+        appsignals = get_client("application-signals")
+        slo = appsignals.get_service_level_objective(Id=slo_id).get("Slo", {})
+        if slo and store:
+            store.put_definition(slo)
+    return slo
+
+
+def format_slo(slo: dict) -> str:
+    """Render an SLO definition for get_service_level_objective."""
+    result = "Service Level Objective Details\n"
+    result += "=" * 50 + "\n\n"
+
+    # Basic info
+    result += f"Name: {slo.get('Name', 'Unknown')}\n"
+    result += f"ARN: {slo.get('Arn', 'Unknown')}\n"
+    if slo.get("Description"):
+        result += f"Description: {slo['Description']}\n"
+    result += f"Evaluation Type: {slo.get('EvaluationType', 'Unknown')}\n"
+    result += f"Created: {slo.get('CreatedTime', 'Unknown')}\n"
+    result += f"Last Updated: {slo.get('LastUpdatedTime', 'Unknown')}\n\n"
+
+    # Goal configuration
+    goal = slo.get("Goal", {})
+    if goal:
+        result += "Goal Configuration:\n"
+        result += f"• Attainment Goal: {goal.get('AttainmentGoal', 99)}%\n"
+        result += f"• Warning Threshold: {goal.get('WarningThreshold', 50)}%\n"
+
+        interval = goal.get("Interval", {})
+        if "RollingInterval" in interval:
+            rolling = interval["RollingInterval"]
+            result += f"• Interval: Rolling {rolling.get('Duration')} {rolling.get('DurationUnit')}\n"
+        elif "CalendarInterval" in interval:
+            calendar = interval["CalendarInterval"]
+            result += f"• Interval: Calendar {calendar.get('Duration')} {calendar.get('DurationUnit')} starting {calendar.get('StartTime')}\n"
+        result += "\n"
+
+    # Period-based SLI
+    if "Sli" in slo:
+        sli = slo["Sli"]
+        result += "Period-Based SLI Configuration:\n"
+
+        sli_metric = sli.get("SliMetric", {})
+        if sli_metric:
+            # Key attributes - crucial for trace queries
+            key_attrs = sli_metric.get("KeyAttributes", {})
+            if key_attrs:
+                result += "• Key Attributes:\n"
+                for k, v in key_attrs.items():
+                    result += f"  - {k}: {v}\n"
+
+            # Operation name - essential for trace filtering
+            if sli_metric.get("OperationName"):
+                result += f"• Operation Name: {sli_metric['OperationName']}\n"
+                result += f'  (Use this in trace queries: annotation[aws.local.operation]="{sli_metric["OperationName"]}")\n'
+
+            result += f"• Metric Type: {sli_metric.get('MetricType', 'Unknown')}\n"
+
+            # MetricDataQueries - detailed metric configuration
+            metric_queries = sli_metric.get("MetricDataQueries", [])
+            if metric_queries:
+                result += "• Metric Data Queries:\n"
+                for query in metric_queries:
+                    query_id = query.get("Id", "Unknown")
+                    result += f"  Query ID: {query_id}\n"
+
+                    # MetricStat details
+                    metric_stat = query.get("MetricStat", {})
+                    if metric_stat:
+                        metric = metric_stat.get("Metric", {})
+                        if metric:
+                            result += f"    Namespace: {metric.get('Namespace', 'Unknown')}\n"
+                            result += f"    MetricName: {metric.get('MetricName', 'Unknown')}\n"
+
+                            # Dimensions - crucial for understanding what's being measured
+                            dimensions = metric.get("Dimensions", [])
+                            if dimensions:
+                                result += "    Dimensions:\n"
+                                for dim in dimensions:
+                                    result += (
+                                        f"      - {dim.get('Name', 'Unknown')}: {dim.get('Value', 'Unknown')}\n"
+                                    )
+
+                        result += f"    Period: {metric_stat.get('Period', 'Unknown')} seconds\n"
+                        result += f"    Stat: {metric_stat.get('Stat', 'Unknown')}\n"
+                        if metric_stat.get("Unit"):
+                            result += f"    Unit: {metric_stat['Unit']}\n"
+
+                    # Expression if present
+                    if query.get("Expression"):
+                        result += f"    Expression: {query['Expression']}\n"
+
+                    result += f"    ReturnData: {query.get('ReturnData', True)}\n"
+
+            # Dependency config
+            dep_config = sli_metric.get("DependencyConfig", {})
+            if dep_config:
+                result += "• Dependency Configuration:\n"
+                dep_attrs = dep_config.get("DependencyKeyAttributes", {})
+                if dep_attrs:
+                    result += "  Key Attributes:\n"
+                    for k, v in dep_attrs.items():
+                        result += f"    - {k}: {v}\n"
+                if dep_config.get("DependencyOperationName"):
+                    result += f"  - Dependency Operation: {dep_config['DependencyOperationName']}\n"
+                    result += f'    (Use in traces: annotation[aws.remote.operation]="{dep_config["DependencyOperationName"]}")\n'
+
+        result += f"• Threshold: {sli.get('MetricThreshold', 'Unknown')}\n"
+        result += f"• Comparison: {sli.get('ComparisonOperator', 'Unknown')}\n\n"
+
+    # Request-based SLI
+    if "RequestBasedSli" in slo:
+        rbs = slo["RequestBasedSli"]
+        result += "Request-Based SLI Configuration:\n"
+
+        rbs_metric = rbs.get("RequestBasedSliMetric", {})
+        if rbs_metric:
+            # Key attributes
+            key_attrs = rbs_metric.get("KeyAttributes", {})
+            if key_attrs:
+                result += "• Key Attributes:\n"
+                for k, v in key_attrs.items():
+                    result += f"  - {k}: {v}\n"
+
+            # Operation name
+            if rbs_metric.get("OperationName"):
+                result += f"• Operation Name: {rbs_metric['OperationName']}\n"
+                result += f'  (Use this in trace queries: annotation[aws.local.operation]="{rbs_metric["OperationName"]}")\n'
+
+            result += f"• Metric Type: {rbs_metric.get('MetricType', 'Unknown')}\n"
+
+            # MetricDataQueries - detailed metric configuration
+            metric_queries = rbs_metric.get("MetricDataQueries", [])
+            if metric_queries:
+                result += "• Metric Data Queries:\n"
+                for query in metric_queries:
+                    query_id = query.get("Id", "Unknown")
+                    result += f"  Query ID: {query_id}\n"
+
+                    # MetricStat details
+                    metric_stat = query.get("MetricStat", {})
+                    if metric_stat:
+                        metric = metric_stat.get("Metric", {})
+                        if metric:
+                            result += f"    Namespace: {metric.get('Namespace', 'Unknown')}\n"
+                            result += f"    MetricName: {metric.get('MetricName', 'Unknown')}\n"
+
+                            # Dimensions - crucial for understanding what's being measured
+                            dimensions = metric.get("Dimensions", [])
+                            if dimensions:
+                                result += "    Dimensions:\n"
+                                for dim in dimensions:
+                                    result += (
+                                        f"      - {dim.get('Name', 'Unknown')}: {dim.get('Value', 'Unknown')}\n"
+                                    )
+
+                        result += f"    Period: {metric_stat.get('Period', 'Unknown')} seconds\n"
+                        result += f"    Stat: {metric_stat.get('Stat', 'Unknown')}\n"
+                        if metric_stat.get("Unit"):
+                            result += f"    Unit: {metric_stat['Unit']}\n"
+
+                    # Expression if present
+                    if query.get("Expression"):
+                        result += f"    Expression: {query['Expression']}\n"
+
+                    result += f"    ReturnData: {query.get('ReturnData', True)}\n"
+
+            # Dependency config
+            dep_config = rbs_metric.get("DependencyConfig", {})
+            if dep_config:
+                result += "• Dependency Configuration:\n"
+                dep_attrs = dep_config.get("DependencyKeyAttributes", {})
+                if dep_attrs:
+                    result += "  Key Attributes:\n"
+                    for k, v in dep_attrs.items():
+                        result += f"    - {k}: {v}\n"
+                if dep_config.get("DependencyOperationName"):
+                    result += f"  - Dependency Operation: {dep_config['DependencyOperationName']}\n"
+                    result += f'    (Use in traces: annotation[aws.remote.operation]="{dep_config["DependencyOperationName"]}")\n'
+
+        result += f"• Threshold: {rbs.get('MetricThreshold', 'Unknown')}\n"
+        result += f"• Comparison: {rbs.get('ComparisonOperator', 'Unknown')}\n\n"
+
+    # Burn rate configurations
+    burn_rates = slo.get("BurnRateConfigurations", [])
+    if burn_rates:
+        result += "Burn Rate Configurations:\n"
+        for br in burn_rates:
+            result += f"• Look-back window: {br.get('LookBackWindowMinutes')} minutes\n"
+
+    return result
+
+
+def format_edge(edge, arrow: str, other: str) -> str:
+    """One line describing a dependency edge, seen from the node at its other end."""
+    line = f"{arrow} {other}"
+    details = []
+    operations = sorted(f"{caller or '?'} -> {callee or '?'}" for caller, callee in edge.operations)
+    if operations:
+        details.append(", ".join(operations[:3]) + (f" (+{len(operations) - 3} more)" if len(operations) > 3 else ""))
+    if edge.stats.requests:
+        details.append(f"{edge.stats.requests} requests")
+        details.append(f"{edge.fault_rate:.1%} faults")
+        details.append(f"avg {edge.average_latency * 1000:.0f}ms")
+    if details:
+        line += f" [{'; '.join(details)}]"
+    return line
+
+
+@mcp.tool()
+async def get_service_map(service_name: str = "", direction: str = "both", depth: int = 2, refresh: bool = False) -> str:
+    """Show service dependencies: what a service calls, what calls it, and what breaks if it fails.
+
+    Answers from an in-memory dependency graph built from Application Signals dependency
+    listings and the X-Ray service graph, so one call replaces many trace and SLO queries.
+    The graph is refreshed incrementally when it is older than a few minutes.
+
+    Args:
+        service_name: Service to look at; leave empty for an overview of the whole map
+        direction: "downstream" (what it calls), "upstream" (what calls it), "both", or
+            "blast_radius" (every service that directly or transitively depends on it)
+        depth: How many hops to follow for downstream/upstream (default 2)
+        refresh: Refresh the graph before answering, however recent it is
+
+    Returns:
+        The dependency tree with operations, request counts, fault rates and latency per edge
+    """
+    if direction not in ("downstream", "upstream", "both", "blast_radius"):
+        return "Error: direction must be downstream, upstream, both or blast_radius."
+    try:
+        snapshot = await service_map_refresher.get()
+        if refresh or snapshot.age_seconds > SERVICE_MAP_MAX_AGE:
+            snapshot = await service_map_refresher.refresh()
+        graph = snapshot.value
+
+        edge_count = sum(len(targets) for targets in graph.downstream.values())
+        header = (
+            f"Service map: {len(graph.nodes)} nodes, {edge_count} dependencies "
+            f"(refreshed {snapshot.age_seconds:.0f}s ago with {graph.last_refresh_calls} API calls)\n\n"
+        )
+
+        if not service_name:
+            result = header
+            for title, index in (("Most depended on", graph.upstream), ("Most dependencies", graph.downstream)):
+                ranked = sorted(index.items(), key=lambda item: len(item[1]), reverse=True)[:10]
+                if ranked:
+                    result += f"{title}:\n"
+                    for name, neighbors in ranked:
+                        result += f"• {name}: {len(neighbors)}\n"
+                    result += "\n"
+            return result
+
+        name = graph.resolve(service_name)
+        if name is None:
+            return header + f"Service '{service_name}' is not in the service map."
+        result = header + f"{name}" + (f" ({graph.node_type(name)})" if graph.node_type(name) else "") + "\n\n"
+
+        if direction == "blast_radius":
+            affected = graph.blast_radius(name)
+            if not affected:
+                return result + "Nothing is known to depend on it."
+            result += f"{len(affected)} services depend on it directly or transitively:\n"
+            for distance in sorted(set(affected.values())):
+                names = sorted(n for n, d in affected.items() if d == distance)
+                result += f"• {distance} hop{'s' if distance > 1 else ''} away: {', '.join(names)}\n"
+            entry_points = sorted(n for n in affected if n not in graph.upstream)
+            if entry_points:
+                result += f"\nEntry points affected (nothing calls them): {', '.join(entry_points)}\n"
+            return result
+
+        for walk_direction, arrow in (("downstream", "->"), ("upstream", "<-")):
+            if direction not in (walk_direction, "both"):
+                continue
+            edges = graph.walk(name, walk_direction, depth)
+            result += f"{walk_direction.capitalize()} (up to {depth} hops):\n"
+            if not edges:
+                result += "  None found\n"
+            for hops, edge in edges:
+                other = edge.target if walk_direction == "downstream" else edge.source
+                result += "  " * hops + format_edge(edge, arrow, other) + "\n"
+            result += "\n"
+        return result
+
+    except ClientError as e:
+        return f"AWS Error: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+async def get_slo_budget_trend(slo_id: str, days: int = 7, refresh: bool = True) -> str:
+    """Show how an SLO's error budget and attainment have moved over the past days, with burn rates.
+
+    Use this tool to:
+    - See whether an SLO is burning its error budget faster than it can afford
+    - Estimate when the budget will run out at the current pace
+    - Tell a sudden breach from a slow decline
+
+    The history is built from budget snapshots recorded locally each time SLI
+    status is computed (by get_sli_status or the background refresher), so it
+    only covers periods in which this server was running. A burn rate of 1.0
+    means the budget is being used at exactly the pace that exhausts it at the
+    end of the SLO's interval.
+
+    Args:
+        slo_id: The ARN or name of the SLO
+        days: Number of days of history to show (default 7)
+        refresh: Take a fresh budget snapshot from AWS first (default True)
+    """
+    try:
+        store = slo_store()
+        if store is None:
+            return "Error: the local SLO store is disabled (APPSIGNALS_SLO_STORE is empty)"
+
+        slo = await asyncio.to_thread(fetch_slo_definition, slo_id, float("inf"))
         if not slo:
             return f"No SLO found with ID: {slo_id}"
+        arn = slo["Arn"]
 
-        result = "Service Level Objective Details\n"
-        result += "=" * 50 + "\n\n"
-
-        # Basic info
-        result += f"Name: {slo.get('Name', 'Unknown')}\n"
-        result += f"ARN: {slo.get('Arn', 'Unknown')}\n"
-        if slo.get("Description"):
-            result += f"Description: {slo['Description']}\n"
-        result += f"Evaluation Type: {slo.get('EvaluationType', 'Unknown')}\n"
-        result += f"Created: {slo.get('CreatedTime', 'Unknown')}\n"
-        result += f"Last Updated: {slo.get('LastUpdatedTime', 'Unknown')}\n\n"
-
-        # Goal configuration
-        goal = slo.get("Goal", {})
-        if goal:
-            result += "Goal Configuration:\n"
-            result += f"• Attainment Goal: {goal.get('AttainmentGoal', 99)}%\n"
-            result += f"• Warning Threshold: {goal.get('WarningThreshold', 50)}%\n"
-
-            interval = goal.get("Interval", {})
-            if "RollingInterval" in interval:
-                rolling = interval["RollingInterval"]
-                result += f"• Interval: Rolling {rolling.get('Duration')} {rolling.get('DurationUnit')}\n"
-            elif "CalendarInterval" in interval:
-                calendar = interval["CalendarInterval"]
-                result += f"• Interval: Calendar {calendar.get('Duration')} {calendar.get('DurationUnit')} starting {calendar.get('StartTime')}\n"
+        if refresh:
+            appsignals = get_client("application-signals")
+            response = await asyncio.to_thread(
+                appsignals.batch_get_service_level_objective_budget_report, Timestamp=datetime.utcnow(), SloIds=[arn]
+            )
+            await asyncio.to_thread(store.record_budget_reports, response.get("Reports", []))
+
+        now = time.time()
+        history = await asyncio.to_thread(store.budget_history, arn, now - days * 86400)
+        if not history:
+            return f"No budget snapshots recorded for {slo.get('Name', arn)} in the last {days} days"
+
+        latest = history[-1]
+        result = f"SLO Budget Trend: {latest.name}\n"
+        result += f"ARN: {arn}\n"
+        result += f"Snapshots: {len(history)} between {datetime.fromtimestamp(history[0].taken_at, timezone.utc):%Y-%m-%d %H:%M} and {datetime.fromtimestamp(latest.taken_at, timezone.utc):%Y-%m-%d %H:%M} UTC\n\n"
+
+        result += f"Current status: {latest.budget_status or 'Unknown'}\n"
+        if latest.attainment is not None:
+            result += f"• Attainment: {latest.attainment:.3f}% (goal {latest.attainment_goal or 'Unknown'}%)\n"
+        if latest.budget_remaining is not None:
+            result += f"• Error budget remaining: {latest.budget_remaining * 100:.1f}%\n"
+        result += "\n"
+
+        interval = interval_hours(slo)
+        result += "Budget consumption:\n"
+        for label, window in (("last 1h", 3600), ("last 6h", 6 * 3600), ("last 24h", 86400), (f"last {days}d", days * 86400)):
+            consumed = budget_consumed(history, window)
+            if consumed is None:
+                result += f"• {label}: not enough snapshots\n"
+                continue
+            result += f"• {label}: {consumed * 100:+.2f}% of the total budget"
+            if interval:
+                result += f", burn rate {burn_rate(consumed, window, interval):.2f}"
             result += "\n"
 
-        # Period-based SLI
-        if "Sli" in slo:
-            sli = slo["Sli"]
-            result += "Period-Based SLI Configuration:\n"
-
-            sli_metric = sli.get("SliMetric", {})
-            if sli_metric:
-                # Key attributes - crucial for trace queries
-                key_attrs = sli_metric.get("KeyAttributes", {})
-                if key_attrs:
-                    result += "• Key Attributes:\n"
-                    for k, v in key_attrs.items():
-                        result += f"  - {k}: {v}\n"
-
-                # Operation name - essential for trace filtering
-                if sli_metric.get("OperationName"):
-                    result += f"• Operation Name: {sli_metric['OperationName']}\n"
-                    result += f'  (Use this in trace queries: annotation[aws.local.operation]="{sli_metric["OperationName"]}")\n'
-
-                result += f"• Metric Type: {sli_metric.get('MetricType', 'Unknown')}\n"
-
-                # MetricDataQueries - detailed metric configuration
-                metric_queries = sli_metric.get("MetricDataQueries", [])
-                if metric_queries:
-                    result += "• Metric Data Queries:\n"
-                    for query in metric_queries:
-                        query_id = query.get("Id", "Unknown")
-                        result += f"  Query ID: {query_id}\n"
-
-                        # MetricStat details
-                        metric_stat = query.get("MetricStat", {})
-                        if metric_stat:
-                            metric = metric_stat.get("Metric", {})
-                            if metric:
-                                result += f"    Namespace: {metric.get('Namespace', 'Unknown')}\n"
-                                result += f"    MetricName: {metric.get('MetricName', 'Unknown')}\n"
-
-                                # Dimensions - crucial for understanding what's being measured
-                                dimensions = metric.get("Dimensions", [])
-                                if dimensions:
-                                    result += "    Dimensions:\n"
-                                    for dim in dimensions:
-                                        result += (
-                                            f"      - {dim.get('Name', 'Unknown')}: {dim.get('Value', 'Unknown')}\n"
-                                        )
-
-                            result += f"    Period: {metric_stat.get('Period', 'Unknown')} seconds\n"
-                            result += f"    Stat: {metric_stat.get('Stat', 'Unknown')}\n"
-                            if metric_stat.get("Unit"):
-                                result += f"    Unit: {metric_stat['Unit']}\n"
-
-                        # Expression if present
-                        if query.get("Expression"):
-                            result += f"    Expression: {query['Expression']}\n"
-
-                        result += f"    ReturnData: {query.get('ReturnData', True)}\n"
-
-                # Dependency config
-                dep_config = sli_metric.get("DependencyConfig", {})
-                if dep_config:
-                    result += "• Dependency Configuration:\n"
-                    dep_attrs = dep_config.get("DependencyKeyAttributes", {})
-                    if dep_attrs:
-                        result += "  Key Attributes:\n"
-                        for k, v in dep_attrs.items():
-                            result += f"    - {k}: {v}\n"
-                    if dep_config.get("DependencyOperationName"):
-                        result += f"  - Dependency Operation: {dep_config['DependencyOperationName']}\n"
-                        result += f'    (Use in traces: annotation[aws.remote.operation]="{dep_config["DependencyOperationName"]}")\n'
-
-            result += f"• Threshold: {sli.get('MetricThreshold', 'Unknown')}\n"
-            result += f"• Comparison: {sli.get('ComparisonOperator', 'Unknown')}\n\n"
-
-        # Request-based SLI
-        if "RequestBasedSli" in slo:
-            rbs = slo["RequestBasedSli"]
-            result += "Request-Based SLI Configuration:\n"
-
-            rbs_metric = rbs.get("RequestBasedSliMetric", {})
-            if rbs_metric:
-                # Key attributes
-                key_attrs = rbs_metric.get("KeyAttributes", {})
-                if key_attrs:
-                    result += "• Key Attributes:\n"
-                    for k, v in key_attrs.items():
-                        result += f"  - {k}: {v}\n"
-
-                # Operation name
-                if rbs_metric.get("OperationName"):
-                    result += f"• Operation Name: {rbs_metric['OperationName']}\n"
-                    result += f'  (Use this in trace queries: annotation[aws.local.operation]="{rbs_metric["OperationName"]}")\n'
-
-                result += f"• Metric Type: {rbs_metric.get('MetricType', 'Unknown')}\n"
-
-                # MetricDataQueries - detailed metric configuration
-                metric_queries = rbs_metric.get("MetricDataQueries", [])
-                if metric_queries:
-                    result += "• Metric Data Queries:\n"
-                    for query in metric_queries:
-                        query_id = query.get("Id", "Unknown")
-                        result += f"  Query ID: {query_id}\n"
-
-                        # MetricStat details
-                        metric_stat = query.get("MetricStat", {})
-                        if metric_stat:
-                            metric = metric_stat.get("Metric", {})
-                            if metric:
-                                result += f"    Namespace: {metric.get('Namespace', 'Unknown')}\n"
-                                result += f"    MetricName: {metric.get('MetricName', 'Unknown')}\n"
-
-                                # Dimensions - crucial for understanding what's being measured
-                                dimensions = metric.get("Dimensions", [])
-                                if dimensions:
-                                    result += "    Dimensions:\n"
-                                    for dim in dimensions:
-                                        result += (
-                                            f"      - {dim.get('Name', 'Unknown')}: {dim.get('Value', 'Unknown')}\n"
-                                        )
-
-                            result += f"    Period: {metric_stat.get('Period', 'Unknown')} seconds\n"
-                            result += f"    Stat: {metric_stat.get('Stat', 'Unknown')}\n"
-                            if metric_stat.get("Unit"):
-                                result += f"    Unit: {metric_stat['Unit']}\n"
-
-                        # Expression if present
-                        if query.get("Expression"):
-                            result += f"    Expression: {query['Expression']}\n"
-
-                        result += f"    ReturnData: {query.get('ReturnData', True)}\n"
-
-                # Dependency config
-                dep_config = rbs_metric.get("DependencyConfig", {})
-                if dep_config:
-                    result += "• Dependency Configuration:\n"
-                    dep_attrs = dep_config.get("DependencyKeyAttributes", {})
-                    if dep_attrs:
-                        result += "  Key Attributes:\n"
-                        for k, v in dep_attrs.items():
-                            result += f"    - {k}: {v}\n"
-                    if dep_config.get("DependencyOperationName"):
-                        result += f"  - Dependency Operation: {dep_config['DependencyOperationName']}\n"
-                        result += f'    (Use in traces: annotation[aws.remote.operation]="{dep_config["DependencyOperationName"]}")\n'
-
-            result += f"• Threshold: {rbs.get('MetricThreshold', 'Unknown')}\n"
-            result += f"• Comparison: {rbs.get('ComparisonOperator', 'Unknown')}\n\n"
-
-        # Burn rate configurations
-        burn_rates = slo.get("BurnRateConfigurations", [])
-        if burn_rates:
-            result += "Burn Rate Configurations:\n"
-            for br in burn_rates:
-                result += f"• Look-back window: {br.get('LookBackWindowMinutes')} minutes\n"
+        consumed = budget_consumed(history, 86400)
+        if consumed and consumed > 0 and latest.budget_remaining is not None:
+            hours_left = latest.budget_remaining / consumed * 24
+            result += f"\nAt the last 24h pace the budget runs out in about {hours_left:.0f} hours\n"
+
+        result += "\nDaily (last snapshot of each day):\n"
+        daily = {}
+        for snapshot in history:
+            daily[datetime.fromtimestamp(snapshot.taken_at, timezone.utc).date()] = snapshot
+        for day, snapshot in daily.items():
+            attainment = f"{snapshot.attainment:.3f}%" if snapshot.attainment is not None else "n/a"
+            remaining = f"{snapshot.budget_remaining * 100:.1f}%" if snapshot.budget_remaining is not None else "n/a"
+            result += f"• {day}: {snapshot.budget_status or 'Unknown'}, attainment {attainment}, budget remaining {remaining}\n"
 
         return result
 
@@ -692,6 +1557,11 @@ async def run_transaction_search(
     | DISPLAY avg_output_tokens, `attributes.gen_ai.request.model`, `attributes.aws.local.service`
     ```
 
+    When the shared cache is enabled (APPSIGNALS_SHARED_CACHE), the time range is widened to
+    whole minutes and completed results are cached: re-running the same query over a slightly
+    shifted range returns the cached result, marked with the bytes it did not have to scan
+    again. Otherwise the query runs over the given range as is.
+
     Returns:
     --------
         A dictionary containing the final query results, including:
@@ -699,49 +1569,103 @@ async def run_transaction_search(
             - results: A list of the actual query results if the status is Complete.
             - statistics: Query performance statistics
             - messages: Any informational messages about the query
+            - range: The startTime and endTime the query ran over, after any widening
+            - cache: For a cached result, its age, whether its range is closed, and the bytes scan saved
     """
     try:
         # Use default log group if none provided
-        if log_group_name is None:
+        if not log_group_name:
             log_group_name = "aws/spans"
 
+        start = int(datetime.fromisoformat(start_time).timestamp())
+        end = int(datetime.fromisoformat(end_time).timestamp())
+        results_cache = query_cache()
+        span = trace.get_current_span()
+        if results_cache is not None:
+            # Whole minutes, so that slightly shifted ranges share a cache entry
+            start, end = snap_range(start, end, QUERY_SNAP_SECONDS)
+        queried_range = {
+            "startTime": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+            "endTime": datetime.fromtimestamp(end, timezone.utc).isoformat(),
+        }
+        if results_cache is not None:
+            identity = await asyncio.to_thread(caller_identity)
+            cache_key = QueryResultCache.key(
+                identity, Target().region, query_string, [log_group_name], start, end, limit
+            )
+            cached = await asyncio.to_thread(results_cache.get, cache_key)
+            span.set_attribute("logs.query.cache.hit", cached is not None)
+            if cached is not None:
+                span.set_attribute("logs.query.bytes_saved", cached.bytes_scanned)
+                return {
+                    **cached.response,
+                    "range": queried_range,
+                    "cache": {
+                        "age_seconds": round(cached.age_seconds),
+                        "closed_range": cached.closed,
+                        "bytes_scanned_saved": cached.bytes_scanned,
+                        "total_bytes_scanned_saved": results_cache.bytes_saved,
+                    },
+                }
+
         # Start query
         kwargs = {
-            "startTime": int(datetime.fromisoformat(start_time).timestamp()),
-            "endTime": int(datetime.fromisoformat(end_time).timestamp()),
+            "startTime": start,
+            "endTime": end,
             "queryString": query_string,
             "logGroupNames": [log_group_name],
             "limit": limit,
         }
 
-        start_response = logs_client.start_query(**remove_null_values(kwargs))
+        logs_client = get_client("logs")
+        start_task = asyncio.ensure_future(asyncio.to_thread(logs_client.start_query, **remove_null_values(kwargs)))
+        try:
+            start_response = await asyncio.shield(start_task)
+        except asyncio.CancelledError:
+            # StartQuery carries on in its thread; stop the query once it has started
+            stopper = asyncio.ensure_future(stop_started_query(logs_client, start_task))
+            _query_stoppers.add(stopper)
+            stopper.add_done_callback(_query_stoppers.discard)
+            raise
         query_id = start_response["queryId"]
         logger.info(f"Started query with ID: {query_id}")
 
         # Seconds
         poll_start = timer()
-        while poll_start + max_timeout > timer():
-            response = logs_client.get_query_results(queryId=query_id)
-            status = response["status"]
-
-            if status in {"Complete", "Failed", "Cancelled"}:
-                logger.info(f"Query {query_id} finished with status {status}")
-                return {
-                    "queryId": query_id,
-                    "status": status,
-                    "statistics": response.get("statistics", {}),
-                    "results": [
-                        {field["field"]: field["value"] for field in line} for line in response.get("results", [])
-                    ],
-                }
-
-            await asyncio.sleep(1)
+        try:
+            while poll_start + max_timeout > timer():
+                response = await asyncio.to_thread(logs_client.get_query_results, queryId=query_id)
+                status = response["status"]
+
+                if status in {"Complete", "Failed", "Cancelled"}:
+                    logger.info(f"Query {query_id} finished with status {status}")
+                    result = {
+                        "queryId": query_id,
+                        "status": status,
+                        "range": queried_range,
+                        "statistics": response.get("statistics", {}),
+                        "results": [
+                            {field["field"]: field["value"] for field in line} for line in response.get("results", [])
+                        ],
+                    }
+                    if status == "Complete" and results_cache is not None:
+                        await asyncio.to_thread(results_cache.put, cache_key, end, result)
+                    return result
+
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            # The client cancelled the request or its deadline passed; nobody
+            # will read the results, so free the account's query slot now.
+            # Shielded so that the stop is made even as the cancellation goes on.
+            await asyncio.shield(asyncio.to_thread(stop_query, logs_client, query_id))
+            raise
 
         msg = f"Query {query_id} did not complete within {max_timeout} seconds. Use get_query_results with the returned queryId to try again to retrieve query results."
         logger.warning(msg)
         return {
             "queryId": query_id,
             "status": "Polling Timeout",
+            "range": queried_range,
             "message": msg,
         }
 
@@ -750,8 +1674,377 @@ async def run_transaction_search(
         raise
 
 
+# Tasks stopping queries whose start was cancelled, referenced until done
+_query_stoppers: set = set()
+
+
+async def stop_started_query(logs_client, start_task: asyncio.Future) -> None:
+    """Stop the query of a start_query call whose caller was cancelled while it ran."""
+    try:
+        query_id = (await start_task)["queryId"]
+    except Exception:
+        return
+    await asyncio.to_thread(stop_query, logs_client, query_id)
+
+
+def stop_query(logs_client, query_id: str) -> None:
+    """Stop a Logs Insights query whose results are no longer wanted. Runs synchronously."""
+    try:
+        with deadlines.suspended():
+            logs_client.stop_query(queryId=query_id)
+        trace.get_current_span().set_attribute("logs.query.stopped", True)
+        logger.info(f"Stopped query {query_id}")
+    except Exception as e:
+        # The query may have finished in the meantime
+        logger.warning(f"Failed to stop query {query_id}: {str(e)}")
+
+
+def record_budget_snapshots(budget_reports: list) -> None:
+    """Add budget reports to the local SLO store, for get_slo_budget_trend."""
+    store = slo_store()
+    if store is None:
+        return
+    try:
+        store.record_budget_reports(budget_reports)
+    except Exception as e:
+        # The store is an optimization; SLI status does not depend on it
+        logger.warning(f"Failed to record SLO budget snapshots: {str(e)}")
+
+
 @mcp.tool()
-async def get_sli_status(hours: int = 24) -> str:
+async def ingest_spans(path: str) -> str:
+    """Load span data from a file into the local span store, for query_local_spans.
+
+    Accepts:
+    - `aws logs filter-log-events --log-group-name aws/spans ...` output, or one span JSON per line
+    - Logs Insights result rows (for example run_transaction_search results saved as JSON)
+    - OpenTelemetry console exporter output and src/spans.log style span dumps
+
+    Spans already in the store (same traceId and spanId) are skipped.
+
+    Args:
+        path: Path of the file to ingest, on the machine running this server
+    """
+    from src.spanstore import span_store
+
+    try:
+        start = timer()
+        added, skipped = await asyncio.to_thread(span_store().ingest_file, path)
+        table = span_store().table()
+        return (
+            f"Ingested {added} spans from {path} ({skipped} already present) in {timer() - start:.1f}s. "
+            f"The store now holds {table.rows} spans with {len(table.columns)} fields."
+        )
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+async def query_local_spans(query: str, start_time: str = "", end_time: str = "", limit: int = 100) -> Dict:
+    """Query spans in the local span store with a Logs Insights-style pipeline, without calling AWS.
+
+    Much faster and free compared to run_transaction_search, but only covers spans loaded with
+    ingest_spans. Field names follow the aws/spans log group, e.g. `attributes.aws.local.service`,
+    `durationNano`, `status.code`, `name`, `traceId`; `@timestamp` is the span start in Unix seconds.
+
+    Commands, separated by `|`:
+    - filter <condition>: comparisons (=, !=, <, <=, >, >=), `like "text"` or `like /regex/i`,
+      `in ["a", "b"]`, `ispresent(field)`, combined with and / or / not and parentheses
+    - stats <aggregates> [by <fields>]: count(*), count(field), count_distinct, sum, avg, min, max,
+      pct(field, 99); group by fields and/or bin(5m)
+    - sort <field> [asc|desc], fields <a, b>, limit <n>
+
+    ```
+    filter attributes.aws.local.service = "checkout" and status.code = "ERROR"
+    | stats count(*) as errors, pct(durationNano, 99) by name, bin(1h)
+    | sort errors desc
+    ```
+
+    Args:
+        query: The query pipeline
+        start_time: Only spans starting at or after this ISO time
+        end_time: Only spans starting at or before this ISO time
+        limit: Maximum number of rows to return (default 100)
+
+    Returns:
+        A dictionary with the result rows, the number of spans matched and scanned, and the query time
+    """
+    from src.spanstore import run_query, span_store
+
+    try:
+        start = timer()
+        result = await asyncio.to_thread(
+            run_query,
+            span_store().table(),
+            query,
+            datetime.fromisoformat(start_time).timestamp() if start_time else None,
+            datetime.fromisoformat(end_time).timestamp() if end_time else None,
+            limit,
+        )
+        return {
+            "status": "Complete",
+            "results": result.results,
+            "statistics": {
+                "recordsMatched": result.matched,
+                "recordsScanned": result.scanned,
+                "elapsedMs": round((timer() - start) * 1000, 1),
+            },
+        }
+    except Exception as e:
+        return {"status": "Failed", "message": str(e)}
+
+
+@mcp.tool()
+async def get_recent_tool_calls(minutes: int = 15, limit: int = 10, tool_name: str = "") -> str:
+    """Summarize this server's own recent tool calls from its local trace buffer, without calling AWS.
+
+    Use this to find out which tools have been slow or failing, e.g. before retrying a call that
+    timed out. Only covers this server's spans, kept in a fixed-size ring buffer file, so older
+    calls are gone once it wraps.
+
+    Args:
+        minutes: How far back to look (default 15)
+        limit: Number of slowest calls and errors to list (default 10)
+        tool_name: Only include calls of this tool
+
+    Returns:
+        Calls, errors and latency per tool, the slowest calls and the most recent errors, with
+        their UTC start times and trace IDs
+    """
+    if not SPAN_RING_PATH:
+        return "Error: The span ring buffer is disabled (set APPSIGNALS_SPAN_RING to enable it)."
+    try:
+        spans = await asyncio.to_thread(RingBufferReader(SPAN_RING_PATH).recent, minutes, "server.tool.call")
+    except Exception as e:
+        return f"Error: {str(e)}"
+    if tool_name:
+        spans = [span for span in spans if span.get("attributes", {}).get("tool.name") == tool_name]
+    if not spans:
+        return f"No tool calls recorded in the last {minutes} minutes."
+
+    def describe(span: dict) -> str:
+        started = datetime.fromtimestamp(span["start"] / 1e9, timezone.utc).strftime("%H:%M:%S")
+        return (
+            f"{started} {span.get('attributes', {}).get('tool.name', 'unknown')} "
+            f"{span['duration_ns'] / 1e6:.0f}ms trace {span['trace_id']}"
+        )
+
+    result = f"Tool calls in the last {minutes} minutes: {len(spans)}\n\n"
+    result += "Per tool (slowest p95 first):\n"
+    for stats in tool_call_stats(spans):
+        result += (
+            f"• {stats['tool']}: {stats['calls']} calls, {stats['errors']} errors, "
+            f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms, max {stats['max_ms']:.0f}ms\n"
+        )
+
+    result += "\nSlowest calls:\n"
+    for span in sorted(spans, key=lambda span: span["duration_ns"], reverse=True)[:limit]:
+        result += f"• {describe(span)}\n"
+
+    errors = [span for span in spans if span["status"] == "ERROR"]
+    if errors:
+        result += "\nMost recent errors:\n"
+        for span in reversed(errors[-limit:]):
+            result += f"• {describe(span)}: {span.get('error', 'error')}\n"
+    return result
+
+
+def service_budget_reports(appsignals, key_attributes: dict, end_time: datetime) -> Tuple[list, list]:
+    """List a service's SLOs and fetch their budget reports, recording them in the local SLO store.
+
+    Returns:
+        The SLO summaries and their budget reports
+    """
+    slo_summaries = []
+    next_token = None
+    while True:
+        kwargs = {"KeyAttributes": key_attributes, "MaxResults": 50}
+        if next_token:
+            kwargs["NextToken"] = next_token
+        deadlines.checkpoint()
+        response = appsignals.list_service_level_objectives(**kwargs)
+        slo_summaries.extend(response.get("SloSummaries", []))
+        next_token = response.get("NextToken")
+        if not next_token:
+            break
+
+    # The budget report API accepts at most 50 SLOs per call
+    budget_reports = []
+    slo_arns = [slo["Arn"] for slo in slo_summaries]
+    for i in range(0, len(slo_arns), 50):
+        deadlines.checkpoint()
+        response = appsignals.batch_get_service_level_objective_budget_report(
+            Timestamp=end_time, SloIds=slo_arns[i : i + 50]
+        )
+        budget_reports.extend(response.get("Reports", []))
+
+    record_budget_snapshots(budget_reports)
+    return slo_summaries, budget_reports
+
+
+def service_sli_report(appsignals, key_attributes: dict, end_time: datetime) -> dict:
+    """Summarize the SLO budget status of one service.
+
+    Returns:
+        Counts and names of breached and healthy SLOs plus the overall status
+    """
+    slo_summaries, budget_reports = service_budget_reports(appsignals, key_attributes, end_time)
+    if not slo_summaries:
+        return {"SliStatus": "INSUFFICIENT_DATA", "BreachedSloNames": [], "OkSloCount": 0, "TotalSloCount": 0}
+
+    breached_names = [r.get("Name", r.get("Arn")) for r in budget_reports if r.get("BudgetStatus") == "BREACHED"]
+    ok_count = sum(1 for r in budget_reports if r.get("BudgetStatus") in ("OK", "WARNING"))
+    if breached_names:
+        status = "BREACHED"
+    elif ok_count:
+        status = "OK"
+    else:
+        status = "INSUFFICIENT_DATA"
+    return {
+        "SliStatus": status,
+        "BreachedSloNames": breached_names,
+        "OkSloCount": ok_count,
+        "TotalSloCount": len(slo_summaries),
+    }
+
+
+def collect_sli_status(hours: int, target: Target = Target()) -> dict:
+    """List services and compute an SLI report for each of them.
+
+    Runs synchronously; call it from a worker thread.
+
+    Returns:
+        Dictionary with the time range, the service summaries and one report per service
+    """
+    # Calculate time range
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(hours=hours)
+
+    # Initialize AWS Application Signals client
+    appsignals = get_client("application-signals", target.region, target.account)
+
+    # Get all services (AWS API expects Unix timestamps as integers)
+    services = list_services(target, int(start_time.timestamp()), int(end_time.timestamp()))
+
+    # Get SLI reports for each service
+    reports = []
+    for service in services:
+        # Stop between services once the request is cancelled or out of time
+        deadlines.checkpoint()
+        service_name = service["KeyAttributes"].get("Name", "Unknown")
+        try:
+            sli_report = service_sli_report(appsignals, service["KeyAttributes"], end_time)
+            report = {
+                "BreachedSloCount": len(sli_report["BreachedSloNames"]),
+                "BreachedSloNames": sli_report["BreachedSloNames"],
+                "EndTime": end_time.timestamp(),
+                "OkSloCount": sli_report["OkSloCount"],
+                "ReferenceId": {"KeyAttributes": service["KeyAttributes"]},
+                "SliStatus": sli_report["SliStatus"],
+                "StartTime": start_time.timestamp(),
+                "TotalSloCount": sli_report["TotalSloCount"],
+            }
+            reports.append(report)
+
+        except deadlines.RequestAborted:
+            raise
+        except Exception as e:
+            # Log error but continue with other services
+            logger.warning(f"Failed to get SLI report for service {service_name}: {str(e)}")
+            # Add a report with insufficient data status
+            report = {
+                "BreachedSloCount": 0,
+                "BreachedSloNames": [],
+                "EndTime": end_time.timestamp(),
+                "OkSloCount": 0,
+                "ReferenceId": {"KeyAttributes": service["KeyAttributes"]},
+                "SliStatus": "INSUFFICIENT_DATA",
+                "StartTime": start_time.timestamp(),
+                "TotalSloCount": 0,
+            }
+            reports.append(report)
+
+    return {"start_time": start_time, "end_time": end_time, "services": services, "reports": reports}
+
+
+def report_label(report: dict) -> str:
+    """Service name of an SLI report, tagged with its region/account when fanned out."""
+    name = report["ReferenceId"]["KeyAttributes"]["Name"]
+    return f"{name} [{report['Origin']}]" if "Origin" in report else name
+
+
+def format_sli_status(hours: int, status: dict) -> str:
+    """Render the SLI status report produced by collect_sli_status."""
+    reports = status["reports"]
+    start_time = status["start_time"]
+    end_time = status["end_time"]
+    if not reports:
+        return "No services found in Application Signals."
+
+    # Build response
+    result = f"SLI Status Report - Last {hours} hours\n"
+    result += f"Time Range: {start_time.strftime('%Y-%m-%d %H:%M')} - {end_time.strftime('%Y-%m-%d %H:%M')}\n\n"
+
+    # Count by status
+    status_counts = {
+        "OK": sum(1 for r in reports if r["SliStatus"] == "OK"),
+        "BREACHED": sum(1 for r in reports if r["SliStatus"] == "BREACHED"),
+        "INSUFFICIENT_DATA": sum(1 for r in reports if r["SliStatus"] == "INSUFFICIENT_DATA"),
+    }
+
+    result += "Summary:\n"
+    result += f"• Total Services: {len(reports)}\n"
+    result += f"• Healthy (OK): {status_counts['OK']}\n"
+    result += f"• Breached: {status_counts['BREACHED']}\n"
+    result += f"• Insufficient Data: {status_counts['INSUFFICIENT_DATA']}\n\n"
+
+    # Group by status
+    if status_counts["BREACHED"] > 0:
+        result += "⚠️  BREACHED SERVICES:\n"
+        for report in reports:
+            if report["SliStatus"] == "BREACHED":
+                name = report_label(report)
+                env = report["ReferenceId"]["KeyAttributes"]["Environment"]
+                breached_count = report["BreachedSloCount"]
+                total_count = report["TotalSloCount"]
+                breached_names = report["BreachedSloNames"]
+
+                result += f"\n• {name} ({env})\n"
+                result += f"  SLOs: {breached_count}/{total_count} breached\n"
+                if breached_names:
+                    result += "  Breached SLOs:\n"
+                    for slo_name in breached_names:
+                        result += f"    - {slo_name}\n"
+
+    if status_counts["OK"] > 0:
+        result += "\n✅ HEALTHY SERVICES:\n"
+        for report in reports:
+            if report["SliStatus"] == "OK":
+                name = report_label(report)
+                env = report["ReferenceId"]["KeyAttributes"]["Environment"]
+                ok_count = report["OkSloCount"]
+
+                result += f"• {name} ({env}) - {ok_count} SLO(s) healthy\n"
+
+    if status_counts["INSUFFICIENT_DATA"] > 0:
+        result += "\n❓ INSUFFICIENT DATA:\n"
+        for report in reports:
+            if report["SliStatus"] == "INSUFFICIENT_DATA":
+                name = report_label(report)
+                env = report["ReferenceId"]["KeyAttributes"]["Environment"]
+
+                result += f"• {name} ({env})\n"
+
+    # Remove the auto-investigation feature
+
+    return result
+
+
+@mcp.tool()
+@cached_tool(ttl=60, bypass="force_refresh", cache_if=is_cacheable_sli_status)
+async def get_sli_status(
+    hours: int = 24, force_refresh: bool = False, regions: str = "", accounts: str = ""
+) -> str:
     """Get SLI (Service Level Indicator) status and SLO compliance for all services.
 
     Use this tool to:
@@ -791,137 +2084,45 @@ async def get_sli_status(hours: int = 24) -> str:
     5. Analyze the root causes from Exception data in trace
     6. Include findings in the report and give the fix and mitigation suggestions.
 
+    When the server runs a background refresher, the report comes from its latest
+    snapshot and states the snapshot's age. Set force_refresh to recompute it now.
+
     Args:
         hours: Number of hours to look back (default 24, typically use 24 for daily checks)
+        force_refresh: Recompute the report instead of using a cached or background snapshot
+        regions: Comma-separated AWS regions to query concurrently (default: us-east-1)
+        accounts: Comma-separated account ids or role ARNs to query through an assumed role
     """
     try:
-        # Calculate time range
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(hours=hours)
-
-        # Initialize AWS Application Signals client
-        appsignals = boto3.client("application-signals", region_name="us-east-1")
-
-        # Get all services (AWS API expects Unix timestamps as integers)
-        services_response = appsignals.list_services(
-            StartTime=int(start_time.timestamp()), EndTime=int(end_time.timestamp()), MaxResults=100
-        )
-        services = services_response.get("ServiceSummaries", [])
-
-        if not services:
-            return "No services found in Application Signals."
-
-        # Get SLI reports for each service
-        reports = []
-        for service in services:
-            try:
-                # Create config for this service
-                service_name = service["KeyAttributes"].get("Name", "Unknown")
-
-                # Create custom config with the service's key attributes
-                config = AWSConfig(region="us-east-1", period_in_hours=hours, service_name=service_name)
-                # Override key_attributes to use the actual service attributes
-                config._key_attributes = service["KeyAttributes"]
-
-                # Add a property to return custom key attributes
-                type(config).key_attributes = property(lambda self: self._key_attributes)
-
-                # Generate SLI report
-                client = SLIReportClient(config)
-                sli_report = client.generate_sli_report()
-
-                # Convert to expected format
-                report = {
-                    "BreachedSloCount": sli_report.breached_slo_count,
-                    "BreachedSloNames": sli_report.breached_slo_names,
-                    "EndTime": sli_report.end_time.timestamp(),
-                    "OkSloCount": sli_report.ok_slo_count,
-                    "ReferenceId": {"KeyAttributes": service["KeyAttributes"]},
-                    "SliStatus": "BREACHED" if sli_report.sli_status == "CRITICAL" else sli_report.sli_status,
-                    "StartTime": sli_report.start_time.timestamp(),
-                    "TotalSloCount": sli_report.total_slo_count,
-                }
-                reports.append(report)
-
-            except Exception as e:
-                # Log error but continue with other services
-                logger.warning(f"Failed to get SLI report for service {service_name}: {str(e)}")
-                # Add a report with insufficient data status
-                report = {
-                    "BreachedSloCount": 0,
-                    "BreachedSloNames": [],
-                    "EndTime": end_time.timestamp(),
-                    "OkSloCount": 0,
-                    "ReferenceId": {"KeyAttributes": service["KeyAttributes"]},
-                    "SliStatus": "INSUFFICIENT_DATA",
-                    "StartTime": start_time.timestamp(),
-                    "TotalSloCount": 0,
-                }
-                reports.append(report)
-
-        # Build response
-        result = f"SLI Status Report - Last {hours} hours\n"
-        result += f"Time Range: {start_time.strftime('%Y-%m-%d %H:%M')} - {end_time.strftime('%Y-%m-%d %H:%M')}\n\n"
-
-        # Count by status
-        status_counts = {
-            "OK": sum(1 for r in reports if r["SliStatus"] == "OK"),
-            "BREACHED": sum(1 for r in reports if r["SliStatus"] == "BREACHED"),
-            "INSUFFICIENT_DATA": sum(1 for r in reports if r["SliStatus"] == "INSUFFICIENT_DATA"),
-        }
+        if regions or accounts:
+            results = await fan_out(parse_targets(regions, accounts), lambda target: collect_sli_status(hours, target))
+            succeeded = [r for r in results if r.error is None]
+            if not succeeded:
+                return "Error getting SLI status:\n" + format_fan_out_summary(results)
+            merged = {
+                "start_time": min(r.value["start_time"] for r in succeeded),
+                "end_time": max(r.value["end_time"] for r in succeeded),
+                "services": [dict(svc, Origin=r.target.label) for r in succeeded for svc in r.value["services"]],
+                "reports": [dict(rep, Origin=r.target.label) for r in succeeded for rep in r.value["reports"]],
+            }
+            return format_sli_status(hours, merged) + "\n" + format_fan_out_summary(results)
 
-        result += "Summary:\n"
-        result += f"• Total Services: {len(reports)}\n"
-        result += f"• Healthy (OK): {status_counts['OK']}\n"
-        result += f"• Breached: {status_counts['BREACHED']}\n"
-        result += f"• Insufficient Data: {status_counts['INSUFFICIENT_DATA']}\n\n"
-
-        # Group by status
-        if status_counts["BREACHED"] > 0:
-            result += "⚠️  BREACHED SERVICES:\n"
-            for report in reports:
-                if report["SliStatus"] == "BREACHED":
-                    name = report["ReferenceId"]["KeyAttributes"]["Name"]
-                    env = report["ReferenceId"]["KeyAttributes"]["Environment"]
-                    breached_count = report["BreachedSloCount"]
-                    total_count = report["TotalSloCount"]
-                    breached_names = report["BreachedSloNames"]
-
-                    result += f"\n• {name} ({env})\n"
-                    result += f"  SLOs: {breached_count}/{total_count} breached\n"
-                    if breached_names:
-                        result += "  Breached SLOs:\n"
-                        for slo_name in breached_names:
-                            result += f"    - {slo_name}\n"
-
-        if status_counts["OK"] > 0:
-            result += "\n✅ HEALTHY SERVICES:\n"
-            for report in reports:
-                if report["SliStatus"] == "OK":
-                    name = report["ReferenceId"]["KeyAttributes"]["Name"]
-                    env = report["ReferenceId"]["KeyAttributes"]["Environment"]
-                    ok_count = report["OkSloCount"]
-
-                    result += f"• {name} ({env}) - {ok_count} SLO(s) healthy\n"
-
-        if status_counts["INSUFFICIENT_DATA"] > 0:
-            result += "\n❓ INSUFFICIENT DATA:\n"
-            for report in reports:
-                if report["SliStatus"] == "INSUFFICIENT_DATA":
-                    name = report["ReferenceId"]["KeyAttributes"]["Name"]
-                    env = report["ReferenceId"]["KeyAttributes"]["Environment"]
-
-                    result += f"• {name} ({env})\n"
-
-        # Remove the auto-investigation feature
+        if sli_refresher is not None and hours == SLI_REFRESH_HOURS:
+            snapshot = await (sli_refresher.refresh() if force_refresh else sli_refresher.get())
+            header = (
+                f"Snapshot v{snapshot.version} taken at {snapshot.taken_at.strftime('%Y-%m-%d %H:%M:%S')} UTC "
+                f"({snapshot.age_seconds:.0f}s ago)\n"
+            )
+            return header + format_sli_status(hours, snapshot.value)
 
-        return result
+        return format_sli_status(hours, await asyncio.to_thread(collect_sli_status, hours))
 
     except Exception as e:
         return f"Error getting SLI status: {str(e)}"
 
 
 @mcp.tool()
+@cached_tool(ttl=30, cache_if=is_cacheable_result)
 async def query_xray_traces(
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
@@ -975,7 +2176,7 @@ async def query_xray_traces(
         JSON string containing trace summaries with error status, duration, and service details
     """
     try:
-        xray_client = boto3.client("xray", region_name=region)
+        xray_client = get_client("xray", region)
 
         # Default to past 3 hours if times not provided
         if not end_time:
@@ -1000,7 +2201,8 @@ async def query_xray_traces(
             )
 
         # Use pagination helper with a reasonable limit
-        traces = get_trace_summaries_paginated(
+        traces, pagination_error = await asyncio.to_thread(
+            get_trace_summaries_paginated,
             xray_client,
             start_datetime,
             end_datetime,
@@ -1060,6 +2262,8 @@ async def query_xray_traces(
             "TraceCount": len(trace_summaries),
             "Message": f"Retrieved {len(trace_summaries)} traces (limited to prevent size issues)",
         }
+        if pagination_error:
+            result_data["Incomplete"] = f"Stopped after {len(trace_summaries)} traces: {pagination_error}"
 
         return json.dumps(result_data, indent=2)
 
@@ -1067,6 +2271,61 @@ async def query_xray_traces(
         return json.dumps({"error": str(e)}, indent=2)
 
 
+def create_app():
+    """ASGI application factory for the HTTP transports.
+
+    Each uvicorn worker process imports this module and calls the factory, so
+    AWS clients, tool caches and instrumentation are set up once per worker
+    and shared by every session that worker serves.
+    """
+    if os.environ.get("MCP_TRANSPORT") == "sse":
+        return mcp.sse_app()
+    return mcp.streamable_http_app()
+
+
+def serve_http(transport: str, host: str, port: int, workers: int) -> None:
+    """Serve the MCP server over streamable HTTP or SSE with one or more worker processes."""
+    import uvicorn
+
+    if transport == "sse" and workers > 1:
+        # SSE keeps each session's message stream in the process that opened it
+        logger.warning("SSE sessions cannot be shared between workers; running a single worker")
+        workers = 1
+
+    os.environ["MCP_TRANSPORT"] = transport
+    if workers == 1:
+        uvicorn.run(create_app(), host=host, port=port)
+        return
+
+    # Requests of one session may land on any worker, so no session state may
+    # live in a worker. FastMCP reads this setting when each worker builds the server.
+    os.environ["FASTMCP_STATELESS_HTTP"] = "true"
+    uvicorn.run(
+        "mcpserver:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AWS Application Signals MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http", "sse"],
+        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MCP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("MCP_WORKERS", "1")))
+    args = parser.parse_args()
+
     # Initialize and run the server
-    mcp.run(transport="stdio")
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        serve_http(args.transport, args.host, args.port, args.workers)
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from . import awsretry
+
+T = TypeVar("T")
+
+DEFAULT_REGION = "us-east-1"
+
+# Role assumed in other accounts when an account id rather than a role ARN is given
+CROSS_ACCOUNT_ROLE_NAME = os.environ.get("APPSIGNALS_CROSS_ACCOUNT_ROLE", "ApplicationSignalsReadOnly")
+
+# Refresh assumed-role credentials this long before they expire
+_CREDENTIAL_REFRESH_MARGIN = timedelta(minutes=5)
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str], Any] = {}
+# Clients in other accounts, with the assumed-role session they were made from
+_role_clients: Dict[Tuple[str, str, str], Tuple[Any, Any]] = {}
+_sessions: Dict[str, Tuple[Any, datetime]] = {}
+# Serializes assuming each role, without holding up clients of other roles
+_role_locks: Dict[str, threading.Lock] = {}
+_default_identity: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Target:
+    """A region, optionally in another account, to run a query against."""
+
+    region: str = DEFAULT_REGION
+    account: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.region}/{self.account}" if self.account else self.region
+
+
+@dataclass(slots=True)
+class FanOutResult:
+    target: Target
+    value: Any = None
+    error: Optional[str] = None
+    latency: float = 0.0
+
+
+def role_arn_for(account: Optional[str]) -> Optional[str]:
+    """Accept either a role ARN or an account id, in which case the cross-account role name is used."""
+    if not account:
+        return None
+    if account.startswith("arn:"):
+        return account
+    return f"arn:aws:iam::{account}:role/{CROSS_ACCOUNT_ROLE_NAME}"
+
+
+def get_client(service: str, region: str = DEFAULT_REGION, account: Optional[str] = None) -> Any:
+    """Return a pooled boto3 client; clients are thread-safe and reused across tool calls.
+
+    boto3 is imported on first use rather than at server start-up.
+    """
+    import boto3
+
+    role_arn = role_arn_for(account)
+    if role_arn is None:
+        with _lock:
+            client = _clients.get((service, region))
+            if client is None:
+                client = _clients[(service, region)] = _new_client(boto3, service, region)
+            return client
+
+    session = _assumed_role_session(role_arn)
+    key = (service, region, role_arn)
+    with _lock:
+        # A client made before the role's credentials were refreshed still holds the old ones
+        pooled = _role_clients.get(key)
+        if pooled is None or pooled[0] is not session:
+            pooled = _role_clients[key] = (session, _new_client(session, service, region, account))
+        return pooled[1]
+
+
+def _new_client(session: Any, service: str, region: str, account: Optional[str] = None) -> Any:
+    """Create a client whose calls are retried, rate limited and circuit broken by ``awsretry``."""
+    from botocore.config import Config
+
+    # botocore's own retries are disabled so that they do not multiply ours
+    client = session.client(
+        service, region_name=region, config=Config(retries={"mode": "standard", "total_max_attempts": 1})
+    )
+    awsretry.install(client, Target(region, account).label)
+    return client
+
+
+def caller_identity(account: Optional[str] = None) -> str:
+    """The identity queries for an account are made as.
+
+    That is the role assumed for the account, or for the default credentials
+    the ARN STS reports for them (without the session name of an assumed role),
+    looked up once per process.
+    """
+    global _default_identity
+    role_arn = role_arn_for(account)
+    if role_arn is not None:
+        return role_arn
+    if _default_identity is None:
+        arn = get_client("sts").get_caller_identity()["Arn"]
+        if ":assumed-role/" in arn:
+            arn = arn.rsplit("/", 1)[0]
+        _default_identity = arn
+    return _default_identity
+
+
+def caller_account(account: Optional[str] = None) -> str:
+    """The id of the account queries for ``account`` run in; see ``caller_identity``."""
+    if account and not account.startswith("arn:"):
+        return account
+    return caller_identity(account).split(":")[4]
+
+
+def prewarm(services: List[str], region: str = DEFAULT_REGION) -> threading.Thread:
+    """Import boto3 and create the default clients on a background thread.
+
+    Called once the server is up, so the first tool call does not pay for it
+    while start-up does not wait for it either.
+    """
+
+    def warm() -> None:
+        for service in services:
+            try:
+                get_client(service, region)
+            except Exception:
+                # The tool call that needs the client will report the error
+                pass
+
+    thread = threading.Thread(target=warm, name="prewarm-aws-clients", daemon=True)
+    thread.start()
+    return thread
+
+
+def _assumed_role_session(role_arn: str) -> Any:
+    """Return a session for the role, assuming it again when the credentials are about to expire.
+
+    The STS call is made holding only the role's own lock, so other roles and
+    default clients are not held up by it.
+    """
+    import boto3
+
+    with _lock:
+        role_lock = _role_locks.setdefault(role_arn, threading.Lock())
+    with role_lock:
+        cached = _sessions.get(role_arn)
+        if cached is not None and cached[1] - _CREDENTIAL_REFRESH_MARGIN > datetime.now(timezone.utc):
+            return cached[0]
+
+        sts = get_client("sts")
+        credentials = sts.assume_role(RoleArn=role_arn, RoleSessionName="appsignals-mcp")["Credentials"]
+        session = boto3.Session(
+            aws_access_key_id=credentials["AccessKeyId"],
+            aws_secret_access_key=credentials["SecretAccessKey"],
+            aws_session_token=credentials["SessionToken"],
+        )
+        _sessions[role_arn] = (session, credentials["Expiration"])
+        return session
+
+
+def parse_targets(regions: str = "", accounts: str = "") -> List[Target]:
+    """Build the region x account targets from comma-separated lists."""
+    region_list = [r.strip() for r in regions.split(",") if r.strip()] or [DEFAULT_REGION]
+    account_list: List[Optional[str]] = [a.strip() for a in accounts.split(",") if a.strip()] or [None]
+    return [Target(region, account) for account in account_list for region in region_list]
+
+
+async def fan_out(targets: List[Target], fn: Callable[[Target], T]) -> List[FanOutResult]:
+    """Run a blocking query once per target on worker threads, concurrently.
+
+    A failing target does not fail the others; its error is reported in its result.
+    """
+
+    async def run(target: Target) -> FanOutResult:
+        start = perf_counter()
+        try:
+            value = await asyncio.to_thread(fn, target)
+            return FanOutResult(target, value=value, latency=perf_counter() - start)
+        except Exception as e:
+            return FanOutResult(target, error=str(e), latency=perf_counter() - start)
+
+    return list(await asyncio.gather(*(run(target) for target in targets)))
+
+
+def format_fan_out_summary(results: List[FanOutResult]) -> str:
+    result = "Query Summary:\n"
+    for r in results:
+        status = "OK" if r.error is None else f"FAILED - {r.error}"
+        result += f"• {r.target.label}: {r.latency:.2f}s {status}\n"
+    return result
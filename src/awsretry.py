@@ -0,0 +1,288 @@
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from time import monotonic, sleep
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from opentelemetry import metrics, trace
+
+from . import deadlines
+
+# Attempts per call, including the first. botocore's own retries are turned
+# off for pooled clients so that these are the only ones.
+MAX_ATTEMPTS = int(os.environ.get("APPSIGNALS_AWS_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 10.0
+
+# Consecutive failed calls after which an API is not called for the cool-down
+BREAKER_THRESHOLD = int(os.environ.get("APPSIGNALS_AWS_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("APPSIGNALS_AWS_BREAKER_COOLDOWN", "30"))
+
+# Requests per second an API may not go below, and above which it is no longer limited
+MIN_RATE = 1.0
+MAX_RATE = 100.0
+RATE_INCREASE = 0.1
+
+THROTTLE_CODES = frozenset(
+    {
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottledException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "LimitExceededException",
+        "SlowDown",
+    }
+)
+TRANSIENT_CODES = frozenset(
+    {
+        "RequestTimeout",
+        "RequestTimeoutException",
+        "InternalError",
+        "InternalFailure",
+        "InternalServerError",
+        "ServiceUnavailable",
+        "ServiceUnavailableException",
+    }
+)
+
+ApiKey = Tuple[str, str, str]
+
+
+class CircuitOpenError(Exception):
+    """An API failed repeatedly and is not being called until its cool-down has passed."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side token bucket for one API, shared by every thread calling it.
+
+    It does not limit anything until the API first throttles. The rate is
+    then halved on every throttle and raised a little on every success, and
+    the limit is dropped again once the rate climbs past ``MAX_RATE``.
+    """
+
+    def __init__(self) -> None:
+        self.rate: Optional[float] = None
+        self._tokens = 0.0
+        self._updated = monotonic()
+        self._sends: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Wait for a token and return how long that took."""
+        with self._lock:
+            now = monotonic()
+            self._sends.append(now)
+            while self._sends[0] < now - 1:
+                self._sends.popleft()
+            if self.rate is None:
+                return 0.0
+            self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Going into debt queues concurrent callers one token-interval apart
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            left = deadlines.remaining()
+            if left is not None and left < wait:
+                raise deadlines.DeadlineExceeded("Request deadline exceeded waiting for the AWS rate limit")
+            sleep(wait)
+        return wait
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            # Start from the rate calls were actually being sent at
+            current = self.rate if self.rate is not None else max(float(len(self._sends)), 2 * MIN_RATE)
+            self.rate = max(current / 2, MIN_RATE)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self) -> None:
+        if self.rate is None:
+            return
+        with self._lock:
+            if self.rate is not None:
+                self.rate += RATE_INCREASE
+                if self.rate > MAX_RATE:
+                    self.rate = None
+
+
+class CircuitBreaker:
+    """
+    Fail fast on an API that keeps failing.
+
+    After ``threshold`` consecutive failed calls the breaker opens and calls
+    are rejected. Once ``cooldown`` has passed one trial call is let through:
+    its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._half_open = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Let this call through as the trial; the others wait another
+            # cool-down, which also covers a trial that never reports back.
+            self.opened_at = monotonic()
+            self._half_open = True
+            return True
+
+    def retry_after(self) -> float:
+        opened_at = self.opened_at
+        return 0.0 if opened_at is None else max(self.cooldown - (monotonic() - opened_at), 0.0)
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._half_open = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._half_open or self.failures >= self.threshold:
+                self.opened_at = monotonic()
+                self._half_open = False
+
+
+@dataclass(slots=True)
+class _ApiState:
+    limiter: AdaptiveRateLimiter = field(default_factory=AdaptiveRateLimiter)
+    breaker: CircuitBreaker = field(default_factory=lambda: CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN))
+
+
+_lock = threading.Lock()
+_apis: Dict[ApiKey, _ApiState] = {}
+
+_meter = metrics.get_meter(__name__)
+_throttles = _meter.create_counter(
+    "aws.client.throttles", unit="{response}", description="AWS responses that were throttled"
+)
+_retries = _meter.create_counter("aws.client.retries", unit="{request}", description="AWS requests retried")
+_rejections = _meter.create_counter(
+    "aws.client.circuit_rejections", unit="{call}", description="AWS calls rejected by an open circuit breaker"
+)
+_rate_limit_wait = _meter.create_histogram(
+    "aws.client.rate_limit.wait", unit="s", description="Time AWS requests waited for the client-side rate limit"
+)
+
+
+def api_state(service: str, operation: str, scope: str) -> _ApiState:
+    key = (service, operation, scope)
+    state = _apis.get(key)
+    if state is None:
+        with _lock:
+            state = _apis.setdefault(key, _ApiState())
+    return state
+
+
+def install(client: Any, scope: str) -> None:
+    """
+    Send every call made through a boto3 client through the shared rate
+    limiter, retry policy and circuit breaker of its API.
+
+    ``scope`` identifies where the calls go (region, and account if any);
+    APIs are limited separately per scope since AWS throttles them separately.
+    """
+    events = client.meta.events
+    events.register("before-call", partial(_before_call, scope))
+    events.register("before-send", partial(_before_send, scope))
+    events.register("needs-retry", partial(_needs_retry, scope))
+
+
+def _api(event_name: str, scope: str) -> Tuple[_ApiState, Dict[str, str]]:
+    _, service, operation = event_name.split(".", 2)
+    attributes = {"aws.service": service, "aws.operation": operation, "aws.scope": scope}
+    return api_state(service, operation, scope), attributes
+
+
+def _before_call(scope: str, event_name: str, **kwargs: Any) -> None:
+    state, attributes = _api(event_name, scope)
+    if not state.breaker.allow():
+        _rejections.add(1, attributes)
+        trace.get_current_span().add_event("aws.circuit_open", attributes)
+        raise CircuitOpenError(
+            f"{attributes['aws.service']} {attributes['aws.operation']} in {scope} keeps failing; "
+            f"not calling it for another {state.breaker.retry_after():.0f}s"
+        )
+
+
+def _before_send(scope: str, event_name: str, **kwargs: Any) -> None:
+    # Once per attempt, so retries wait for the limiter too
+    deadlines.checkpoint()
+    state, attributes = _api(event_name, scope)
+    waited = state.limiter.acquire()
+    if waited:
+        _rate_limit_wait.record(waited, attributes)
+
+
+def _needs_retry(
+    scope: str,
+    event_name: str,
+    attempts: int,
+    response: Any = None,
+    caught_exception: Optional[BaseException] = None,
+    **kwargs: Any,
+) -> Optional[float]:
+    """Return the delay before retrying an attempt, or None to not retry it."""
+    state, attributes = _api(event_name, scope)
+    if isinstance(caught_exception, deadlines.RequestAborted):
+        return None
+    reason, succeeded = _classify(response, caught_exception)
+    if reason is None:
+        # A client error such as a validation failure still means the API is up
+        state.breaker.success()
+        if succeeded:
+            state.limiter.on_success()
+        return None
+
+    span = trace.get_current_span()
+    if reason == "throttled":
+        state.limiter.on_throttle()
+        _throttles.add(1, attributes)
+        span.add_event("aws.throttled", {**attributes, "aws.attempt": attempts})
+
+    # Full jitter spreads out retries from clients throttled at the same time
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempts - 1)))
+    left = deadlines.remaining()
+    if attempts >= MAX_ATTEMPTS or (left is not None and left < delay):
+        state.breaker.failure()
+        return None
+    _retries.add(1, {**attributes, "aws.retry.reason": reason})
+    span.add_event(
+        "aws.retry", {**attributes, "aws.attempt": attempts, "aws.retry.reason": reason, "aws.retry.delay_s": delay}
+    )
+    return delay
+
+
+def _classify(response: Any, caught_exception: Optional[BaseException]) -> Tuple[Optional[str], bool]:
+    """Return why an attempt should be retried, if it should, and whether it succeeded."""
+    if caught_exception is not None:
+        from botocore.exceptions import ConnectionError, HTTPClientError
+
+        if isinstance(caught_exception, (ConnectionError, HTTPClientError)):
+            return "transient", False
+        return None, False
+    if response is None:
+        return None, False
+    http_response, parsed = response
+    status = http_response.status_code
+    code = parsed.get("Error", {}).get("Code") if isinstance(parsed, dict) else None
+    if status == 429 or code in THROTTLE_CODES:
+        return "throttled", False
+    if status >= 500 or code in TRANSIENT_CODES:
+        return "transient", False
+    return None, status < 400
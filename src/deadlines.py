@@ -0,0 +1,109 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Iterator, Optional
+
+from opentelemetry import context
+
+# Absolute deadline of the current request, on the monotonic clock. Kept in the
+# OpenTelemetry context so that it travels with the trace context through the
+# session's queues and into worker threads.
+_DEADLINE_KEY = context.create_key("mcp-request-deadline")
+
+# Set when the current request is cancelled or runs out of time, so that
+# blocking code running on worker threads can stop at its next checkpoint.
+_abort_event: ContextVar[Optional[threading.Event]] = ContextVar("mcp_request_abort", default=None)
+
+
+class RequestAborted(Exception):
+    """The request a piece of work belongs to was cancelled or ran out of time."""
+
+
+class RequestCancelled(RequestAborted):
+    pass
+
+
+class DeadlineExceeded(RequestAborted, TimeoutError):
+    pass
+
+
+def set_timeout(ctx: context.Context, timeout: float) -> context.Context:
+    """Return ``ctx`` with a deadline ``timeout`` seconds from now, unless it already has an earlier one."""
+    deadline = monotonic() + timeout
+    current = context.get_value(_DEADLINE_KEY, ctx)
+    if current is not None and current <= deadline:
+        return ctx
+    return context.set_value(_DEADLINE_KEY, deadline, ctx)
+
+
+def remaining(ctx: Optional[context.Context] = None) -> Optional[float]:
+    """Seconds left before the current request's deadline, or None if it has none."""
+    deadline = context.get_value(_DEADLINE_KEY, ctx)
+    if deadline is None:
+        return None
+    return deadline - monotonic()
+
+
+@contextmanager
+def deadline(timeout: float) -> Iterator[None]:
+    """Give requests sent inside the block a deadline, propagated to the server as ``_meta.timeoutMs``."""
+    token = context.attach(set_timeout(context.get_current(), timeout))
+    try:
+        yield
+    finally:
+        context.detach(token)
+
+
+@contextmanager
+def abort_scope() -> Iterator[threading.Event]:
+    """
+    Run a request's work with an abort signal that worker threads inherit.
+
+    The signal is set if the block exits with an exception, including the
+    cancellation of the request.
+    """
+    event = threading.Event()
+    token = _abort_event.set(event)
+    try:
+        yield event
+    except BaseException:
+        event.set()
+        raise
+    finally:
+        _abort_event.reset(token)
+
+
+def detach() -> None:
+    """
+    Stop the current task following the request that started it.
+
+    For work shared between requests, such as a coalesced tool call or a
+    background refresh: the request that happened to start it should not
+    abort it or impose its deadline on it. Call it first thing in the task.
+    """
+    _abort_event.set(None)
+    # The task's context is discarded with the task, so the token is not needed.
+    context.attach(context.set_value(_DEADLINE_KEY, None))
+
+
+@contextmanager
+def suspended() -> Iterator[None]:
+    """Run clean-up work, such as stopping a query, even though the request was cancelled or ran out of time."""
+    token = _abort_event.set(None)
+    otel_token = context.attach(context.set_value(_DEADLINE_KEY, None))
+    try:
+        yield
+    finally:
+        context.detach(otel_token)
+        _abort_event.reset(token)
+
+
+def checkpoint() -> None:
+    """Raise if the current request was cancelled or its deadline has passed; for blocking code."""
+    event = _abort_event.get()
+    if event is not None and event.is_set():
+        raise RequestCancelled("Request cancelled")
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
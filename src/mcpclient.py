@@ -0,0 +1,183 @@
+"""
+Client library for driving an MCP server from batch jobs.
+
+``MCPClient`` keeps a pool of long-lived sessions open, each to its own
+server process (stdio) or HTTP connection (streamable HTTP). A session
+sends requests as they come and matches responses by request id, so many
+calls are in flight on one session at once, up to ``max_in_flight``; each
+call goes to the pooled session with the fewest calls in flight.
+
+Every tool call gets a ``client.tool.call`` span. With ``MCPInstrumentor``
+installed, the transport injects that span's context into the request, so
+the server's ``server.tool.call`` span becomes its child.
+"""
+import os
+import sys
+from contextlib import AsyncExitStack, nullcontext
+from dataclasses import dataclass, field
+from datetime import timedelta
+from time import perf_counter
+from typing import Any, AsyncContextManager, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import anyio
+from opentelemetry import trace
+
+from . import deadlines
+from .ringexporter import latency_stats
+
+TOOL_CALL_SPAN = "client.tool.call"
+
+# Opens a transport and yields its streams; extra items (such as the session id
+# callback of streamable HTTP) are ignored
+Transport = Callable[[], AsyncContextManager[Tuple[Any, ...]]]
+
+
+def stdio_transport(
+    args: Sequence[str] = ("mcpserver.py",),
+    command: str = sys.executable,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+) -> Transport:
+    """Start a server process per session and talk to it over stdio."""
+    from mcp import StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(
+        command=command, args=list(args), env={**os.environ, "MCP_TRANSPORT": "stdio", **(env or {})}, cwd=cwd
+    )
+    return lambda: stdio_client(params)
+
+
+def http_transport(url: str, headers: Optional[Dict[str, str]] = None) -> Transport:
+    """Open a streamable HTTP connection per session."""
+    from mcp.client.streamable_http import streamablehttp_client
+
+    return lambda: streamablehttp_client(url, headers=headers)
+
+
+@dataclass(slots=True)
+class _PooledSession:
+    session: Any
+    limiter: anyio.CapacityLimiter
+    in_flight: int = 0
+
+
+@dataclass(slots=True)
+class _ToolStats:
+    durations: List[float] = field(default_factory=list)
+    errors: int = 0
+
+
+class MCPClient:
+    """
+    Pool of MCP sessions with pipelined, traced tool calls.
+
+    Use it as an async context manager; all sessions are opened on entry and
+    closed on exit::
+
+        async with MCPClient(stdio_transport(), sessions=4) as client:
+            results = await client.call_many([("get_sli_status", {"hours": 24})] * 100)
+        print(client.stats())
+    """
+
+    def __init__(self, transport: Transport, sessions: int = 1, max_in_flight: int = 16) -> None:
+        self._transport = transport
+        self._size = sessions
+        self._max_in_flight = max_in_flight
+        self._sessions: List[_PooledSession] = []
+        self._stack: Optional[AsyncExitStack] = None
+        self._stats: Dict[str, _ToolStats] = {}
+        self._tracer = trace.get_tracer("mcp.client")
+
+    async def __aenter__(self) -> "MCPClient":
+        from mcp import ClientSession
+
+        self._stack = AsyncExitStack()
+        try:
+            for _ in range(self._size):
+                streams = await self._stack.enter_async_context(self._transport())
+                session = await self._stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                await session.initialize()
+                self._sessions.append(_PooledSession(session, anyio.CapacityLimiter(self._max_in_flight)))
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self._sessions.clear()
+        if self._stack is not None:
+            await self._stack.aclose()
+            self._stack = None
+
+    def _pick(self) -> _PooledSession:
+        if not self._sessions:
+            raise RuntimeError("MCPClient is not open")
+        return min(self._sessions, key=lambda pooled: pooled.in_flight)
+
+    async def list_tools(self) -> List[Any]:
+        result = await self._pick().session.list_tools()
+        return result.tools
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Call a tool on the least busy session and return its ``CallToolResult``.
+
+        ``timeout`` is sent to the server as the request deadline; the call
+        also stops waiting for the response once it has passed.
+        """
+        pooled = self._pick()
+        pooled.in_flight += 1
+        stats = self._stats.setdefault(name, _ToolStats())
+        try:
+            with self._tracer.start_as_current_span(TOOL_CALL_SPAN, kind=trace.SpanKind.CLIENT) as span:
+                span.set_attribute("tool.name", name)
+                span.set_attribute("client_side", True)
+                async with pooled.limiter:
+                    start = perf_counter()
+                    try:
+                        with deadlines.deadline(timeout) if timeout is not None else nullcontext():
+                            result = await pooled.session.call_tool(
+                                name, arguments or {}, None if timeout is None else timedelta(seconds=timeout)
+                            )
+                    except BaseException:
+                        stats.errors += 1
+                        raise
+                    finally:
+                        stats.durations.append(perf_counter() - start)
+                if result.isError:
+                    stats.errors += 1
+                    span.set_status(trace.Status(trace.StatusCode.ERROR, "Tool returned an error"))
+                return result
+        finally:
+            pooled.in_flight -= 1
+
+    async def call_many(
+        self, calls: Iterable[Tuple[str, Optional[Dict[str, Any]]]], timeout: Optional[float] = None
+    ) -> List[Any]:
+        """
+        Make many tool calls concurrently and return their results in order.
+
+        A call that raises is returned as its exception rather than stopping
+        the others.
+        """
+        calls = list(calls)
+        results: List[Any] = [None] * len(calls)
+
+        async def run(index: int, name: str, arguments: Optional[Dict[str, Any]]) -> None:
+            try:
+                results[index] = await self.call_tool(name, arguments, timeout)
+            except Exception as e:
+                results[index] = e
+
+        async with anyio.create_task_group() as group:
+            for index, (name, arguments) in enumerate(calls):
+                group.start_soon(run, index, name, arguments)
+        return results
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Calls, errors and latency (ms) per tool made through this client, slowest p95 first."""
+        return latency_stats(
+            {name: [d * 1000 for d in stats.durations] for name, stats in self._stats.items()},
+            {name: stats.errors for name, stats in self._stats.items()},
+        )
@@ -1,136 +1,551 @@
-from contextlib import asynccontextmanager
+import dataclasses
+import heapq
+import sys
+import threading
+import uuid
+import weakref
+from contextlib import asynccontextmanager, nullcontext
 from dataclasses import dataclass
-from typing import Any, AsyncGenerator, Callable, Collection, Tuple, cast
-from opentelemetry import context, propagate
+from functools import cache, partial
+from time import perf_counter
+from typing import Any, AsyncGenerator, Callable, Collection, Dict, List, Optional, Set, Tuple, cast
+from opentelemetry import context, metrics, propagate, trace
 from opentelemetry.instrumentation.instrumentor import BaseInstrumentor  
 from opentelemetry.instrumentation.utils import unwrap
 from wrapt import ObjectProxy, register_post_import_hook, wrap_function_wrapper
-from openinference.instrumentation.mcp.package import _instruments
+
+from . import deadlines
+from .stackprofiler import SlowCallProfiler
+
+# Declared here rather than imported from openinference.instrumentation.mcp,
+# whose package import costs more start-up time than the rest of this module.
+_instruments = ("mcp >= 1.6.0",)
+
+# Sessions reported by the per-session in-flight gauge, busiest first
+_BUSIEST_SESSIONS = 10
 
 class MCPInstrumentor(BaseInstrumentor):  
     """
     An instrumenter for MCP.
+
+    ``instrument()`` and ``uninstrument()`` can be toggled at runtime. Proxies
+    already installed on live sessions check whether instrumentation is on and
+    pass messages straight through while it is off.
     """
 
     def instrumentation_dependencies(self) -> Collection[str]:
         return _instruments
 
     def _instrument(self, **kwargs: Any) -> None:
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
+        meter = metrics.get_meter(__name__, meter_provider=kwargs.get("meter_provider"))
+        # Message sizes cost a re-serialization of every message; they can be turned off
+        self._metrics = _MCPMetrics(
+            meter,
+            record_message_size=kwargs.get("record_message_size", True),
+            busiest_sessions=kwargs.get("busiest_sessions", _BUSIEST_SESSIONS),
+        )
+        # Tool calls a single session may run at once; None means unlimited.
+        self._max_concurrent_tool_calls: Optional[int] = kwargs.get("max_concurrent_tool_calls")
+        # Tool calls of a session that may wait for one of those slots; further
+        # calls are rejected. None lets them all wait.
+        self._session_queue_size: Optional[int] = kwargs.get("session_queue_size")
+        # Child spans for the AWS SDK calls tools make
+        self._trace_aws_calls: bool = kwargs.get("trace_aws_calls", True)
+        # Stack sampling of tool calls slower than profile_threshold seconds,
+        # and of a profile_sample_rate fraction of all calls; off by default.
+        self._profiler: Optional[SlowCallProfiler] = None
+        if kwargs.get("profile_threshold") is not None or kwargs.get("profile_sample_rate"):
+            self._profiler = SlowCallProfiler(
+                threshold=kwargs.get("profile_threshold"),
+                sample_rate=kwargs.get("profile_sample_rate") or 0.0,
+                interval=kwargs.get("profile_interval", 0.005),
+                path=kwargs.get("profile_file"),
+            )
+        self._wrapped: Set[Tuple[str, str]] = getattr(self, "_wrapped", set())
+        self._import_hooks: Set[Tuple[str, str]] = getattr(self, "_import_hooks", set())
+
+        for module, name, wrapper in self._wrap_targets():
+            if module in sys.modules:
+                self._wrap(module, name, wrapper)
+            elif (module, name) not in self._import_hooks:
+                # Import hooks cannot be unregistered, so each target gets one
+                # hook for the instrumentor's lifetime that checks whether
+                # instrumentation is still on when the module is imported.
+                self._import_hooks.add((module, name))
+                register_post_import_hook(partial(self._on_import, module, name, wrapper), module)
+
+    def _uninstrument(self, **kwargs: Any) -> None:
+        for module, name in list(self._wrapped):
+            owner, attr = _resolve_target(module, name)
+            unwrap(owner, attr)
+            self._wrapped.discard((module, name))
+
+    def _wrap_targets(self) -> List[Tuple[str, str, Callable[..., Any]]]:
+        targets = [
+            (
                 "mcp.client.streamable_http",
                 "streamablehttp_client",
-                self._wrap_transport_with_callback,
+                partial(self._wrap_transport_with_callback, "streamable_http"),
             ),
-            "mcp.client.streamable_http",
-        )
-
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
+            (
                 "mcp.server.streamable_http",
                 "StreamableHTTPServerTransport.connect",
-                self._wrap_plain_transport,
-            ),
-            "mcp.server.streamable_http",
-        )
-
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.client.sse", "sse_client", self._wrap_plain_transport
+                partial(self._wrap_plain_transport, "streamable_http"),
             ),
-            "mcp.client.sse",
-        )
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.server.sse", "SseServerTransport.connect_sse", self._wrap_plain_transport
-            ),
-            "mcp.server.sse",
-        )
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.client.stdio", "stdio_client", self._wrap_plain_transport
-            ),
-            "mcp.client.stdio",
-        )
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.server.stdio", "stdio_server", self._wrap_plain_transport
-            ),
-            "mcp.server.stdio",
-        )
+            ("mcp.client.streamable_http", _POST_REQUEST_TARGET, self._post_request_wrapper),
+            ("mcp.client.sse", "sse_client", partial(self._wrap_plain_transport, "sse")),
+            ("mcp.server.sse", "SseServerTransport.connect_sse", partial(self._wrap_plain_transport, "sse")),
+            ("mcp.client.stdio", "stdio_client", partial(self._wrap_plain_transport, "stdio")),
+            ("mcp.server.stdio", "stdio_server", partial(self._wrap_plain_transport, "stdio")),
+            ("mcp.server.session", "ServerSession.__init__", self._base_session_init_wrapper),
+            ("mcp.server.lowlevel.server", "Server.call_tool", self._toolcall_wrapper),
+        ]
+        if self._trace_aws_calls:
+            targets.append(("botocore.client", "BaseClient._make_api_call", self._aws_call_wrapper))
+        return targets
 
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.server.session", "ServerSession.__init__", self._base_session_init_wrapper
-            ),
-            "mcp.server.session",
-        )
+    def _on_import(self, module: str, name: str, wrapper: Callable[..., Any], _: Any) -> None:
+        if self.is_instrumented_by_opentelemetry:
+            self._wrap(module, name, wrapper)
 
-        register_post_import_hook(
-            lambda _: wrap_function_wrapper(
-                "mcp.server.lowlevel.server",
-                "Server.call_tool",
-                self._toolcall_wrapper,
-            ),
-            "mcp.server.lowlevel.server",
-        )
-
-    def _uninstrument(self, **kwargs: Any) -> None:
-        unwrap("mcp.client.stdio", "stdio_client")
-        unwrap("mcp.server.stdio", "stdio_server")
+    def _wrap(self, module: str, name: str, wrapper: Callable[..., Any]) -> None:
+        if (module, name) in self._wrapped:
+            return
+        try:
+            wrap_function_wrapper(module, name, wrapper)
+        except AttributeError:
+            # Not in the installed mcp version; whatever relies on this target
+            # checks _wrapped and falls back.
+            return
+        self._wrapped.add((module, name))
 
     def _toolcall_wrapper(self, wrapped, instance, args, kwargs):
-        from opentelemetry import propagate
         original_decorator = wrapped(*args, **kwargs)
         def wrapper(func):
             async def instrumented_func(name, arguments=None):
-                from opentelemetry import trace, context
+                from opentelemetry import trace
+                if not self.is_instrumented_by_opentelemetry:
+                    return await func(name, arguments)
                 tracer = trace.get_tracer("mcp.server.lowlevel")
-                meta = None
-                if isinstance(arguments, dict):
-                    meta = arguments.get("_meta", {})
-                ctx = propagate.extract(meta)
-                with tracer.start_as_current_span(name="server.tool.call",kind=trace.SpanKind.SERVER, context=ctx ) as span:
+                # The transport reader already extracted the remote context and
+                # the session carried it to this handler; no second extract.
+                if isinstance(arguments, dict) and "_meta" in arguments:
+                    arguments = {k: v for k, v in arguments.items() if k != "_meta"}
+                with tracer.start_as_current_span(name="server.tool.call",kind=trace.SpanKind.SERVER) as span:
                     span.set_attribute("tool.name", name)
                     span.set_attribute("server_side", True)
-                result = await func(name, arguments)
-                return result
+                    timeout = deadlines.remaining()
+                    if timeout is not None:
+                        span.set_attribute("mcp.request.timeout_ms", max(int(timeout * 1000), 0))
+                    import anyio
+
+                    slots = _tool_call_slots(instance)
+                    try:
+                        # Worker threads started by the tool inherit the abort
+                        # signal, which is set if the call is cancelled.
+                        with deadlines.abort_scope(), anyio.move_on_after(timeout) as scope:
+                            # Waiting for a slot here rather than in the session's
+                            # dispatch loop keeps other messages flowing, and a
+                            # queued call can still be cancelled or time out.
+                            async with self._tool_slot(slots, name) if slots is not None else nullcontext():
+                                with self._profiler.track(name, span) if self._profiler else nullcontext():
+                                    return await func(name, arguments)
+                    except anyio.get_cancelled_exc_class():
+                        span.set_attribute("mcp.request.cancelled", True)
+                        span.set_status(trace.Status(trace.StatusCode.ERROR, "Request cancelled"))
+                        raise
+                    # Only reached when the deadline cancelled the call
+                    span.set_attribute("mcp.request.deadline_exceeded", True)
+                    span.set_status(trace.Status(trace.StatusCode.ERROR, "Request deadline exceeded"))
+                    raise deadlines.DeadlineExceeded(f"Tool {name} did not finish before the request deadline")
             return original_decorator(instrumented_func)
         return wrapper
 
+    @asynccontextmanager
+    async def _tool_slot(self, slots: "_ToolCallSlots", name: str) -> AsyncGenerator[None, None]:
+        """Hold one of the session's tool call slots, waiting for it unless too many calls already are."""
+        if slots.limiter.available_tokens < 1:
+            if slots.max_waiting is not None and slots.waiting >= slots.max_waiting:
+                self._metrics.tool_calls_rejected.add(1)
+                trace.get_current_span().set_attribute("mcp.request.rejected", True)
+                raise ToolCallRejected(
+                    f"Tool {name} was rejected: {slots.waiting} calls of this session are already waiting to run"
+                )
+            self._metrics.tool_calls_throttled.add(1)
+        slots.waiting += 1
+        self._metrics.queue_depth.add(1)
+        start = perf_counter()
+        try:
+            await slots.limiter.acquire()
+        finally:
+            slots.waiting -= 1
+            self._metrics.queue_depth.add(-1)
+            self._metrics.queue_wait.record(perf_counter() - start)
+        try:
+            yield
+        finally:
+            slots.limiter.release()
+
+    def _aws_call_wrapper(self, wrapped, instance, args, kwargs):
+        if not self.is_instrumented_by_opentelemetry:
+            return wrapped(*args, **kwargs)
+        operation = args[0] if args else kwargs.get("operation_name", "")
+        service_id = instance.meta.service_model.service_id
+        tracer = trace.get_tracer("botocore")
+        # Runs on whichever worker thread makes the call; asyncio.to_thread
+        # copies the context, so the span is a child of the tool call's span.
+        with tracer.start_as_current_span(f"{service_id}.{operation}", kind=trace.SpanKind.CLIENT) as span:
+            span.set_attribute("rpc.system", "aws-api")
+            span.set_attribute("rpc.service", str(service_id))
+            span.set_attribute("rpc.method", operation)
+            span.set_attribute("cloud.region", instance.meta.region_name or "")
+            try:
+                response = wrapped(*args, **kwargs)
+            except Exception as e:
+                # ClientError carries the parsed error response
+                _set_aws_response_attributes(span, getattr(e, "response", None))
+                raise
+            _set_aws_response_attributes(span, response)
+            return response
+
     @asynccontextmanager
     async def _wrap_transport_with_callback(
-        self, wrapped: Callable[..., Any], instance: Any, args: Any, kwargs: Any
+        self, transport: str, wrapped: Callable[..., Any], instance: Any, args: Any, kwargs: Any
     ) -> AsyncGenerator[Tuple["InstrumentedStreamReader", "InstrumentedStreamWriter", Any], None]:
+        if not self.is_instrumented_by_opentelemetry:
+            async with wrapped(*args, **kwargs) as streams:
+                yield streams
+            return
         async with wrapped(*args, **kwargs) as (read_stream, write_stream, get_session_id_callback):
-            yield (
-                InstrumentedStreamReader(read_stream),
-                InstrumentedStreamWriter(write_stream),
-                get_session_id_callback,
+            # Requests go out as HTTP POSTs, so trace context can travel in
+            # their headers instead of the message body.
+            state = _TransportState(
+                self,
+                transport,
+                self._metrics,
+                propagate_in_headers=("mcp.client.streamable_http", _POST_REQUEST_TARGET) in self._wrapped,
             )
+            try:
+                yield (
+                    InstrumentedStreamReader(read_stream, state),
+                    InstrumentedStreamWriter(write_stream, state),
+                    get_session_id_callback,
+                )
+            finally:
+                state.close()
 
     @asynccontextmanager
     async def _wrap_plain_transport(
-        self, wrapped: Callable[..., Any], instance: Any, args: Any, kwargs: Any
+        self, transport: str, wrapped: Callable[..., Any], instance: Any, args: Any, kwargs: Any
     ) -> AsyncGenerator[Tuple["InstrumentedStreamReader", "InstrumentedStreamWriter"], None]:
+        if not self.is_instrumented_by_opentelemetry:
+            async with wrapped(*args, **kwargs) as streams:
+                yield streams
+            return
         async with wrapped(*args, **kwargs) as (read_stream, write_stream):
-            yield InstrumentedStreamReader(read_stream), InstrumentedStreamWriter(write_stream)
+            # The streamable HTTP server transport knows its session id; the
+            # other transports get a random one per connection.
+            state = _TransportState(self, transport, self._metrics, getattr(instance, "mcp_session_id", None))
+            try:
+                yield InstrumentedStreamReader(read_stream, state), InstrumentedStreamWriter(write_stream, state)
+            finally:
+                state.close()
+
+    async def _post_request_wrapper(self, wrapped, instance, args, kwargs):
+        ctx = args[0] if args else kwargs["ctx"]
+        headers = getattr(ctx.session_message, "headers", None)
+        if not headers:
+            return await wrapped(*args, **kwargs)
+        return await wrapped(dataclasses.replace(ctx, headers={**ctx.headers, **headers}))
 
     def _base_session_init_wrapper(
         self, wrapped: Callable[..., None], instance: Any, args: Any, kwargs: Any
     ) -> None:
         wrapped(*args, **kwargs)
+        if not self.is_instrumented_by_opentelemetry:
+            return
         reader = getattr(instance, "_incoming_message_stream_reader", None)
         writer = getattr(instance, "_incoming_message_stream_writer", None)
         if reader and writer:
-            setattr(
-                instance, "_incoming_message_stream_reader", ContextAttachingStreamReader(reader)
+            if self._max_concurrent_tool_calls is not None:
+                import anyio
+
+                slots = _ToolCallSlots(anyio.CapacityLimiter(self._max_concurrent_tool_calls), self._session_queue_size)
+                setattr(instance, _TOOL_CALL_SLOTS, slots)
+            setattr(instance, "_incoming_message_stream_reader", ContextAttachingStreamReader(reader, self))
+            setattr(instance, "_incoming_message_stream_writer", ContextSavingStreamWriter(writer, self))
+
+
+def _set_aws_response_attributes(span: trace.Span, response: Optional[Dict[str, Any]]) -> None:
+    metadata = response.get("ResponseMetadata") if isinstance(response, dict) else None
+    if not metadata:
+        return
+    if "HTTPStatusCode" in metadata:
+        span.set_attribute("http.response.status_code", metadata["HTTPStatusCode"])
+    if "RequestId" in metadata:
+        span.set_attribute("aws.request_id", metadata["RequestId"])
+    span.set_attribute("aws.retry_count", metadata.get("RetryAttempts", 0))
+    length = metadata.get("HTTPHeaders", {}).get("content-length")
+    if length is not None and length.isdigit():
+        span.set_attribute("http.response.body.size", int(length))
+
+
+class _MCPMetrics:
+    """
+    Metric instruments shared by every instrumented transport.
+
+    Everything is aggregated in-process by the meter provider, so a request
+    costs a few counter/histogram updates rather than a span export.
+    """
+
+    def __init__(
+        self, meter: metrics.Meter, record_message_size: bool = True, busiest_sessions: int = _BUSIEST_SESSIONS
+    ) -> None:
+        self.record_message_size = record_message_size
+        self.busiest_sessions = busiest_sessions
+        # Open connections, read by the gauge callback on the metric reader's thread
+        self._sessions: "weakref.WeakSet[_TransportState]" = weakref.WeakSet()
+        self._sessions_lock = threading.Lock()
+        self.requests = meter.create_counter(
+            "mcp.requests", unit="{request}", description="MCP JSON-RPC requests sent or received"
+        )
+        self.duration = meter.create_histogram(
+            "mcp.request.duration", unit="s", description="Time from request to its response"
+        )
+        self.in_flight = meter.create_up_down_counter(
+            "mcp.requests.in_flight", unit="{request}", description="Requests awaiting a response"
+        )
+        # Only the busiest sessions get a series, so the number of series stays
+        # bounded however many sessions there are.
+        meter.create_observable_gauge(
+            "mcp.session.requests.in_flight",
+            callbacks=[self._observe_busiest_sessions],
+            unit="{request}",
+            description="Requests awaiting a response on each of the sessions with the most of them",
+        )
+        if record_message_size:
+            self.bytes_received = meter.create_counter(
+                "mcp.transport.bytes_received",
+                unit="By",
+                description="Serialized size of messages read from a transport",
+            )
+            self.bytes_sent = meter.create_counter(
+                "mcp.transport.bytes_sent", unit="By", description="Serialized size of messages written to a transport"
             )
-            setattr(instance, "_incoming_message_stream_writer", ContextSavingStreamWriter(writer))
+        self.queue_depth = meter.create_up_down_counter(
+            "mcp.session.queue.depth",
+            unit="{request}",
+            description="Tool calls waiting for a slot under the per-session concurrency limit",
+        )
+        self.queue_wait = meter.create_histogram(
+            "mcp.session.queue.wait",
+            unit="s",
+            description="Time tool calls waited for a slot under the per-session concurrency limit",
+        )
+        self.tool_calls_rejected = meter.create_counter(
+            "mcp.session.tool_calls.rejected",
+            unit="{request}",
+            description="Tool calls rejected because too many calls of their session were already waiting",
+        )
+        self.tool_calls_throttled = meter.create_counter(
+            "mcp.session.tool_calls.throttled",
+            unit="{request}",
+            description="Tool calls that waited for a free slot under the per-session concurrency limit",
+        )
+
+    def session_opened(self, state: "_TransportState") -> None:
+        with self._sessions_lock:
+            self._sessions.add(state)
+
+    def session_closed(self, state: "_TransportState") -> None:
+        with self._sessions_lock:
+            self._sessions.discard(state)
+
+    def _observe_busiest_sessions(self, options: metrics.CallbackOptions) -> List[metrics.Observation]:
+        with self._sessions_lock:
+            states = list(self._sessions)
+        loads = [(state.pending_count, state) for state in states]
+        busiest = heapq.nlargest(self.busiest_sessions, [load for load in loads if load[0]], key=lambda load: load[0])
+        return [
+            metrics.Observation(count, {**state.attributes, "mcp.session.id": state.session_id})
+            for count, state in busiest
+        ]
+
+
+_REMOTE_CONTEXT_CACHE_SIZE = 256
+
+# Sends one client message of the streamable HTTP transport as a POST request
+_POST_REQUEST_TARGET = "StreamableHTTPTransport._handle_post_request"
+# Request deadline, in milliseconds, when it is sent as a header rather than as _meta.timeoutMs
+TIMEOUT_HEADER = "mcp-timeout-ms"
+# Server session attribute holding its _ToolCallSlots when max_concurrent_tool_calls is set
+_TOOL_CALL_SLOTS = "_otel_tool_call_slots"
+
+
+class ToolCallRejected(RuntimeError):
+    """A tool call turned away because its session already has session_queue_size calls waiting."""
+
+
+@dataclass(slots=True)
+class _ToolCallSlots:
+    limiter: Any
+    max_waiting: Optional[int]
+    waiting: int = 0
+
+
+@cache
+def _header_session_message() -> type:
+    """A SessionMessage that carries HTTP headers to send with it; defined once mcp is imported."""
+    from mcp.shared.message import SessionMessage
+
+    @dataclass
+    class HeaderSessionMessage(SessionMessage):
+        headers: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+    return HeaderSessionMessage
+
+
+def _meta_from_headers(headers: Any) -> Dict[str, Any]:
+    """The trace context and deadline of a request sent in HTTP headers, in the form of ``_meta``."""
+    meta: Dict[str, Any] = {
+        field: headers[field] for field in propagate.get_global_textmap().fields if field in headers
+    }
+    try:
+        meta["timeoutMs"] = float(headers[TIMEOUT_HEADER])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return meta
+
+
+@dataclass(slots=True)
+class _PendingRequest:
+    attributes: Dict[str, Any]
+    start: float
+    span: Optional[trace.Span] = None
+
+
+class _TransportState:
+    """
+    Bookkeeping shared by the reader and writer of one transport connection.
+
+    Requests are keyed by direction as well as id, since each peer numbers
+    the requests it sends independently.
+    """
+
+    def __init__(
+        self,
+        instrumentor: MCPInstrumentor,
+        transport: str,
+        mcp_metrics: "_MCPMetrics",
+        session_id: Optional[str] = None,
+        propagate_in_headers: bool = False,
+    ) -> None:
+        self.instrumentor = instrumentor
+        self.transport = transport
+        self.propagate_in_headers = propagate_in_headers
+        self.session_id = session_id or uuid.uuid4().hex
+        self.metrics = mcp_metrics
+        self.attributes = {"mcp.transport": transport}
+        self._pending: Dict[Tuple[str, Any], _PendingRequest] = {}
+        self._remote_contexts: Dict[Tuple[Any, ...], context.Context] = {}
+        mcp_metrics.session_opened(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.instrumentor.is_instrumented_by_opentelemetry
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def extract_context(self, request: Any, headers: Any = None) -> context.Context:
+        """
+        Return the remote context carried in ``params._meta`` of a request, or
+        in the HTTP headers it was sent with.
+
+        Trace context is propagated in ``params._meta``, together with an
+        optional ``timeoutMs`` that becomes the request's deadline. A ``_meta`` that
+        older clients put inside tool ``arguments`` is used as a fallback and
+        removed, so it never reaches the tool function. Over HTTP, clients send
+        both as headers instead (``traceparent`` and ``mcp-timeout-ms``), which
+        are used when ``_meta`` carries neither. Parsed contexts are cached for
+        the session, since a client typically sends many requests under the
+        same parent span.
+        """
+        params = request.params if isinstance(request.params, dict) else {}
+        meta = params.get("_meta")
+        arguments = params.get("arguments")
+        if isinstance(arguments, dict) and "_meta" in arguments:
+            legacy_meta = arguments.pop("_meta")
+            if not meta:
+                meta = legacy_meta
+        if headers is not None and not (isinstance(meta, dict) and ("traceparent" in meta or "timeoutMs" in meta)):
+            meta = _meta_from_headers(headers)
+        if not isinstance(meta, dict):
+            return context.get_current()
+
+        if "traceparent" in meta:
+            key = (meta["traceparent"], meta.get("tracestate"), meta.get("baggage"))
+            ctx = self._remote_contexts.get(key)
+            if ctx is None:
+                if len(self._remote_contexts) >= _REMOTE_CONTEXT_CACHE_SIZE:
+                    self._remote_contexts.clear()
+                ctx = self._remote_contexts[key] = propagate.extract(meta)
+        else:
+            ctx = context.get_current()
+        # The client's timeout counts from when the request is received, so
+        # time spent queued in the session counts against it.
+        timeout_ms = meta.get("timeoutMs")
+        if isinstance(timeout_ms, (int, float)) and timeout_ms > 0:
+            ctx = deadlines.set_timeout(ctx, timeout_ms / 1000)
+        return ctx
+
+    def record_message(self, message: Any, sent: bool) -> None:
+        if not self.metrics.record_message_size:
+            return
+        size = len(message.model_dump_json(by_alias=True, exclude_none=True))
+        counter = self.metrics.bytes_sent if sent else self.metrics.bytes_received
+        counter.add(size, self.attributes)
+
+    def request_started(self, direction: str, request: Any, span: Optional[trace.Span] = None) -> None:
+        attributes = {"mcp.transport": self.transport, "mcp.method": request.method}
+        if request.method == "tools/call" and isinstance(request.params, dict):
+            attributes["mcp.tool.name"] = request.params.get("name", "")
+        self._pending[(direction, request.id)] = _PendingRequest(attributes, perf_counter(), span)
+        self.metrics.requests.add(1, attributes)
+        self.metrics.in_flight.add(1, self.attributes)
+
+    def request_finished(self, direction: str, request_id: Any, error: Any = None) -> None:
+        pending = self._pending.pop((direction, request_id), None)
+        if pending is None:
+            return
+        attributes = pending.attributes
+        if error is not None:
+            attributes = {**attributes, "error.type": str(error.code)}
+        self.metrics.duration.record(perf_counter() - pending.start, attributes)
+        self.metrics.in_flight.add(-1, self.attributes)
+        if pending.span is not None:
+            if error is not None:
+                pending.span.set_status(trace.Status(trace.StatusCode.ERROR, error.message))
+            pending.span.end()
+
+    def close(self) -> None:
+        # Requests still pending when the connection goes away never get a response.
+        for key in list(self._pending):
+            self.request_finished(key[0], key[1])
+        self.metrics.session_closed(self)
 
 
 class InstrumentedStreamReader(ObjectProxy):  
     # ObjectProxy missing context manager - https://github.com/GrahamDumpleton/wrapt/issues/73
+    def __init__(self, wrapped: Any, state: _TransportState) -> None:
+        super().__init__(wrapped)
+        self._self_state = state
+
     async def __aenter__(self) -> Any:
         return await self.__wrapped__.__aenter__()
 
@@ -139,35 +554,53 @@ class InstrumentedStreamReader(ObjectProxy):
 
     async def __aiter__(self) -> AsyncGenerator[Any, None]:
         from mcp.shared.message import SessionMessage
-        from mcp.types import JSONRPCRequest
-        from opentelemetry import trace
+        from mcp.types import JSONRPCError, JSONRPCRequest, JSONRPCResponse
     
         tracer = trace.get_tracer("mcp.server")
+        state = self._self_state
         async for item in self.__wrapped__:
+            if isinstance(item, Exception):
+                yield item
+                continue
+            if not state.enabled:
+                if state.has_pending:
+                    # Close out requests that started before instrumentation was turned off.
+                    root = cast(SessionMessage, item).message.root
+                    if isinstance(root, (JSONRPCResponse, JSONRPCError)):
+                        state.request_finished("out", root.id, getattr(root, "error", None))
+                yield item
+                continue
             session_message = cast(SessionMessage, item)
             request = session_message.message.root
+            state.record_message(session_message.message, sent=False)
 
+            if isinstance(request, (JSONRPCResponse, JSONRPCError)):
+                state.request_finished("out", request.id, getattr(request, "error", None))
+                yield item
+                continue
             if not isinstance(request, JSONRPCRequest):
                 yield item
                 continue
 
-            if request.params:
-                meta = request.params.get("_meta")
-                if meta:
-                    ctx = propagate.extract(meta)
-                    restore = context.attach(ctx)
-                    try:
-                        with tracer.start_as_current_span(f"server.{request.method}",kind=trace.SpanKind.SERVER) as span:
-                            span.set_attribute("mcp.server.session_id", session_message.session_id)
-                        yield item
-                        continue
-                    finally:
-                        context.detach(restore)
-            yield item
+            ctx = state.extract_context(request, _request_headers(session_message))
+            # The span stays open until the writer sends the matching response.
+            span = tracer.start_span(f"server.{request.method}", context=ctx, kind=trace.SpanKind.SERVER)
+            span.set_attribute("mcp.server.session_id", state.session_id)
+            state.request_started("in", request, span)
+            span.set_attribute("mcp.session.requests.in_flight", state.pending_count)
+            restore = context.attach(trace.set_span_in_context(span, ctx))
+            try:
+                yield item
+            finally:
+                context.detach(restore)
             
 
 class InstrumentedStreamWriter(ObjectProxy):  
     # ObjectProxy missing context manager - https://github.com/GrahamDumpleton/wrapt/issues/73
+    def __init__(self, wrapped: Any, state: _TransportState) -> None:
+        super().__init__(wrapped)
+        self._self_state = state
+
     async def __aenter__(self) -> Any:
         return await self.__wrapped__.__aenter__()
 
@@ -176,21 +609,36 @@ class InstrumentedStreamWriter(ObjectProxy):
 
     async def send(self, item: Any) -> Any:
         from mcp.shared.message import SessionMessage
-        from mcp.types import JSONRPCRequest
+        from mcp.types import JSONRPCError, JSONRPCRequest, JSONRPCResponse
 
+        state = self._self_state
         session_message = cast(SessionMessage, item)
         request = session_message.message.root
+        if isinstance(request, (JSONRPCResponse, JSONRPCError)):
+            state.request_finished("in", request.id, getattr(request, "error", None))
+        if not state.enabled:
+            return await self.__wrapped__.send(item)
         if not isinstance(request, JSONRPCRequest):
+            state.record_message(session_message.message, sent=True)
             return await self.__wrapped__.send(item)
-        meta = None
-        if not request.params:
-            request.params = {}
-        meta = request.params.setdefault("_meta", {})
-        if isinstance(request.params, dict):
-            arguments = request.params.setdefault("arguments", {})
-            if isinstance(arguments, dict):
-                meta = arguments.setdefault("_meta", {})
-                propagate.get_global_textmap().inject(meta)
+        carrier: Dict[str, Any] = {}
+        propagate.get_global_textmap().inject(carrier)
+        timeout = deadlines.remaining()
+        if state.propagate_in_headers:
+            # Sent as HTTP headers, leaving the message body as the caller built it
+            if timeout is not None:
+                carrier[TIMEOUT_HEADER] = str(max(int(timeout * 1000), 1))
+            if carrier:
+                item = _header_session_message()(session_message.message, session_message.metadata, carrier)
+        else:
+            if timeout is not None:
+                carrier["timeoutMs"] = max(int(timeout * 1000), 1)
+            if carrier:
+                if not request.params:
+                    request.params = {}
+                request.params.setdefault("_meta", {}).update(carrier)
+        state.request_started("out", request)
+        state.record_message(session_message.message, sent=True)
         return await self.__wrapped__.send(item)
 
 
@@ -208,12 +656,23 @@ class ContextSavingStreamWriter(ObjectProxy):  # type: ignore
     async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> Any:
         return await self.__wrapped__.__aexit__(exc_type, exc_value, traceback)
 
+    def __init__(self, wrapped: Any, instrumentor: MCPInstrumentor) -> None:
+        super().__init__(wrapped)
+        self._self_instrumentor = instrumentor
+
     async def send(self, item: Any) -> Any:
-        ctx = context.get_current()
-        return await self.__wrapped__.send(ItemWithContext(item, ctx))
+        if not self._self_instrumentor.is_instrumented_by_opentelemetry:
+            return await self.__wrapped__.send(item)
+        return await self.__wrapped__.send(ItemWithContext(item, context.get_current()))
 
 class ContextAttachingStreamReader(ObjectProxy):  # type: ignore
+    """Attach the context saved by ``ContextSavingStreamWriter`` while a message is dispatched."""
+
     # ObjectProxy missing context manager - https://github.com/GrahamDumpleton/wrapt/issues/73
+    def __init__(self, wrapped: Any, instrumentor: MCPInstrumentor) -> None:
+        super().__init__(wrapped)
+        self._self_instrumentor = instrumentor
+
     async def __aenter__(self) -> Any:
         return await self.__wrapped__.__aenter__()
 
@@ -222,9 +681,37 @@ class ContextAttachingStreamReader(ObjectProxy):  # type: ignore
 
     async def __aiter__(self) -> AsyncGenerator[Any, None]:
         async for item in self.__wrapped__:
+            # Items sent while instrumentation was off carry no context.
+            if not isinstance(item, ItemWithContext):
+                yield item
+                continue
             item_with_context = cast(ItemWithContext, item)
             restore = context.attach(item_with_context.ctx)
             try:
                 yield item_with_context.item
             finally:
-                context.detach(restore)
\ No newline at end of file
+                context.detach(restore)
+
+
+def _tool_call_slots(server: Any) -> Optional[_ToolCallSlots]:
+    """The tool call slots of the session the current request arrived on, if it has any."""
+    try:
+        session = server.request_context.session
+    except LookupError:
+        return None
+    return getattr(session, _TOOL_CALL_SLOTS, None)
+
+
+def _request_headers(session_message: Any) -> Any:
+    """The HTTP headers a message arrived with, if a server HTTP transport attached its request."""
+    request = getattr(session_message.metadata, "request_context", None)
+    return getattr(request, "headers", None)
+
+
+def _resolve_target(module: str, name: str) -> Tuple[Any, str]:
+    """Return the object holding a wrapped attribute and the attribute name."""
+    owner: Any = sys.modules[module]
+    *path, attr = name.split(".")
+    for part in path:
+        owner = getattr(owner, part)
+    return owner, attr
\ No newline at end of file
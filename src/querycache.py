@@ -0,0 +1,124 @@
+"""
+Result cache for Logs Insights queries.
+
+Agents often re-run the same query with a time range shifted by a few
+seconds, and each run scans the same data again. Queries are keyed by their
+normalized text, log groups, limit and a time range snapped outward to a
+fixed granularity, so that such re-runs share one result. Keys also hold the
+AWS identity and region the query runs as, since the same log group name in
+another account holds other data. Results live in
+the shared cache, so other server processes reuse them too.
+
+A range that ended long enough ago for ingestion to have caught up cannot
+change, so its result is kept much longer than that of a range reaching the
+present.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from time import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .sharedcache import SharedCache, cache_key
+
+# Logs are assumed complete once they are this old
+INGESTION_DELAY = 300
+
+# Quoted strings, backquoted field names and regexes are kept as they are
+_LITERAL = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|/(?:\\.|[^/\\\n])+/")
+_COMMENT = re.compile(r"#[^\n]*")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Query text with comments dropped and whitespace collapsed outside of
+    string literals, field names and regexes, so that reformatted copies of
+    a query compare equal.
+    """
+    parts = []
+    position = 0
+    for literal in _LITERAL.finditer(query):
+        parts.append(_normalize_code(query[position : literal.start()]))
+        parts.append(literal.group())
+        position = literal.end()
+    parts.append(_normalize_code(query[position:]))
+    return "".join(parts).strip()
+
+
+def _normalize_code(text: str) -> str:
+    text = _COMMENT.sub(" ", text)
+    text = re.sub(r"\s+", " ", text)
+    return re.sub(r"\s*([|,()=<>!]+)\s*", r"\1", text)
+
+
+def snap_range(start: int, end: int, granularity: int) -> Tuple[int, int]:
+    """Widen a range of Unix timestamps to whole multiples of ``granularity`` seconds."""
+    if granularity <= 1:
+        return start, end
+    return start - start % granularity, -(-end // granularity) * granularity
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResult:
+    response: Dict[str, Any]
+    stored_at: float
+    closed: bool
+
+    @property
+    def age_seconds(self) -> float:
+        return time() - self.stored_at
+
+    @property
+    def bytes_scanned(self) -> float:
+        return self.response.get("statistics", {}).get("bytesScanned", 0.0)
+
+
+class QueryResultCache:
+    """
+    Completed Logs Insights results in a shared cache.
+
+    Results for ranges ending more than INGESTION_DELAY ago are kept for
+    ``closed_ttl`` seconds, others for ``open_ttl``. ``bytes_saved`` counts
+    the bytes the hits in this process did not have to scan again.
+    """
+
+    def __init__(self, cache: SharedCache, open_ttl: float, closed_ttl: float) -> None:
+        self._cache = cache
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self.bytes_saved = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        identity: str, region: str, query: str, log_groups: Iterable[str], start: int, end: int, limit: Optional[int]
+    ) -> str:
+        return cache_key(
+            "logs_query",
+            identity=identity,
+            region=region,
+            query=normalize_query(query),
+            log_groups=sorted(set(log_groups)),
+            start=start,
+            end=end,
+            limit=limit,
+        )
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        stored = self._cache.get(key)
+        if stored is None:
+            return None
+        result = CachedResult(stored["response"], stored["stored_at"], stored["closed"])
+        with self._lock:
+            self.bytes_saved += result.bytes_scanned
+        return result
+
+    def put(self, key: str, end: int, response: Dict[str, Any]) -> None:
+        """Store a completed query's response; ``end`` is the end of its range."""
+        now = time()
+        closed = end <= now - INGESTION_DELAY
+        self._cache.put(
+            key,
+            {"response": response, "stored_at": now, "closed": closed},
+            self.closed_ttl if closed else self.open_ttl,
+        )
@@ -0,0 +1,234 @@
+"""
+Record tool calls and the AWS responses behind them, and replay them offline.
+
+In record mode every MCP tool call and every AWS API call made through boto3
+is appended to a JSON lines file. In replay mode AWS calls are answered from
+such a file instead of AWS, optionally with their recorded latency, so that
+``bench_replay.py`` can re-drive the recorded tool calls against a local
+server with no network access or credentials.
+"""
+import base64
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import date, datetime
+from time import monotonic, sleep
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from wrapt import register_post_import_hook, wrap_function_wrapper
+
+# Tool call the current AWS call is made for; worker threads inherit it
+_current_tool: ContextVar[Optional[str]] = ContextVar("recordreplay_tool", default=None)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    # Content items returned by tools, and anything else that is not JSON
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    if len(value) == 1:
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__date__" in value:
+            return date.fromisoformat(value["__date__"])
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+    return value
+
+
+def dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=_encode, separators=(",", ":"))
+
+
+def loads(line: str) -> Dict[str, Any]:
+    return json.loads(line, object_hook=_decode)
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def _request_key(service: str, operation: str, params: Dict[str, Any]) -> str:
+    """Identify a request independently of when it was made."""
+    # Time ranges are computed from the current time, so they never match a
+    # recording; everything else (names, query ids, tokens) does.
+    stable = {
+        key: value
+        for key, value in params.items()
+        if not isinstance(value, (datetime, date)) and not key.endswith(("Time", "Timestamp"))
+    }
+    return f"{service}.{operation} {json.dumps(stable, default=_encode, sort_keys=True)}"
+
+
+class Recorder:
+    """Append tool calls and AWS calls to a JSON lines file as they complete."""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+        self._started = monotonic()
+
+    def offset(self) -> float:
+        return monotonic() - self._started
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = dumps(record)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def aws_call(self, wrapped, instance, args, kwargs):
+        operation, params = _call_args(args, kwargs)
+        record = {
+            "type": "aws",
+            "service": instance.meta.service_model.service_name,
+            "region": instance.meta.region_name,
+            "operation": operation,
+            "params": params,
+            "tool": _current_tool.get(),
+            "t": self.offset(),
+        }
+        start = monotonic()
+        try:
+            response = wrapped(*args, **kwargs)
+        except Exception as e:
+            error_response = getattr(e, "response", None)
+            if not isinstance(error_response, dict):
+                raise
+            # ClientError: the error response is what replay raises again
+            record.update(error=error_response, duration_s=monotonic() - start)
+            self.write(record)
+            raise
+        record.update(response=response, duration_s=monotonic() - start)
+        self.write(record)
+        return response
+
+    async def tool_call(self, wrapped, instance, args, kwargs):
+        name = args[0] if args else kwargs["name"]
+        arguments = args[1] if len(args) > 1 else kwargs.get("arguments", {})
+        record = {"type": "tool", "name": name, "arguments": arguments, "t": self.offset()}
+        token = _current_tool.set(name)
+        start = monotonic()
+        try:
+            result = await wrapped(*args, **kwargs)
+        except Exception as e:
+            record.update(error=str(e), duration_s=monotonic() - start)
+            self.write(record)
+            raise
+        finally:
+            _current_tool.reset(token)
+        record.update(result=result, duration_s=monotonic() - start)
+        self.write(record)
+        return result
+
+
+class ReplayMissError(Exception):
+    """A replayed server made an AWS call that is not in the recording."""
+
+
+class Player:
+    """
+    Answer AWS calls from a recording instead of AWS.
+
+    Calls are matched on service, operation and parameters other than time
+    ranges. Repeated identical calls, such as Logs Insights result polling,
+    get the recorded responses in order, then the last one again. A call with
+    no exact match gets the next unused response of the same operation.
+
+    ``speed`` scales the recorded latency: 1.0 replays it as recorded, 2.0
+    twice as fast, and 0 answers immediately.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0) -> None:
+        self.speed = speed
+        self._exact: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_operation: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        for record in read_records(path):
+            if record.get("type") != "aws":
+                continue
+            self._exact[_request_key(record["service"], record["operation"], record["params"])].append(record)
+            self._by_operation[f"{record['service']}.{record['operation']}"].append(record)
+
+    def _take(self, service: str, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = _request_key(service, operation, params)
+        with self._lock:
+            queue = self._exact.get(key)
+            if queue:
+                record = queue.popleft()
+            elif key in self._last:
+                record = self._last[key]
+            else:
+                fallback = self._by_operation.get(f"{service}.{operation}")
+                if not fallback:
+                    raise ReplayMissError(f"No recorded response for {service} {operation}")
+                record = fallback[0] if len(fallback) == 1 else fallback.popleft()
+            self._last[key] = record
+        return record
+
+    def aws_call(self, wrapped, instance, args, kwargs):
+        from botocore.exceptions import ClientError
+
+        operation, params = _call_args(args, kwargs)
+        record = self._take(instance.meta.service_model.service_name, operation, params)
+        if self.speed > 0:
+            sleep(record.get("duration_s", 0.0) / self.speed)
+        if "error" in record:
+            raise ClientError(record["error"], operation)
+        return record["response"]
+
+
+def _call_args(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    operation = args[0] if args else kwargs["operation_name"]
+    params = args[1] if len(args) > 1 else kwargs.get("api_params", {})
+    return operation, params
+
+
+def _wrap_when_imported(module: str, name: str, wrapper: Any) -> None:
+    register_post_import_hook(lambda _: wrap_function_wrapper(module, name, wrapper), module)
+
+
+def install_recorder(path: str) -> Recorder:
+    recorder = Recorder(path)
+    _wrap_when_imported("botocore.client", "BaseClient._make_api_call", recorder.aws_call)
+    _wrap_when_imported("mcp.server.fastmcp.tools.tool_manager", "ToolManager.call_tool", recorder.tool_call)
+    return recorder
+
+
+def install_player(path: str, speed: float = 1.0) -> Player:
+    player = Player(path, speed)
+    _wrap_when_imported("botocore.client", "BaseClient._make_api_call", player.aws_call)
+    return player
+
+
+def configure_from_env() -> Optional[Union[Recorder, Player]]:
+    """Record to ``$APPSIGNALS_RECORD`` or replay ``$APPSIGNALS_REPLAY`` (at ``$APPSIGNALS_REPLAY_SPEED``), if set."""
+    if os.environ.get("APPSIGNALS_REPLAY"):
+        return install_player(os.environ["APPSIGNALS_REPLAY"], float(os.environ.get("APPSIGNALS_REPLAY_SPEED", "1")))
+    if os.environ.get("APPSIGNALS_RECORD"):
+        return install_recorder(os.environ["APPSIGNALS_RECORD"])
+    return None
+
+
+def tool_calls(path: str) -> List[Dict[str, Any]]:
+    """The tool call records of a recording, in the order the calls started."""
+    return sorted((r for r in read_records(path) if r.get("type") == "tool"), key=lambda r: r["t"])
@@ -0,0 +1,267 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from time import time_ns
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; writers in one process only
+    fcntl = None
+
+# Where the ring is kept when mcpserver.py enables it with APPSIGNALS_SPAN_RING=1
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "appsignals-mcp", "spans.ring")
+DEFAULT_SLOTS = 8192
+DEFAULT_SLOT_SIZE = 2048
+
+_MAGIC = b"MCPRING1"
+# magic, slot size, slot count, sequence number of the next record
+_HEADER = struct.Struct("<8sIIQ")
+_HEADER_SIZE = 64
+# sequence number, payload length
+_SLOT_HEADER = struct.Struct("<QI")
+
+
+# Longest string attribute value kept when a span's record is too large for a slot
+SHORT_VALUE = 64
+
+
+def encode_span(span: ReadableSpan, with_attributes: bool = True, shorten: bool = False) -> Dict[str, Any]:
+    context = span.get_span_context()
+    record: Dict[str, Any] = {
+        "name": span.name,
+        "trace_id": format(context.trace_id, "032x"),
+        "span_id": format(context.span_id, "016x"),
+        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "kind": span.kind.name,
+        "start": span.start_time,
+        "duration_ns": (span.end_time or span.start_time or 0) - (span.start_time or 0),
+        "status": span.status.status_code.name,
+    }
+    if span.status.description:
+        record["error"] = span.status.description
+    if with_attributes and span.attributes:
+        record["attributes"] = {
+            key: value[:SHORT_VALUE] if shorten and isinstance(value, str) else value
+            for key, value in span.attributes.items()
+            if not (shorten and isinstance(value, (list, tuple)))
+        }
+    return record
+
+
+class _RingFile:
+    """A file of fixed-size slots, memory-mapped, that record sequence numbers wrap around."""
+
+    def __init__(self, path: str, slots: int, slot_size: int, create: bool) -> None:
+        self.path = path
+        if create:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = self._open_initialized(slots, slot_size)
+        else:
+            self._fd = os.open(path, os.O_RDONLY)
+        size = os.fstat(self._fd).st_size
+        access = mmap.ACCESS_WRITE if create else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._fd, size, access=access)
+        magic, self.slot_size, self.slots, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a span ring buffer")
+
+    def _open_initialized(self, slots: int, slot_size: int) -> int:
+        """Open the file for writing, creating it, or replacing it if it has another geometry."""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            with _flock(fd):
+                # Another process may have replaced the file while this one waited for the lock
+                ready = os.fstat(fd).st_ino == os.stat(self.path).st_ino and self._initialize(fd, slots, slot_size)
+            if ready:
+                return fd
+            os.close(fd)
+
+    def _initialize(self, fd: int, slots: int, slot_size: int) -> bool:
+        """Make the locked file a ring of this geometry; False if it had to be replaced and must be reopened."""
+        size = _HEADER_SIZE + slots * slot_size
+        existing = os.fstat(fd).st_size
+        header = os.pread(fd, _HEADER.size, 0)
+        if len(header) == _HEADER.size and existing == size:
+            magic, existing_size, existing_slots, _ = _HEADER.unpack(header)
+            if magic == _MAGIC and (existing_size, existing_slots) == (slot_size, slots):
+                return True
+        if existing == 0:
+            # A new file, which nobody has mapped yet
+            os.ftruncate(fd, size)
+            os.pwrite(fd, _HEADER.pack(_MAGIC, slot_size, slots, 0), 0)
+            return True
+        # Another geometry. Processes may have the file mapped, and shrinking it
+        # under them would kill them with SIGBUS, so a new file takes its place;
+        # they carry on writing to the old one.
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        new_fd = os.open(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(new_fd, size)
+            os.pwrite(new_fd, _HEADER.pack(_MAGIC, slot_size, slots, 0), 0)
+        finally:
+            os.close(new_fd)
+        os.replace(temporary, self.path)
+        return False
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        # Serializes writers across processes, e.g. several HTTP workers
+        with _flock(self._fd):
+            yield
+
+    @property
+    def next_sequence(self) -> int:
+        return _HEADER.unpack_from(self._map, 0)[3]
+
+    def append(self, payloads: Sequence[bytes]) -> None:
+        sequence = self.next_sequence
+        for payload in payloads:
+            offset = _HEADER_SIZE + (sequence % self.slots) * self.slot_size
+            self._map[offset + _SLOT_HEADER.size : offset + _SLOT_HEADER.size + len(payload)] = payload
+            # The slot header goes last, so a reader never pairs it with a half-written payload
+            _SLOT_HEADER.pack_into(self._map, offset, sequence, len(payload))
+            sequence += 1
+        _HEADER.pack_into(self._map, 0, _MAGIC, self.slot_size, self.slots, sequence)
+
+    def read(self) -> Iterator[bytes]:
+        """Yield the payloads still in the ring, oldest first."""
+        end = self.next_sequence
+        for sequence in range(max(0, end - self.slots), end):
+            offset = _HEADER_SIZE + (sequence % self.slots) * self.slot_size
+            stored, length = _SLOT_HEADER.unpack_from(self._map, offset)
+            # Overwritten since the header was read, or never completely written
+            if stored != sequence or length > self.slot_size - _SLOT_HEADER.size:
+                continue
+            yield bytes(self._map[offset + _SLOT_HEADER.size : offset + _SLOT_HEADER.size + length])
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+@contextmanager
+def _flock(fd: int) -> Iterator[None]:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RingBufferSpanExporter(SpanExporter):
+    """
+    Export finished spans as compact JSON records into a fixed-size ring
+    buffer file, so the most recent spans can be read back without any
+    tracing backend. Old spans are overwritten once the ring is full.
+
+    A span whose record does not fit in a slot is stored with long attribute
+    values cut short, or failing that without attributes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, slots: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE) -> None:
+        self._ring = _RingFile(path, slots, slot_size, create=True)
+        self._lock = threading.Lock()
+        self._capacity = slot_size - _SLOT_HEADER.size
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        payloads = []
+        for span in spans:
+            payload = self._encode(encode_span(span))
+            if len(payload) > self._capacity:
+                payload = self._encode(encode_span(span, shorten=True))
+            if len(payload) > self._capacity:
+                payload = self._encode(encode_span(span, with_attributes=False))
+            if len(payload) <= self._capacity:
+                payloads.append(payload)
+        with self._lock, self._ring.locked():
+            self._ring.append(payloads)
+        return SpanExportResult.SUCCESS
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, separators=(",", ":"), default=list).encode()
+
+    def shutdown(self) -> None:
+        self._ring.close()
+
+
+class RingBufferReader:
+    """Read spans back from a ring buffer written by ``RingBufferSpanExporter``."""
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+
+    def spans(self, since_ns: Optional[int] = None, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the spans in the ring, oldest first, optionally only those started since a time or with a name."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < _HEADER_SIZE:
+            return []
+        ring = _RingFile(self.path, 0, 0, create=False)
+        try:
+            spans = []
+            for payload in ring.read():
+                try:
+                    span = json.loads(payload)
+                except ValueError:
+                    continue
+                if since_ns is not None and span["start"] < since_ns:
+                    continue
+                if name is not None and span["name"] != name:
+                    continue
+                spans.append(span)
+            return spans
+        finally:
+            ring.close()
+
+    def recent(self, minutes: float, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.spans(time_ns() - int(minutes * 60e9), name)
+
+
+TOOL_CALL_SPAN = "server.tool.call"
+
+
+def tool_call_stats(spans: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Calls, errors and latency (ms) per tool from ``server.tool.call`` spans, slowest p95 first."""
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for span in spans:
+        if span["name"] != TOOL_CALL_SPAN:
+            continue
+        tool = span.get("attributes", {}).get("tool.name", "unknown")
+        durations.setdefault(tool, []).append(span["duration_ns"] / 1e6)
+        errors[tool] = errors.get(tool, 0) + (span["status"] == "ERROR")
+    return latency_stats(durations, errors)
+
+
+def latency_stats(durations_ms: Dict[str, List[float]], errors: Dict[str, int]) -> List[Dict[str, Any]]:
+    """Calls, errors and p50/p95/max latency per tool from its call durations in ms, slowest p95 first."""
+    stats = []
+    for tool, values in durations_ms.items():
+        if not values:
+            continue
+        values = sorted(values)
+        stats.append(
+            {
+                "tool": tool,
+                "calls": len(values),
+                "errors": errors.get(tool, 0),
+                "p50_ms": _percentile(values, 0.5),
+                "p95_ms": _percentile(values, 0.95),
+                "max_ms": values[-1],
+            }
+        )
+    return sorted(stats, key=lambda entry: entry["p95_ms"], reverse=True)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
@@ -0,0 +1,215 @@
+"""
+Vectorized summaries of metric time series: percentiles, change points,
+spikes and shape-preserving downsampling, so that a long window can be
+described in a bounded number of lines.
+
+Series are numpy arrays of finite values in time order; drop missing
+datapoints before passing them in.
+"""
+import warnings
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+# Points in the downsampled series
+DEFAULT_POINT_BUDGET = 30
+# A point this many robust standard deviations above its rolling median is a spike
+SPIKE_Z = 4.0
+# Points on each side of the rolling median window used for spikes and shifts
+SPIKE_HALF_WINDOW = 7
+MAX_CHANGE_POINTS = 3
+# Shortest segment on either side of a change point
+MIN_SEGMENT = 5
+# Squared error, in units of noise variance times log(n), a split must remove
+CHANGE_PENALTY = 8.0
+# Baseline spread used for z-scores is at least this fraction of the baseline mean
+MIN_RELATIVE_SPREAD = 0.05
+
+
+@dataclass(frozen=True, slots=True)
+class ChangePoint:
+    index: int
+    before: float
+    after: float
+
+
+@dataclass(frozen=True, slots=True)
+class Spike:
+    start: int
+    end: int
+    peak: int
+
+
+def _robust_sigma(values: np.ndarray) -> float:
+    """
+    Noise level of a series, from the median absolute deviation of its first differences.
+
+    The MAD is 0 when most of the series is flat, as Fault and Error counts
+    usually are; the standard deviation of the differences is used then, so
+    that the few points that do move still register. Only a constant series
+    has no noise level.
+    """
+    if len(values) < 3:
+        return 0.0
+    diffs = np.diff(values)
+    mad = float(np.median(np.abs(diffs - np.median(diffs))))
+    if mad > 0:
+        return 1.4826 * mad / np.sqrt(2)
+    return float(diffs.std() / np.sqrt(2))
+
+
+def _rolling_median(values: np.ndarray) -> np.ndarray:
+    padded = np.pad(values, SPIKE_HALF_WINDOW, mode="edge")
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, 2 * SPIKE_HALF_WINDOW + 1), axis=1)
+
+
+def summarize(values: np.ndarray) -> dict:
+    """Latest, mean, min, max and percentiles of a series."""
+    if not len(values):
+        return {}
+    summary = {
+        "latest": float(values[-1]),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{q}"] = float(value)
+    return summary
+
+
+def _best_split(prefix: np.ndarray, prefix_sq: np.ndarray, start: int, end: int) -> Optional[tuple]:
+    """The split of values[start:end] into two that most reduces the squared error, and the reduction."""
+    n = end - start
+    if n < 2 * MIN_SEGMENT:
+        return None
+    k = np.arange(start + MIN_SEGMENT, end - MIN_SEGMENT + 1)
+    total = prefix[end] - prefix[start]
+    total_sq = prefix_sq[end] - prefix_sq[start]
+    left = prefix[k] - prefix[start]
+    right = total - left
+    left_n = k - start
+    right_n = end - k
+    cost = total_sq - left**2 / left_n - right**2 / right_n
+    best = int(np.argmin(cost))
+    reduction = (total_sq - total**2 / n) - cost[best]
+    return int(k[best]), float(reduction)
+
+
+def change_points(values: np.ndarray, max_points: int = MAX_CHANGE_POINTS) -> List[ChangePoint]:
+    """
+    Shifts in the level of a series, by binary segmentation.
+
+    The segment whose best split removes the most squared error is split
+    first; a split is only kept if the reduction beats a BIC-style penalty
+    relative to the noise level, so a flat noisy series has none. Splits are
+    searched on the rolling median of the series, so that a short spike is
+    not taken for two shifts.
+    """
+    sigma = _robust_sigma(values)
+    if sigma == 0 or len(values) < 2 * MIN_SEGMENT:
+        return []
+    penalty = CHANGE_PENALTY * sigma**2 * np.log(len(values))
+    smoothed = _rolling_median(values)
+    prefix = np.concatenate(([0.0], np.cumsum(smoothed)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(smoothed**2)))
+    segments = [(0, len(values))]
+    splits: List[int] = []
+    while len(splits) < max_points:
+        candidates = []
+        for start, end in segments:
+            split = _best_split(prefix, prefix_sq, start, end)
+            if split is not None and split[1] > penalty:
+                candidates.append((split[1], split[0], start, end))
+        if not candidates:
+            break
+        _, split, start, end = max(candidates)
+        segments.remove((start, end))
+        segments += [(start, split), (split, end)]
+        splits.append(split)
+
+    bounds = sorted(segments)
+    points = []
+    for split in sorted(splits):
+        before = next(b for b in bounds if b[1] == split)
+        after = next(b for b in bounds if b[0] == split)
+        points.append(
+            ChangePoint(split, float(values[before[0] : before[1]].mean()), float(values[after[0] : after[1]].mean()))
+        )
+    return points
+
+
+def spikes(values: np.ndarray, z: float = SPIKE_Z) -> List[Spike]:
+    """
+    Runs of points far above the rolling median around them.
+
+    Comparing with the local median rather than the global one keeps a
+    level shift or trend from being reported as one long spike.
+    """
+    n = len(values)
+    sigma = _robust_sigma(values)
+    if n < 3 or sigma == 0:
+        return []
+    high = (values - _rolling_median(values)) / sigma > z
+    if not high.any():
+        return []
+    # Start and end indices of each run of consecutive high points
+    edges = np.diff(np.concatenate(([0], high.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return [Spike(int(s), int(e), int(s + np.argmax(values[s : e + 1]))) for s, e in zip(starts, ends)]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, budget: int = DEFAULT_POINT_BUDGET) -> np.ndarray:
+    """
+    Indices of ``budget`` points that keep the visual shape of the series,
+    by Largest-Triangle-Three-Buckets: the first and last points, plus from
+    each bucket in between the point forming the largest triangle with the
+    point kept from the previous bucket and the mean of the next bucket.
+    """
+    n = len(x)
+    if n <= budget or budget < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)
+    selected = [0]
+    for i in range(budget - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_lo:next_hi].mean()
+        next_y = y[next_lo:next_hi].mean()
+        ax, ay = x[selected[-1]], y[selected[-1]]
+        area = np.abs((ax - next_x) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y - ay))
+        selected.append(lo + int(np.argmax(area)))
+    selected.append(n - 1)
+    return np.asarray(selected)
+
+
+def baseline_zscores(series: np.ndarray, recent: int, floor: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compare the last ``recent`` columns of each row of a 2-D array (one
+    series per row, NaN where there is no datapoint) with the columns before.
+
+    The z-score is the shift of the recent mean from the baseline mean in
+    baseline standard deviations. The standard deviation is floored at
+    ``MIN_RELATIVE_SPREAD`` of the baseline mean and at ``floor``, so that a
+    flat baseline does not make any small change look significant. Rows
+    without data in both parts get NaN.
+
+    Returns:
+        The z-scores, recent means and baseline means, one per row
+    """
+    baseline, current = series[:, :-recent], series[:, -recent:]
+    with warnings.catch_warnings():
+        # Rows with no datapoints on one side are expected; they come out as NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        baseline_mean = np.nanmean(baseline, axis=1)
+        spread = np.nanstd(baseline, axis=1)
+        current_mean = np.nanmean(current, axis=1)
+    spread = np.maximum(np.maximum(spread, MIN_RELATIVE_SPREAD * np.abs(baseline_mean)), floor)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (current_mean - baseline_mean) / spread
+    z[spread == 0] = np.nan
+    return z, current_mean, baseline_mean
@@ -0,0 +1,267 @@
+"""
+Service dependency map built from Application Signals dependency listings
+and the X-Ray service graph, kept in memory as an adjacency index.
+
+Refreshes are incremental: X-Ray is only asked for the interval since the
+last refresh, and only the Application Signals services whose dependency
+listing has gone stale are listed again.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from . import deadlines
+
+# Call statistics older than this are dropped from the map
+RETENTION = timedelta(hours=6)
+# An Application Signals service's dependencies are listed again after this
+DEPENDENCY_TTL = timedelta(minutes=15)
+# Services whose dependencies are listed per refresh; the rest wait for the next one
+MAX_LISTINGS_PER_REFRESH = 50
+# X-Ray accepts service graph requests of at most this length
+XRAY_MAX_WINDOW = timedelta(hours=6)
+# Recent X-Ray data is left for the next refresh, since it is still arriving
+XRAY_LAG = timedelta(minutes=1)
+
+_NEVER = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def node_name(key_attributes: Dict[str, str]) -> str:
+    """Name of a service, remote service or AWS resource from its Application Signals key attributes."""
+    return (
+        key_attributes.get("Name")
+        or key_attributes.get("Identifier")
+        or key_attributes.get("ResourceType")
+        or "Unknown"
+    )
+
+
+@dataclass(slots=True)
+class CallStats:
+    requests: int = 0
+    faults: int = 0
+    errors: int = 0
+    total_response_time: float = 0.0
+
+    def add(self, other: "CallStats") -> None:
+        self.requests += other.requests
+        self.faults += other.faults
+        self.errors += other.errors
+        self.total_response_time += other.total_response_time
+
+
+@dataclass(slots=True)
+class Edge:
+    source: str
+    target: str
+    # (caller operation, callee operation) pairs from Application Signals
+    operations: Set[Tuple[str, str]] = field(default_factory=set)
+    stats: CallStats = field(default_factory=CallStats)
+    # "appsignals" and/or "xray"
+    sources: Set[str] = field(default_factory=set)
+
+    @property
+    def fault_rate(self) -> Optional[float]:
+        return self.stats.faults / self.stats.requests if self.stats.requests else None
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        return self.stats.total_response_time / self.stats.requests if self.stats.requests else None
+
+
+@dataclass(slots=True)
+class _Listing:
+    fetched_at: datetime
+    # Dependency name -> operation pairs
+    dependencies: Dict[str, Set[Tuple[str, str]]]
+
+
+class ServiceMap:
+    """
+    Dependency graph of the services in one region/account.
+
+    ``refresh`` fetches what changed since the previous refresh and rebuilds
+    the adjacency index; queries only read the index and make no AWS calls.
+    """
+
+    def __init__(self, appsignals: Any, xray: Any, list_services: Callable[[datetime, datetime], list]) -> None:
+        self._appsignals = appsignals
+        self._xray = xray
+        self._list_services = list_services
+        self._listings: Dict[str, _Listing] = {}
+        self._key_attributes: Dict[str, Dict[str, str]] = {}
+        # X-Ray call statistics per edge, per fetched interval (by its end)
+        self._xray_intervals: Deque[Tuple[datetime, Dict[Tuple[str, str], CallStats]]] = deque()
+        self._xray_until: Optional[datetime] = None
+        self._node_types: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.downstream: Dict[str, Dict[str, Edge]] = {}
+        self.upstream: Dict[str, Dict[str, Edge]] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self.last_refresh_calls = 0
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Fetch new X-Ray data and stale dependency listings, then rebuild the index. Returns the API calls made."""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            calls = self._refresh_xray(now) + self._refresh_listings(now)
+            self._rebuild_index()
+            self.refreshed_at = now
+            self.last_refresh_calls = calls
+            return calls
+
+    def _refresh_xray(self, now: datetime) -> int:
+        until = now - XRAY_LAG
+        start = max(self._xray_until or until - RETENTION, until - RETENTION)
+        calls = 0
+        while start < until:
+            end = min(start + XRAY_MAX_WINDOW, until)
+            edges: Dict[Tuple[str, str], CallStats] = {}
+            kwargs = {"StartTime": start, "EndTime": end}
+            while True:
+                deadlines.checkpoint()
+                response = self._xray.get_service_graph(**kwargs)
+                calls += 1
+                self._add_xray_services(response.get("Services", []), edges)
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+            self._xray_intervals.append((end, edges))
+            start = end
+        self._xray_until = until
+        while self._xray_intervals and self._xray_intervals[0][0] < now - RETENTION:
+            self._xray_intervals.popleft()
+        return calls
+
+    def _add_xray_services(self, services: List[Dict[str, Any]], edges: Dict[Tuple[str, str], CallStats]) -> None:
+        names = {service.get("ReferenceId"): service.get("Name", "Unknown") for service in services}
+        for service in services:
+            # The "client" node stands for callers outside of the traced services
+            if service.get("Type") == "client":
+                continue
+            source = service.get("Name", "Unknown")
+            self._node_types.setdefault(source, service.get("Type", ""))
+            for edge in service.get("Edges", []):
+                target = names.get(edge.get("ReferenceId"))
+                if target is None:
+                    continue
+                summary = edge.get("SummaryStatistics", {})
+                stats = edges.setdefault((source, target), CallStats())
+                stats.add(
+                    CallStats(
+                        requests=summary.get("TotalCount", 0),
+                        faults=summary.get("FaultStatistics", {}).get("TotalCount", 0),
+                        errors=summary.get("ErrorStatistics", {}).get("TotalCount", 0),
+                        total_response_time=summary.get("TotalResponseTime", 0.0),
+                    )
+                )
+
+    def _refresh_listings(self, now: datetime) -> int:
+        start = now - RETENTION
+        services = self._list_services(start, now)
+        calls = 1
+        listed = {}
+        for service in services:
+            key_attributes = service.get("KeyAttributes", {})
+            listed[node_name(key_attributes)] = key_attributes
+        # Services gone from Application Signals take their dependencies with them
+        for name in set(self._listings) - set(listed):
+            del self._listings[name]
+        self._key_attributes = listed
+
+        stale = [
+            name
+            for name in listed
+            if name not in self._listings or now - self._listings[name].fetched_at >= DEPENDENCY_TTL
+        ]
+        # Never-listed services first, then the stalest
+        stale.sort(key=lambda name: self._listings[name].fetched_at if name in self._listings else _NEVER)
+        for name in stale[:MAX_LISTINGS_PER_REFRESH]:
+            dependencies: Dict[str, Set[Tuple[str, str]]] = {}
+            kwargs = {"StartTime": start, "EndTime": now, "KeyAttributes": listed[name], "MaxResults": 100}
+            while True:
+                deadlines.checkpoint()
+                response = self._appsignals.list_service_dependencies(**kwargs)
+                calls += 1
+                for dependency in response.get("ServiceDependencies", []):
+                    target_attributes = dependency.get("DependencyKeyAttributes", {})
+                    target = node_name(target_attributes)
+                    self._node_types.setdefault(target, target_attributes.get("Type", ""))
+                    dependencies.setdefault(target, set()).add(
+                        (dependency.get("OperationName", ""), dependency.get("DependencyOperationName", ""))
+                    )
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+            self._listings[name] = _Listing(now, dependencies)
+        return calls
+
+    def _rebuild_index(self) -> None:
+        edges: Dict[Tuple[str, str], Edge] = {}
+        for source, listing in self._listings.items():
+            for target, operations in listing.dependencies.items():
+                edge = edges.setdefault((source, target), Edge(source, target))
+                edge.operations |= operations
+                edge.sources.add("appsignals")
+        for _, interval in self._xray_intervals:
+            for (source, target), stats in interval.items():
+                edge = edges.setdefault((source, target), Edge(source, target))
+                edge.stats.add(stats)
+                edge.sources.add("xray")
+
+        downstream: Dict[str, Dict[str, Edge]] = {}
+        upstream: Dict[str, Dict[str, Edge]] = {}
+        for (source, target), edge in edges.items():
+            downstream.setdefault(source, {})[target] = edge
+            upstream.setdefault(target, {})[source] = edge
+        # Swapped in whole, so queries never see a half-built index
+        self.downstream, self.upstream = downstream, upstream
+
+    @property
+    def nodes(self) -> Set[str]:
+        return set(self.downstream) | set(self.upstream) | set(self._key_attributes)
+
+    def node_type(self, name: str) -> str:
+        return self._key_attributes.get(name, {}).get("Type") or self._node_types.get(name, "")
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The node with this name, matched case-insensitively if there is no exact match."""
+        nodes = self.nodes
+        if name in nodes:
+            return name
+        matches = [node for node in nodes if node.lower() == name.lower()]
+        return matches[0] if len(matches) == 1 else None
+
+    def walk(self, start: str, direction: str, max_depth: int) -> List[Tuple[int, Edge]]:
+        """
+        Edges reachable from ``start`` breadth-first, with the depth each was reached at.
+
+        ``direction`` is "downstream" (what ``start`` calls, transitively) or
+        "upstream" (what calls it). Each node is expanded once.
+        """
+        index = self.downstream if direction == "downstream" else self.upstream
+        seen = {start}
+        frontier = [start]
+        reached = []
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            for node in frontier:
+                for neighbor, edge in index.get(node, {}).items():
+                    reached.append((depth, edge))
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return reached
+
+    def blast_radius(self, start: str, max_depth: int = 10) -> Dict[str, int]:
+        """Every service that calls ``start`` directly or transitively, with its distance."""
+        distances: Dict[str, int] = {}
+        for depth, edge in self.walk(start, "upstream", max_depth):
+            if edge.source != start:
+                distances.setdefault(edge.source, depth)
+        return distances
@@ -0,0 +1,200 @@
+"""
+Cache shared by every server process on the machine, in a SQLite database.
+
+Agents typically start ``mcpserver.py`` as a fresh stdio subprocess per
+session, so an in-memory cache starts cold every time. Entries stored here
+outlive the process: a new session finds the service catalog and recent
+metric queries already fetched by the sessions before it.
+
+The database uses WAL mode, so readers in one process do not block a writer
+in another. Entries expire after their TTL, and the least recently read
+entries are evicted once the total size exceeds the cap. A process about to
+compute a missing entry takes a short lease on its key, so concurrent
+sessions missing the same key wait for one fetch instead of all making it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from time import sleep, time
+from typing import Any, Callable, Optional, TypeVar
+
+from . import deadlines
+from .recordreplay import dumps, loads
+
+T = TypeVar("T")
+
+# Where the cache is kept when it is enabled with APPSIGNALS_SHARED_CACHE=1
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "appsignals-mcp", "shared.sqlite3")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Eviction brings the total size down to this fraction of the cap, so it does not run on every write
+EVICT_TO = 0.9
+# A read only records its time if the last recorded one is older than this, to keep reads from writing
+ACCESS_RESOLUTION = 60.0
+# How long a process may hold a lease while computing an entry, and how often waiters check on it
+LEASE_SECONDS = 30.0
+LEASE_POLL = 0.05
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+_MISSING = object()
+
+
+class SharedCache:
+    """
+    TTL cache of JSON-serializable values in a SQLite database shared between processes.
+
+    Values round-trip through the same encoding as recordings, so the
+    datetimes and bytes in AWS responses come back as they went in.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        self._owner = f"{os.getpid()}:{id(self)}"
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL makes NORMAL durable enough for a cache, and commits skip the fsync
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Any:
+        """The stored value, or None if it is missing or expired."""
+        value = self._get(key)
+        return None if value is _MISSING else value
+
+    def _get(self, key: str) -> Any:
+        now = time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, accessed_at FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+            if now - row[1] > ACCESS_RESOLUTION:
+                with self._conn:
+                    self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return loads(row[0])
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ``ttl`` seconds, evicting the least recently read entries if over the size cap."""
+        encoded = dumps(value)
+        now = time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if total > self.max_bytes:
+                # Keep the most recently read entries that fit in EVICT_TO of the cap
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "  SELECT key FROM ("
+                    "    SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running FROM entries"
+                    "  ) WHERE running > ?"
+                    ")",
+                    (self.max_bytes * EVICT_TO,),
+                )
+
+    def get_or_compute(self, key: str, ttl: float, compute: Callable[[], T]) -> T:
+        """
+        Return the stored value, or compute, store and return it. Runs synchronously.
+
+        If another process or thread is already computing the same key, wait
+        for its result rather than computing it again, for up to the lease time.
+        """
+        value = self._get(key)
+        if value is not _MISSING:
+            return value
+        while not self._acquire_lease(key):
+            deadlines.checkpoint()
+            sleep(LEASE_POLL)
+            value = self._get(key)
+            if value is not _MISSING:
+                return value
+        try:
+            value = compute()
+            self.put(key, value, ttl)
+            return value
+        finally:
+            self._release_lease(key)
+
+    def _acquire_lease(self, key: str) -> bool:
+        now = time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.expires_at <= ?",
+                (key, self._owner, now + LEASE_SECONDS, now),
+            )
+            return cursor.rowcount > 0
+
+    def _release_lease(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._owner))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+
+_cache: Optional[SharedCache] = None
+_cache_lock = threading.Lock()
+
+
+def shared_cache() -> Optional[SharedCache]:
+    """
+    Return the process-wide cache at ``$APPSIGNALS_SHARED_CACHE`` (``1`` for
+    DEFAULT_PATH), capped at ``$APPSIGNALS_SHARED_CACHE_MAX_MB``, or None if
+    it is not enabled.
+    """
+    global _cache
+    if _cache is None:
+        path = os.environ.get("APPSIGNALS_SHARED_CACHE", "")
+        if not path:
+            return None
+        if path == "1":
+            path = DEFAULT_PATH
+        with _cache_lock:
+            if _cache is None:
+                max_mb = float(os.environ.get("APPSIGNALS_SHARED_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024))
+                _cache = SharedCache(path, int(max_mb * 1024 * 1024))
+    return _cache
+
+
+def cache_key(namespace: str, **params: Any) -> str:
+    """A key for a request, hashed so that long parameter lists (such as batched metric queries) stay short."""
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{namespace}:{hashlib.sha256(encoded.encode()).hexdigest()}"
+
+
+def cached(key: str, ttl: float, compute: Callable[[], T]) -> T:
+    """``compute()`` through the shared cache if it is enabled, otherwise directly."""
+    cache = shared_cache()
+    return cache.get_or_compute(key, ttl, compute) if cache is not None else compute()
@@ -0,0 +1,246 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from time import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Where SLO definitions and budget snapshots are kept; empty disables the store
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "appsignals-mcp", "slo.sqlite3")
+
+# Budget snapshots of one SLO closer together than this are not stored
+SNAPSHOT_SPACING = 300.0
+# Snapshots older than this are dropped
+RETENTION_DAYS = 90
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slo_definitions (
+    arn TEXT NOT NULL,
+    last_updated REAL NOT NULL,
+    name TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (arn, last_updated)
+);
+CREATE INDEX IF NOT EXISTS slo_definitions_name ON slo_definitions (name);
+CREATE TABLE IF NOT EXISTS budget_snapshots (
+    arn TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    name TEXT NOT NULL,
+    budget_status TEXT,
+    attainment REAL,
+    budget_remaining REAL,
+    attainment_goal REAL,
+    PRIMARY KEY (arn, taken_at)
+);
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class BudgetSnapshot:
+    arn: str
+    taken_at: float
+    name: str
+    budget_status: Optional[str]
+    attainment: Optional[float]
+    # Fraction of the error budget left, 0 to 1
+    budget_remaining: Optional[float]
+    attainment_goal: Optional[float]
+
+
+def budget_remaining_fraction(report: Dict[str, Any]) -> Optional[float]:
+    """Fraction of the error budget left, for period-based and request-based SLOs alike."""
+    for remaining_key, total_key in (
+        ("BudgetSecondsRemaining", "TotalBudgetSeconds"),
+        ("BudgetRequestsRemaining", "TotalBudgetRequests"),
+    ):
+        total = report.get(total_key)
+        if total:
+            return report.get(remaining_key, 0) / total
+    return None
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return 0.0
+
+
+class SloStore:
+    """
+    Persistent SLO state in a local SQLite database.
+
+    SLO definitions are stored per ARN and ``LastUpdatedTime``, so a changed
+    SLO gets a new row instead of overwriting the definition older snapshots
+    were taken under. Budget snapshots accumulate each time SLI status is
+    computed. WAL mode lets several server processes share the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def get_definition(
+        self, slo_id: str, max_age: float, region: Optional[str] = None, account: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the latest stored definition of an SLO if fetched within ``max_age`` seconds.
+
+        ``slo_id`` is an ARN, or a name looked up among the SLOs of ``account``
+        in ``region`` only, since other accounts may have SLOs of the same name.
+        """
+        if slo_id.startswith("arn:"):
+            query, params = "arn = ?", (slo_id,)
+        else:
+            query, params = "name = ? AND arn LIKE ?", (slo_id, _arn_pattern(region, account))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT definition, fetched_at FROM slo_definitions WHERE {query} ORDER BY last_updated DESC LIMIT 1",
+                params,
+            ).fetchone()
+        if row is None or time() - row[1] > max_age:
+            return None
+        return json.loads(row[0])
+
+    def put_definition(self, slo: Dict[str, Any]) -> None:
+        """Store a definition fetched from AWS, or mark an unchanged one as freshly fetched."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO slo_definitions (arn, last_updated, name, definition, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (arn, last_updated) DO UPDATE SET fetched_at = excluded.fetched_at",
+                (
+                    slo["Arn"],
+                    _timestamp(slo.get("LastUpdatedTime")),
+                    slo.get("Name", slo["Arn"]),
+                    json.dumps(slo, default=str),
+                    time(),
+                ),
+            )
+
+    def latest_definition(self, arn: str) -> Optional[Dict[str, Any]]:
+        """Return the latest stored definition of an SLO however old it is."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT definition FROM slo_definitions WHERE arn = ? ORDER BY last_updated DESC LIMIT 1", (arn,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_budget_reports(self, reports: Iterable[Dict[str, Any]], taken_at: Optional[float] = None) -> int:
+        """Append a snapshot per budget report, skipping SLOs snapshotted recently. Returns the number stored."""
+        taken_at = time() if taken_at is None else taken_at
+        rows = [
+            (
+                report["Arn"],
+                taken_at,
+                report.get("Name", report["Arn"]),
+                report.get("BudgetStatus"),
+                report.get("Attainment"),
+                budget_remaining_fraction(report),
+                report.get("Goal", {}).get("AttainmentGoal"),
+                report["Arn"],
+                taken_at - SNAPSHOT_SPACING,
+            )
+            for report in reports
+            if report.get("Arn")
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO budget_snapshots "
+                "(arn, taken_at, name, budget_status, attainment, budget_remaining, attainment_goal) "
+                "SELECT ?, ?, ?, ?, ?, ?, ? "
+                "WHERE NOT EXISTS (SELECT 1 FROM budget_snapshots WHERE arn = ? AND taken_at > ?)",
+                rows,
+            )
+            stored = self._conn.total_changes - before
+            self._conn.execute(
+                "DELETE FROM budget_snapshots WHERE taken_at < ?", (taken_at - RETENTION_DAYS * 86400,)
+            )
+        return stored
+
+    def budget_history(self, arn: str, since: float) -> List[BudgetSnapshot]:
+        """Return the budget snapshots of an SLO, by ARN, taken since a Unix time, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT arn, taken_at, name, budget_status, attainment, budget_remaining, attainment_goal "
+                "FROM budget_snapshots WHERE arn = ? AND taken_at >= ? ORDER BY taken_at",
+                (arn, since),
+            ).fetchall()
+        return [BudgetSnapshot(*row) for row in rows]
+
+
+def _arn_pattern(region: str, account: str) -> str:
+    """LIKE pattern matching the SLO ARNs of one account and region."""
+    return f"arn:%:application-signals:{region}:{account}:slo/%"
+
+
+_UNIT_HOURS = {"MINUTE": 1 / 60, "HOUR": 1.0, "DAY": 24.0, "MONTH": 24.0 * 30}
+
+
+def interval_hours(slo: Dict[str, Any]) -> Optional[float]:
+    """Length of an SLO's goal interval in hours (months count as 30 days)."""
+    interval = slo.get("Goal", {}).get("Interval", {})
+    spec = interval.get("RollingInterval") or interval.get("CalendarInterval")
+    if not spec or spec.get("DurationUnit") not in _UNIT_HOURS:
+        return None
+    return spec.get("Duration", 0) * _UNIT_HOURS[spec["DurationUnit"]]
+
+
+def budget_consumed(history: List[BudgetSnapshot], window_seconds: float) -> Optional[float]:
+    """
+    Fraction of the total error budget consumed over the window ending at the latest snapshot.
+
+    Snapshots are irregular, so consumption is measured between the latest
+    snapshot and the one closest to the window's start, and scaled to the
+    window. Negative when budget was recovered, as old errors leave a rolling
+    interval. None if no snapshot is within half a window of the start.
+    """
+    known = [snapshot for snapshot in history if snapshot.budget_remaining is not None]
+    if len(known) < 2:
+        return None
+    latest = known[-1]
+    start = latest.taken_at - window_seconds
+    first = min(known[:-1], key=lambda snapshot: abs(snapshot.taken_at - start))
+    if abs(first.taken_at - start) > window_seconds / 2:
+        return None
+    return (first.budget_remaining - latest.budget_remaining) * window_seconds / (latest.taken_at - first.taken_at)
+
+
+def burn_rate(consumed: float, window_seconds: float, interval: float) -> float:
+    """
+    Rate of budget consumption relative to the rate that would use up exactly
+    the whole budget over the SLO's interval (given in hours); 1.0 is on pace.
+    """
+    return max(consumed, 0.0) / (window_seconds / (interval * 3600))
+
+
+_store: Optional[SloStore] = None
+_store_lock = threading.Lock()
+
+
+def slo_store() -> Optional[SloStore]:
+    """Return the process-wide store at ``$APPSIGNALS_SLO_STORE``, or None if it is disabled."""
+    global _store
+    if _store is None:
+        path = os.environ.get("APPSIGNALS_SLO_STORE", DEFAULT_PATH)
+        if not path:
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = SloStore(path)
+    return _store
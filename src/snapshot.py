@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from . import deadlines
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot(Generic[T]):
+    version: int
+    value: T
+    taken_at: datetime
+    taken_monotonic: float
+
+    @property
+    def age_seconds(self) -> float:
+        return monotonic() - self.taken_monotonic
+
+
+class BackgroundRefresher(Generic[T]):
+    """
+    Periodically recompute a value on the event loop and keep the latest snapshot.
+
+    A failed refresh keeps the previous snapshot. Refreshes never overlap:
+    a caller forcing a refresh while one is running waits for that one.
+    """
+
+    def __init__(self, name: str, compute: Callable[[], Awaitable[T]], interval: float) -> None:
+        self.name = name
+        self.interval = interval
+        self.snapshot: Optional[Snapshot[T]] = None
+        self.last_error: Optional[BaseException] = None
+        self._compute = compute
+        self._task: Optional["asyncio.Task[Any]"] = None
+        self._refreshing: Optional["asyncio.Future[Snapshot[T]]"] = None
+
+    def ensure_started(self) -> None:
+        """Start the refresh loop on the running event loop, if it is not running yet."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"refresh-{self.name}")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def get(self) -> Snapshot[T]:
+        """Return the current snapshot, computing the first one if needed."""
+        return self.snapshot or await self.refresh()
+
+    async def refresh(self) -> Snapshot[T]:
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+            self._refreshing.add_done_callback(self._clear_refreshing)
+        return await asyncio.shield(self._refreshing)
+
+    def _clear_refreshing(self, _: "asyncio.Future[Snapshot[T]]") -> None:
+        self._refreshing = None
+
+    async def _refresh(self) -> Snapshot[T]:
+        # A refresh forced by a tool call is shared with every later caller, so
+        # it does not inherit that call's deadline or cancellation.
+        deadlines.detach()
+        try:
+            value = await self._compute()
+        except Exception as e:
+            self.last_error = e
+            raise
+        version = self.snapshot.version + 1 if self.snapshot else 1
+        self.snapshot = Snapshot(version, value, datetime.now(timezone.utc), monotonic())
+        self.last_error = None
+        return self.snapshot
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of {self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,872 @@
+"""
+Local columnar store for span data, with a small Logs Insights-style query language.
+
+Spans are ingested from files: ``aws/spans`` exports (``aws logs
+filter-log-events`` output, one span per line, or Logs Insights result rows),
+console exporter output, or the ``src/spans.log`` format. They are flattened
+into ``aws/spans`` field names (``traceId``, ``durationNano``,
+``attributes.aws.local.service``, ...) and stored as one ``.npy`` file per
+column, which is memory-mapped when queried. String columns are dictionary
+encoded, so filters and group-bys work on integer codes.
+
+Queries are ``|``-separated commands::
+
+    filter attributes.aws.local.service = "checkout" and durationNano > 1e9
+    | stats count(*) as calls, avg(durationNano), pct(durationNano, 99) by name, bin(5m)
+    | sort calls desc
+    | limit 20
+
+Supported commands are ``filter``, ``stats``, ``sort``, ``fields`` and
+``limit``. Aggregates are ``count``, ``count_distinct``, ``sum``, ``avg``,
+``min``, ``max`` and ``pct``.
+"""
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; writers in one process only
+    fcntl = None
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "appsignals-mcp", "spans")
+
+# Fields shown for each span when a query has neither stats nor fields
+DEFAULT_FIELDS = ["@timestamp", "name", "traceId", "spanId", "durationNano", "status.code"]
+
+_MANIFEST = "manifest.json"
+# Held by the process writing to the store
+_WRITE_LOCK = ".lock"
+_MISSING = -1
+
+
+class QueryError(ValueError):
+    pass
+
+
+def iter_json_values(text: str) -> Iterator[Any]:
+    """Yield the JSON values in a file of concatenated, newline-delimited or pretty-printed JSON."""
+    decoder = json.JSONDecoder()
+    position = 0
+    length = len(text)
+    while True:
+        while position < length and text[position].isspace():
+            position += 1
+        if position >= length:
+            return
+        value, position = decoder.raw_decode(text, position)
+        yield value
+
+
+def iter_spans(value: Any) -> Iterator[Dict[str, Any]]:
+    """Yield span dicts found in a parsed JSON value, unwrapping log event and query result containers."""
+    if isinstance(value, list):
+        # A Logs Insights result row is a list of {"field": ..., "value": ...}
+        if value and all(isinstance(item, dict) and set(item) == {"field", "value"} for item in value):
+            yield {item["field"]: item["value"] for item in value}
+            return
+        for item in value:
+            yield from iter_spans(item)
+    elif isinstance(value, dict):
+        if _is_log_events(value):
+            for event in value["events"]:
+                yield from iter_spans(event)
+        elif isinstance(value.get("results"), list):
+            yield from iter_spans(value["results"])
+        elif isinstance(value.get("message"), str):
+            try:
+                yield from iter_spans(json.loads(value["message"]))
+            except ValueError:
+                return
+        else:
+            yield value
+
+
+def _is_log_events(value: Dict[str, Any]) -> bool:
+    """
+    Whether a dict is ``filter-log-events`` output rather than a span; console
+    exporter spans have an ``events`` list too, holding their span events.
+    """
+    events = value.get("events")
+    if not isinstance(events, list) or any(key in value for key in ("context", "trace_id", "traceId")):
+        return False
+    return all(isinstance(event, dict) and "message" in event for event in events)
+
+
+def _epoch_seconds(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # Nanoseconds, milliseconds or seconds since the epoch
+        if value > 1e17:
+            return value / 1e9
+        if value > 1e11:
+            return value / 1e3
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _flatten(value: Dict[str, Any], prefix: str, out: Dict[str, Any]) -> None:
+    for key, item in value.items():
+        name = f"{prefix}{key}"
+        if isinstance(item, dict):
+            _flatten(item, name + ".", out)
+        else:
+            out[name] = item
+
+
+def normalize_span(span: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a span into ``aws/spans`` field names, whichever exporter produced it."""
+    record: Dict[str, Any] = {}
+    _flatten(span, "", record)
+
+    # OpenTelemetry console exporter and src/spans.log names
+    renames = {
+        "context.trace_id": "traceId",
+        "trace_id": "traceId",
+        "context.span_id": "spanId",
+        "span_id": "spanId",
+        "parent_id": "parentSpanId",
+        "status.status_code": "status.code",
+    }
+    for old, new in renames.items():
+        if old in record and new not in record:
+            record[new] = record.pop(old)
+    for key in ("traceId", "spanId", "parentSpanId"):
+        if isinstance(record.get(key), str) and record[key].startswith("0x"):
+            record[key] = record[key][2:]
+
+    start = _epoch_seconds(
+        record.pop("start_time", None)
+        or record.get("startTimeUnixNano")
+        or record.pop("timestamp", None)
+        or record.get("@timestamp")
+    )
+    if "durationNano" not in record and start is not None:
+        end = _epoch_seconds(record.pop("end_time", None) or record.get("endTimeUnixNano"))
+        if end is not None:
+            record["durationNano"] = (end - start) * 1e9
+    record["@timestamp"] = start
+    return record
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if _is_number(value):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_string(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+@dataclass
+class Column:
+    """A numeric column (float64, NaN when missing) or a dictionary-encoded string column (-1 when missing)."""
+
+    kind: str
+    data: np.ndarray
+    dictionary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def value(self, row: int) -> Any:
+        if self.kind == "num":
+            value = self.data[row]
+            return None if np.isnan(value) else float(value)
+        code = self.data[row]
+        return None if code == _MISSING else self.dictionary[code]
+
+    def numeric(self) -> np.ndarray:
+        """Values as floats; strings that parse as numbers are converted, others become NaN."""
+        if self.kind == "num":
+            return np.asarray(self.data, dtype=np.float64)
+        lookup = np.array([_as_number(v) if _as_number(v) is not None else np.nan for v in self.dictionary] + [np.nan])
+        return lookup[self.data]
+
+
+def _build_column(values: List[Any]) -> Column:
+    present = [value for value in values if value is not None]
+    if present and all(_is_number(value) for value in present):
+        return Column("num", np.array([np.nan if value is None else float(value) for value in values]))
+    strings = [_as_string(value) for value in values]
+    dictionary = sorted({value for value in strings if value is not None})
+    index = {value: code for code, value in enumerate(dictionary)}
+    codes = np.array([_MISSING if value is None else index[value] for value in strings], dtype=np.int32)
+    return Column("str", codes, dictionary)
+
+
+def _as_string_column(column: Column) -> Column:
+    if column.kind == "str":
+        return column
+    return _build_column([_as_string(column.value(row)) for row in range(len(column))])
+
+
+def _missing_column(kind: str, rows: int) -> Column:
+    if kind == "num":
+        return Column("num", np.full(rows, np.nan))
+    return Column("str", np.full(rows, _MISSING, dtype=np.int32), [])
+
+
+def _append_column(existing: Optional[Column], rows: int, values: List[Any]) -> Column:
+    """``existing`` (None if no span had the field yet) with ``values`` appended, without re-encoding old rows."""
+    added = _build_column(values)
+    if existing is None or not _present(existing).any():
+        existing = _missing_column(added.kind, rows)
+    if not _present(added).any():
+        added = _missing_column(existing.kind, len(values))
+    if existing.kind == "num" and added.kind == "num":
+        return Column("num", np.concatenate([np.asarray(existing.data), added.data]))
+    existing, added = _as_string_column(existing), _as_string_column(added)
+    # Merge the sorted dictionaries and map both sides' codes onto the merged one;
+    # the extra last entry of each map sends _MISSING (-1) to _MISSING
+    dictionary = sorted(set(existing.dictionary) | set(added.dictionary))
+    index = {value: code for code, value in enumerate(dictionary)}
+    old_map = np.array([index[value] for value in existing.dictionary] + [_MISSING], dtype=np.int32)
+    new_map = np.array([index[value] for value in added.dictionary] + [_MISSING], dtype=np.int32)
+    codes = np.concatenate([old_map[np.asarray(existing.data)], new_map[added.data]])
+    return Column("str", codes, dictionary)
+
+
+class SpanTable:
+    def __init__(self, columns: Dict[str, Column], rows: int) -> None:
+        self.columns = columns
+        self.rows = rows
+
+    def column(self, name: str) -> Column:
+        column = self.columns.get(name)
+        if column is None:
+            # A field no span has behaves as missing everywhere
+            return Column("num", np.full(self.rows, np.nan))
+        return column
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self.rows):
+            record = {}
+            for name, column in self.columns.items():
+                value = column.value(row)
+                if value is not None:
+                    record[name] = value
+            yield record
+
+
+class SpanStore:
+    """
+    A directory of memory-mapped column files plus a manifest.
+
+    Ingesting writes new column files with the new spans appended to the old
+    columns; spans already present (same trace and span id) are skipped, so
+    re-ingesting an export is harmless. Readers reload the table when the manifest changes.
+    Writers, in this process or others, take turns.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._table: Optional[SpanTable] = None
+        self._loaded_mtime: Optional[float] = None
+
+    def table(self) -> SpanTable:
+        manifest_path = os.path.join(self.path, _MANIFEST)
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+        except FileNotFoundError:
+            return SpanTable({}, 0)
+        with self._lock:
+            if self._table is None or mtime != self._loaded_mtime:
+                self._table = self._load(manifest_path)
+                self._loaded_mtime = mtime
+            return self._table
+
+    def _load(self, manifest_path: str) -> SpanTable:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        columns = {}
+        for name, spec in manifest["columns"].items():
+            data = np.load(os.path.join(self.path, spec["file"]), mmap_mode="r")
+            columns[name] = Column(spec["kind"], data, spec.get("dictionary"))
+        return SpanTable(columns, manifest["rows"])
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Hold the store for a read-modify-write, against threads and other processes."""
+        os.makedirs(self.path, exist_ok=True)
+        with self._write_lock:
+            fd = os.open(os.path.join(self.path, _WRITE_LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the file releases the lock
+                os.close(fd)
+
+    def ingest(self, spans: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """Add spans to the store; returns how many were added and how many were already present."""
+        # Parsed before taking the lock, so other writers only wait for the write itself
+        spans = list(spans)
+        with self._writing():
+            return self._ingest(spans)
+
+    def _ingest(self, spans: List[Dict[str, Any]]) -> Tuple[int, int]:
+        manifest_path = os.path.join(self.path, _MANIFEST)
+        # Read under the lock rather than through table(), whose copy may predate another writer's
+        existing = self._load(manifest_path) if os.path.exists(manifest_path) else SpanTable({}, 0)
+        trace_ids = existing.column("traceId")
+        span_ids = existing.column("spanId")
+        seen = {
+            (trace_ids.value(row), span_ids.value(row))
+            for row in np.nonzero(_present(span_ids))[0]
+        }
+        new_records = []
+        skipped = 0
+        for span in spans:
+            record = normalize_span(span)
+            key = (record.get("traceId"), record.get("spanId"))
+            if record.get("spanId") and key in seen:
+                skipped += 1
+                continue
+            seen.add(key)
+            new_records.append(record)
+        if new_records:
+            names = set(existing.columns) | {name for record in new_records for name in record}
+            self._write(
+                {
+                    name: _append_column(
+                        existing.columns.get(name), existing.rows, [record.get(name) for record in new_records]
+                    )
+                    for name in names
+                },
+                existing.rows + len(new_records),
+            )
+        return len(new_records), skipped
+
+    def ingest_file(self, path: str) -> Tuple[int, int]:
+        with open(path) as f:
+            text = f.read()
+        return self.ingest(span for value in iter_json_values(text) for span in iter_spans(value))
+
+    def _write(self, columns: Dict[str, Column], rows: int) -> None:
+        manifest_path = os.path.join(self.path, _MANIFEST)
+        previous = set()
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                previous = {spec["file"] for spec in json.load(f)["columns"].values()}
+        generation = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+        manifest: Dict[str, Any] = {"rows": rows, "columns": {}}
+        for i, name in enumerate(sorted(columns)):
+            column = columns[name]
+            file_name = f"c{i}-{generation}.npy"
+            np.save(os.path.join(self.path, file_name), column.data)
+            spec: Dict[str, Any] = {"kind": column.kind, "file": file_name}
+            if column.dictionary is not None:
+                spec["dictionary"] = column.dictionary
+            manifest["columns"][name] = spec
+        # Readers switch to the new files atomically when the manifest is replaced
+        temporary = os.path.join(self.path, _MANIFEST + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temporary, manifest_path)
+        # Only the files of the replaced manifest; readers that still map them keep their data
+        for file_name in previous - {spec["file"] for spec in manifest["columns"].values()}:
+            try:
+                os.remove(os.path.join(self.path, file_name))
+            except FileNotFoundError:
+                pass
+
+
+_store: Optional[SpanStore] = None
+
+
+def span_store() -> SpanStore:
+    """Return the process-wide store at ``$APPSIGNALS_SPAN_STORE``."""
+    global _store
+    if _store is None:
+        _store = SpanStore(os.environ.get("APPSIGNALS_SPAN_STORE", DEFAULT_PATH))
+    return _store
+
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<backtick>`[^`]*`)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<regex>/(?:[^/\\]|\\.)*/i?)
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))
+      | (?P<op>!=|<=|>=|==|=|<|>|\(|\)|,|\[|\])
+      | (?P<word>[@\w][\w.@\-]*\*?|\*)
+    )""",
+    re.VERBOSE,
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Unexpected input at: {text[position:position + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "backtick":
+            kind, value = "word", value[1:-1]
+        elif kind == "string":
+            kind, value = "string", bytes(value[1:-1], "utf-8").decode("unicode_escape")
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+def _split_pipeline(query: str) -> List[str]:
+    """Split on ``|`` outside of quotes, backticks and regex literals."""
+    parts, current, quote = [], "", None
+    for char in query:
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in "\"'`/":
+            quote = char
+            current += char
+        elif char == "|":
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.position += 1
+        return token
+
+    def accept(self, value: str) -> bool:
+        token = self.peek()
+        if token is not None and token[1].lower() == value:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> None:
+        if not self.accept(value):
+            raise QueryError(f"Expected {value!r}")
+
+    def done(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    def field(self) -> str:
+        kind, value = self.next()
+        if kind != "word":
+            raise QueryError(f"Expected a field name, got {value!r}")
+        return value
+
+    def literal(self) -> Any:
+        kind, value = self.next()
+        if kind == "number":
+            return float(value)
+        if kind == "string":
+            return value
+        if kind == "word" and value.lower() in ("true", "false"):
+            return value.lower()
+        raise QueryError(f"Expected a value, got {value!r}")
+
+
+Mask = Callable[[SpanTable], np.ndarray]
+
+
+def _compare(column: Column, op: str, value: Any) -> np.ndarray:
+    if column.kind == "str" and isinstance(value, str):
+        codes = np.asarray(column.data)
+        if op in ("=", "=="):
+            try:
+                return codes == column.dictionary.index(value)
+            except ValueError:
+                return np.zeros(len(codes), dtype=bool)
+        if op == "!=":
+            try:
+                return codes != column.dictionary.index(value)
+            except ValueError:
+                return np.ones(len(codes), dtype=bool)
+        # Ordering comparisons on strings: decide per dictionary entry
+        matches = np.array([_ordering(op, entry, value) for entry in column.dictionary] + [False])
+        return matches[codes]
+    values = column.numeric()
+    number = _as_number(value)
+    if number is None:
+        raise QueryError(f"Cannot compare numeric field with {value!r}")
+    with np.errstate(invalid="ignore"):
+        if op in ("=", "=="):
+            return values == number
+        if op == "!=":
+            return values != number
+        return {"<": values < number, "<=": values <= number, ">": values > number, ">=": values >= number}[op]
+
+
+def _ordering(op: str, left: str, right: str) -> bool:
+    return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op]
+
+
+def _like(column: Column, pattern: "re.Pattern[str]") -> np.ndarray:
+    if column.kind == "num":
+        entries = [str(v) for v in np.asarray(column.data)]
+        return np.array([bool(pattern.search(entry)) for entry in entries], dtype=bool)
+    # The regex runs once per distinct value rather than once per span
+    matches = np.array([bool(pattern.search(entry)) for entry in column.dictionary] + [False])
+    return matches[np.asarray(column.data)]
+
+
+def _present(column: Column) -> np.ndarray:
+    if column.kind == "num":
+        return ~np.isnan(np.asarray(column.data))
+    return np.asarray(column.data) != _MISSING
+
+
+def _parse_condition(parser: _Parser) -> Mask:
+    left = _parse_and(parser)
+    while parser.accept("or"):
+        right = _parse_and(parser)
+        left = (lambda a, b: lambda table: a(table) | b(table))(left, right)
+    return left
+
+
+def _parse_and(parser: _Parser) -> Mask:
+    left = _parse_not(parser)
+    while parser.accept("and"):
+        right = _parse_not(parser)
+        left = (lambda a, b: lambda table: a(table) & b(table))(left, right)
+    return left
+
+
+def _parse_not(parser: _Parser) -> Mask:
+    if parser.accept("not"):
+        inner = _parse_not(parser)
+        return lambda table: ~inner(table)
+    return _parse_primary(parser)
+
+
+def _parse_primary(parser: _Parser) -> Mask:
+    if parser.accept("("):
+        inner = _parse_condition(parser)
+        parser.expect(")")
+        return inner
+    name = parser.field()
+    if name.lower() == "ispresent":
+        parser.expect("(")
+        target = parser.field()
+        parser.expect(")")
+        return lambda table: _present(table.column(target))
+
+    negate = parser.accept("not")
+    if parser.accept("like"):
+        kind, value = parser.next()
+        if kind == "regex":
+            flags = re.IGNORECASE if value.endswith("i") else 0
+            pattern = re.compile(value[1 : value.rindex("/")], flags)
+        elif kind == "string":
+            pattern = re.compile(re.escape(value))
+        else:
+            raise QueryError(f"Expected a string or /regex/ after like, got {value!r}")
+        mask: Mask = lambda table: _like(table.column(name), pattern)
+    elif parser.accept("in"):
+        parser.expect("[")
+        values = [parser.literal()]
+        while parser.accept(","):
+            values.append(parser.literal())
+        parser.expect("]")
+        mask = lambda table: np.logical_or.reduce([_compare(table.column(name), "=", v) for v in values])
+    else:
+        if negate:
+            raise QueryError("'not' must be followed by 'like' or 'in' here")
+        kind, op = parser.next()
+        if kind != "op" or op not in ("=", "==", "!=", "<", "<=", ">", ">="):
+            raise QueryError(f"Expected a comparison after {name!r}, got {op!r}")
+        value = parser.literal()
+        return lambda table: _compare(table.column(name), op, value)
+    if negate:
+        return lambda table: ~mask(table)
+    return mask
+
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class _Aggregate:
+    function: str
+    field: Optional[str]
+    alias: str
+    argument: Optional[float] = None
+
+
+@dataclass
+class _GroupKey:
+    field: str
+    alias: str
+    bin_seconds: Optional[float] = None
+
+
+def _parse_stats(parser: _Parser) -> Tuple[List[_Aggregate], List[_GroupKey]]:
+    aggregates = []
+    while True:
+        function = parser.field().lower()
+        parser.expect("(")
+        target: Optional[str] = None
+        argument = None
+        alias = f"{function}(*)"
+        if not parser.accept(")"):
+            kind, value = parser.next()
+            target = None if value == "*" else value
+            alias = f"{function}({value})"
+            if parser.accept(","):
+                percentile = parser.next()[1]
+                argument = float(percentile)
+                alias = f"{function}({value}, {percentile})"
+            parser.expect(")")
+        if function not in ("count", "count_distinct", "sum", "avg", "min", "max", "pct"):
+            raise QueryError(f"Unknown aggregate {function!r}")
+        if function == "pct" and argument is None:
+            raise QueryError("pct needs a percentile, as in pct(durationNano, 99)")
+        if function != "count" and target is None:
+            raise QueryError(f"{function} needs a field")
+        if parser.accept("as"):
+            alias = parser.field()
+        aggregates.append(_Aggregate(function, target, alias, argument))
+        if not parser.accept(","):
+            break
+
+    groups = []
+    if parser.accept("by"):
+        while True:
+            name = parser.field()
+            if name.lower() == "bin":
+                parser.expect("(")
+                kind, value = parser.next()
+                match = re.fullmatch(r"(\d+(?:\.\d+)?)(ms|s|m|h|d)", value)
+                if not match:
+                    raise QueryError(f"Expected a bin size such as 5m, got {value!r}")
+                parser.expect(")")
+                seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+                groups.append(_GroupKey("@timestamp", f"bin({value})", seconds))
+            else:
+                alias = name
+                if parser.accept("as"):
+                    alias = parser.field()
+                groups.append(_GroupKey(name, alias))
+            if not parser.accept(","):
+                break
+    if not parser.done():
+        raise QueryError(f"Unexpected {parser.peek()[1]!r} in stats")
+    return aggregates, groups
+
+
+def _aggregate(
+    aggregate: _Aggregate, table: SpanTable, rows: np.ndarray, inverse: np.ndarray, groups: int
+) -> List[Any]:
+    if aggregate.function == "count" and aggregate.field is None:
+        return np.bincount(inverse, minlength=groups).tolist()
+    column = table.column(aggregate.field)
+    if aggregate.function == "count":
+        present = _present(column)[rows]
+        return np.bincount(inverse[present], minlength=groups).tolist()
+    if aggregate.function == "count_distinct":
+        values = np.asarray(column.data)[rows] if column.kind == "str" else column.numeric()[rows]
+        present = _present(column)[rows]
+        pairs = np.unique(np.stack([inverse[present], values[present].astype(np.float64)]), axis=1)
+        return np.bincount(pairs[0].astype(np.int64), minlength=groups).tolist()
+
+    values = column.numeric()[rows]
+    present = ~np.isnan(values)
+    group_of, values = inverse[present], values[present]
+    counts = np.bincount(group_of, minlength=groups)
+    empty = counts == 0
+    if aggregate.function in ("sum", "avg"):
+        sums = np.bincount(group_of, weights=values, minlength=groups)
+        result = sums if aggregate.function == "sum" else sums / np.maximum(counts, 1)
+    elif aggregate.function in ("min", "max"):
+        result = np.full(groups, np.inf if aggregate.function == "min" else -np.inf)
+        (np.minimum if aggregate.function == "min" else np.maximum).at(result, group_of, values)
+    else:
+        # Sort by group, then value, and take each group's slice
+        order = np.lexsort((values, group_of))
+        sorted_values = values[order]
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        result = np.array(
+            [
+                np.percentile(sorted_values[bounds[g] : bounds[g + 1]], aggregate.argument) if counts[g] else np.nan
+                for g in range(groups)
+            ]
+        )
+    return [None if e else float(v) for v, e in zip(result, empty)]
+
+
+@dataclass
+class QueryResult:
+    results: List[Dict[str, Any]]
+    matched: int
+    scanned: int
+
+
+def run_query(
+    table: SpanTable,
+    query: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    limit: int = 1000,
+) -> QueryResult:
+    """Run a query over a table; ``start`` and ``end`` bound ``@timestamp`` in Unix seconds."""
+    mask = np.ones(table.rows, dtype=bool)
+    if start is not None or end is not None:
+        timestamps = table.column("@timestamp").numeric()
+        with np.errstate(invalid="ignore"):
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+
+    stats: Optional[Tuple[List[_Aggregate], List[_GroupKey]]] = None
+    fields: Optional[List[str]] = None
+    sort: List[Tuple[str, bool]] = []
+    for command in _split_pipeline(query):
+        keyword, _, rest = command.partition(" ")
+        keyword = keyword.lower()
+        parser = _Parser(_tokenize(rest))
+        if keyword == "filter":
+            if stats is not None:
+                raise QueryError("filter after stats is not supported")
+            condition = _parse_condition(parser)
+            if not parser.done():
+                raise QueryError(f"Unexpected {parser.peek()[1]!r} in filter")
+            mask &= condition(table)
+        elif keyword == "stats":
+            stats = _parse_stats(parser)
+        elif keyword in ("fields", "display"):
+            fields = [parser.field()]
+            while parser.accept(","):
+                fields.append(parser.field())
+        elif keyword == "sort":
+            while True:
+                name = parser.field()
+                descending = parser.accept("desc")
+                if not descending:
+                    parser.accept("asc")
+                sort.append((name, descending))
+                if not parser.accept(","):
+                    break
+        elif keyword == "limit":
+            limit = min(limit, int(parser.literal()))
+        else:
+            raise QueryError(f"Unknown command {keyword!r}")
+
+    rows = np.nonzero(mask)[0]
+    if stats is None:
+        if sort:
+            # Stable sorts applied from the last key to the first
+            for name, descending in reversed(sort):
+                column = table.column(name)
+                keys = column.numeric()[rows] if column.kind == "num" else _string_sort_keys(column)[rows]
+                order = np.argsort(-keys if descending else keys, kind="stable")
+                rows = rows[order]
+        selected = rows[:limit]
+        names = fields or DEFAULT_FIELDS
+        results = [{name: table.column(name).value(row) for name in names} for row in selected]
+        return QueryResult(results, len(rows), table.rows)
+
+    aggregates, groups = stats
+    if groups:
+        keys = []
+        for group in groups:
+            column = table.column(group.field)
+            if group.bin_seconds:
+                keys.append(np.floor(column.numeric()[rows] / group.bin_seconds) * group.bin_seconds)
+            elif column.kind == "str":
+                keys.append(np.asarray(column.data)[rows].astype(np.float64))
+            else:
+                keys.append(column.numeric()[rows])
+        # Combine the per-key codes into one integer per span, so a single
+        # 1-D unique finds the groups (much faster than unique over rows)
+        distinct, codes = zip(*(np.unique(key, return_inverse=True) for key in keys))
+        combined = np.zeros(len(rows), dtype=np.int64)
+        for values, code in zip(distinct, codes):
+            combined = combined * len(values) + code.reshape(-1)
+        group_codes, inverse = np.unique(combined, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        unique = np.empty((len(group_codes), len(keys)))
+        remainder = group_codes
+        for position in range(len(keys) - 1, -1, -1):
+            unique[:, position] = distinct[position][remainder % len(distinct[position])]
+            remainder = remainder // len(distinct[position])
+    else:
+        unique, inverse = np.zeros((1, 0)), np.zeros(len(rows), dtype=np.int64)
+    count = len(unique)
+
+    results: List[Dict[str, Any]] = [{} for _ in range(count)]
+    for position, group in enumerate(groups):
+        column = table.column(group.field)
+        for g in range(count):
+            key = unique[g, position]
+            if group.bin_seconds:
+                value: Any = None if np.isnan(key) else datetime.fromtimestamp(key, timezone.utc).isoformat()
+            elif column.kind == "str":
+                value = None if key == _MISSING else column.dictionary[int(key)]
+            else:
+                value = None if np.isnan(key) else float(key)
+            results[g][group.alias] = value
+    for aggregate in aggregates:
+        for g, value in enumerate(_aggregate(aggregate, table, rows, inverse, count)):
+            results[g][aggregate.alias] = value
+
+    for name, descending in reversed(sort):
+        results.sort(key=lambda r: (r.get(name) is None, r.get(name)), reverse=descending)
+    if fields:
+        results = [{name: r.get(name) for name in fields} for r in results]
+    return QueryResult(results[:limit], len(rows), table.rows)
+
+
+def _string_sort_keys(column: Column) -> np.ndarray:
+    # Dictionaries are sorted, so codes order like the strings; missing sorts last
+    codes = np.asarray(column.data).astype(np.float64)
+    codes[codes == _MISSING] = np.inf
+    return codes
@@ -0,0 +1,183 @@
+"""
+Sampling profiler for slow tool calls.
+
+Each tool call is registered with ``SlowCallProfiler.track``. Once a call has
+been running for longer than the threshold (or from the start, for the
+sampled fraction of calls) a background thread samples the stacks of every
+thread in the process, and the samples taken while the call was running are
+summarized as collapsed stacks (``frame;frame;frame count``, the input format
+of flame graph tools) when it finishes.
+
+While no call is past its threshold the sampler thread sleeps, so tracking a
+call that finishes in time costs a dictionary insert and delete and one
+wake-up of that thread.
+"""
+import logging
+import logging.handlers
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import count
+from time import monotonic
+from typing import Dict, Iterator, List, Optional
+
+from opentelemetry import trace
+
+# Stack depth kept per sample, innermost frames first to go
+MAX_DEPTH = 64
+# Distinct stacks attached to a span; the rest are counted as "other"
+MAX_SPAN_STACKS = 25
+
+# Threads whose innermost frame is one of these are waiting for work, not doing any
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+@dataclass
+class _Call:
+    name: str
+    armed_at: float
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+
+
+def _collapse(frame) -> Optional[str]:
+    """A thread's stack as ``outer;...;inner``, or None if the thread is idle."""
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample(own_id: int) -> List[str]:
+    stacks = []
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == own_id:
+            continue
+        stack = _collapse(frame)
+        if stack is not None:
+            stacks.append(stack)
+    return stacks
+
+
+class SlowCallProfiler:
+    """
+    Profile tool calls that run longer than ``threshold`` seconds, and a
+    random ``sample_rate`` fraction of all calls, by sampling stacks every
+    ``interval`` seconds.
+
+    The result is attached to the call's span as ``profile.collapsed`` and,
+    if ``path`` is given, appended to a size-rotated file there.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+        path: Optional[str] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+    ) -> None:
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._calls: Dict[int, _Call] = {}
+        self._ids = count()
+        self._wake = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._logger: Optional[logging.Logger] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(handler)
+
+    @contextmanager
+    def track(self, name: str, span: trace.Span) -> Iterator[None]:
+        """Profile the block if it turns out slow or is sampled, and attach the result to ``span``."""
+        now = monotonic()
+        if self.sample_rate and random.random() < self.sample_rate:
+            armed_at = now
+        elif self.threshold is not None:
+            armed_at = now + self.threshold
+        else:
+            yield
+            return
+        call_id = next(self._ids)
+        call = _Call(name, armed_at)
+        self._calls[call_id] = call
+        self._ensure_thread()
+        # The sampler may be asleep with no deadline; let it schedule this call
+        with self._wake:
+            self._wake.notify()
+        try:
+            yield
+        finally:
+            del self._calls[call_id]
+            if call.samples:
+                self._report(call, span, monotonic() - now)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._wake:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="slow-call-profiler", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            now = monotonic()
+            calls = list(self._calls.values())
+            armed = [call for call in calls if call.armed_at <= now]
+            if not armed:
+                # Sleep until the earliest call reaches its threshold; a new
+                # call wakes the thread early.
+                next_arm = min((call.armed_at for call in calls), default=None)
+                with self._wake:
+                    self._wake.wait(None if next_arm is None else max(next_arm - now, self.interval))
+                continue
+
+            stacks = _sample(own_id)
+            # Concurrent calls share the process, so each sample counts for every
+            # call past its threshold; the event loop is the same thread for all.
+            for call in armed:
+                call.samples += 1
+                call.stacks.update(stacks)
+            with self._wake:
+                self._wake.wait(self.interval)
+
+    def _report(self, call: _Call, span: trace.Span, duration: float) -> None:
+        top = call.stacks.most_common(MAX_SPAN_STACKS)
+        other = sum(call.stacks.values()) - sum(n for _, n in top)
+        lines = [f"{stack} {n}" for stack, n in top]
+        if other:
+            lines.append(f"other {other}")
+        span.set_attribute("profile.samples", call.samples)
+        span.set_attribute("profile.interval_ms", self.interval * 1000)
+        span.set_attribute("profile.collapsed", "\n".join(lines))
+        if self._logger is not None:
+            context = span.get_span_context()
+            header = (
+                f"# tool={call.name} trace_id={format(context.trace_id, '032x')} "
+                f"duration_ms={duration * 1000:.0f} samples={call.samples}"
+            )
+            body = "\n".join(f"{stack} {n}" for stack, n in call.stacks.most_common())
+            self._logger.info(f"{header}\n{body}\n")
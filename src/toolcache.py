@@ -0,0 +1,186 @@
+import asyncio
+import functools
+import inspect
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from opentelemetry import trace
+
+from . import deadlines
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    created_at: float
+    expires_at: float
+
+
+class ToolCache:
+    """
+    In-memory TTL cache for tool results with single-flight coalescing.
+
+    Concurrent calls with the same key share one in-flight execution; the
+    result is stored once it completes successfully.
+    """
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    async def get_or_call(
+        self,
+        key: Hashable,
+        ttl: float,
+        call: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        span = trace.get_current_span()
+        now = monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                span.set_attribute("tool.cache.hit", True)
+                span.set_attribute("tool.cache.age_s", round(now - entry.created_at, 3))
+                return entry.value
+            del self._entries[key]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            span.set_attribute("tool.cache.hit", True)
+            span.set_attribute("tool.cache.coalesced", True)
+            return await self._wait(key, task)
+
+        span.set_attribute("tool.cache.hit", False)
+        return await self._wait(key, self._start(key, ttl, call, cache_if))
+
+    async def refresh(
+        self,
+        key: Hashable,
+        ttl: float,
+        call: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Run the call even if a fresh result is stored, and store its result in place of that one.
+
+        Calls with the same key arriving meanwhile share the refresh; a call
+        already in flight for the key no longer stores its result.
+        """
+        return await self._wait(key, self._start(key, ttl, call, cache_if))
+
+    def _start(
+        self, key: Hashable, ttl: float, call: Callable[[], Awaitable[Any]], cache_if: Optional[Callable[[Any], bool]]
+    ) -> "asyncio.Future[Any]":
+        task = asyncio.ensure_future(_call_detached(call))
+        self._in_flight[key] = task
+        task.add_done_callback(functools.partial(self._on_done, key, ttl, cache_if))
+        return task
+
+    async def _wait(self, key: Hashable, task: "asyncio.Future[Any]") -> Any:
+        # Shielded so that one caller giving up does not cancel the call for
+        # the others waiting on it; it is cancelled once every caller has.
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    task.cancel()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _on_done(
+        self, key: Hashable, ttl: float, cache_if: Optional[Callable[[Any], bool]], task: "asyncio.Future[Any]"
+    ) -> None:
+        # Only the latest call for the key stores its result; an older one
+        # overtaken by a refresh would otherwise overwrite a newer result.
+        if self._in_flight.get(key) is not task:
+            return
+        del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if cache_if is not None and not cache_if(value):
+            return
+        now = monotonic()
+        self._entries[key] = _Entry(value, now, now + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+async def _call_detached(call: Callable[[], Awaitable[Any]]) -> Any:
+    # The call is shared by every caller waiting on it, so it runs with its own
+    # abort signal rather than the deadline of whichever caller started it.
+    deadlines.detach()
+    with deadlines.abort_scope():
+        return await call()
+
+
+default_cache = ToolCache()
+
+
+def normalize_arguments(signature: inspect.Signature, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Bind a call to its signature and fill in defaults, so equivalent calls compare equal."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def cache_key(name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    return name, json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def cached_tool(
+    ttl: float,
+    bypass: Optional[str] = None,
+    cache_if: Optional[Callable[[Any], bool]] = None,
+    cache: Optional[ToolCache] = None,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Cache an async tool function's results, keyed by tool name and arguments.
+
+    Apply it below ``@mcp.tool()`` so FastMCP still sees the original
+    signature and docstring. Cache hits and coalesced calls are recorded on
+    the current ``server.tool.call`` span.
+
+    Args:
+        ttl: Seconds a result stays fresh
+        bypass: Name of a boolean argument that skips a stored result when true; the new result is stored
+        cache_if: Predicate deciding whether a result may be stored
+        cache: Cache to use (defaults to the module-wide cache)
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            arguments = normalize_arguments(signature, args, kwargs)
+            if bypass and arguments.get(bypass):
+                trace.get_current_span().set_attribute("tool.cache.bypassed", True)
+                # Stored under the key of the same call without the bypass, so that
+                # later calls get the refreshed result.
+                arguments[bypass] = False
+                return await (cache or default_cache).refresh(
+                    cache_key(func.__name__, arguments), ttl, lambda: func(*args, **kwargs), cache_if
+                )
+            return await (cache or default_cache).get_or_call(
+                cache_key(func.__name__, arguments), ttl, lambda: func(*args, **kwargs), cache_if
+            )
+
+        return wrapper
+
+    return decorator
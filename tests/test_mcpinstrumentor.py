@@ -0,0 +1,91 @@
+import time
+
+import anyio
+import pytest
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from src.mcpinstrumentor import MCPInstrumentor, _TransportState
+
+
+@pytest.fixture
+def limited():
+    instrumentor = MCPInstrumentor()
+    instrumentor.instrument(max_concurrent_tool_calls=1, session_queue_size=1)
+    yield
+    instrumentor.uninstrument()
+
+
+def test_tool_calls_past_the_session_queue_are_rejected(limited):
+    app = FastMCP("test")
+    started = []
+
+    @app.tool()
+    async def slow(tag: str) -> str:
+        started.append(tag)
+        await anyio.sleep(0.5)
+        return tag
+
+    async def main():
+        results = {}
+        async with create_connected_server_and_client_session(app._mcp_server) as client:
+
+            async def call(tag):
+                results[tag] = await client.call_tool("slow", {"tag": tag})
+
+            async with anyio.create_task_group() as tg:
+                for tag in "abc":
+                    tg.start_soon(call, tag)
+                    await anyio.sleep(0.05)
+                start = time.perf_counter()
+                await client.send_ping()
+                ping = time.perf_counter() - start
+        return results, ping
+
+    results, ping = anyio.run(main)
+    assert started == ["a", "b"]
+    assert not results["a"].isError and not results["b"].isError
+    assert results["c"].isError
+    assert "already waiting" in results["c"].content[0].text
+    assert ping < 0.2
+
+_SESSION_IN_FLIGHT = "mcp.session.requests.in_flight"
+
+
+def _points(reader, name):
+    data = reader.get_metrics_data()
+    return [
+        point
+        for resource_metrics in data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+        if metric.name == name
+        for point in metric.data.data_points
+    ]
+
+
+def test_only_the_busiest_sessions_are_reported():
+    from mcp import types
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+    reader = InMemoryMetricReader()
+    instrumentor = MCPInstrumentor()
+    instrumentor.instrument(meter_provider=MeterProvider(metric_readers=[reader]), busiest_sessions=2)
+    try:
+        states = [_TransportState(instrumentor, "stdio", instrumentor._metrics, f"s{i}") for i in range(4)]
+        for i, state in enumerate(states):
+            for request_id in range(i):
+                request = types.JSONRPCRequest(jsonrpc="2.0", id=request_id, method="tools/call", params={})
+                state.request_started("in", request)
+                state.record_message(types.JSONRPCMessage(request), sent=False)
+        busiest = {point.attributes["mcp.session.id"]: point.value for point in _points(reader, _SESSION_IN_FLIGHT)}
+        states[3].close()
+        after_close = {point.attributes["mcp.session.id"] for point in _points(reader, _SESSION_IN_FLIGHT)}
+        received = sum(point.value for point in _points(reader, "mcp.transport.bytes_received"))
+    finally:
+        instrumentor.uninstrument()
+
+    assert busiest == {"s3": 3, "s2": 2}
+    assert after_close == {"s2", "s1"}
+    assert received > 0
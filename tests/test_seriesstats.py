@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.seriesstats import baseline_zscores, change_points, lttb, spikes, summarize
+
+
+def test_spike_in_flat_series():
+    values = np.zeros(200)
+    values[100:103] = 50
+    found = spikes(values)
+    assert [(spike.start, spike.end) for spike in found] == [(100, 102)]
+
+
+def test_level_shift_in_flat_series():
+    values = np.concatenate([np.zeros(100), np.full(100, 5.0)])
+    points = change_points(values)
+    assert [(point.index, point.before, point.after) for point in points] == [(100, 0.0, 5.0)]
+    assert spikes(values) == []
+
+
+def test_constant_series_has_no_events():
+    values = np.full(100, 3.0)
+    assert spikes(values) == [] and change_points(values) == []
+
+
+def test_noisy_series():
+    rng = np.random.default_rng(0)
+    values = rng.normal(100, 5, 300)
+    assert change_points(values) == []
+    values[150] += 80
+    assert [spike.peak for spike in spikes(values)] == [150]
+    values[200:] += 40
+    assert [point.index for point in change_points(values)] == [200]
+
+
+def test_summarize_and_lttb():
+    values = np.arange(100, dtype=float)
+    assert summarize(values)["p50"] == 49.5
+    indices = lttb(np.arange(100.0), values, budget=10)
+    assert len(indices) == 10 and indices[0] == 0 and indices[-1] == 99
+
+
+def test_baseline_zscores_floor_spread():
+    series = np.array([[10.0] * 20 + [11.0] * 5, [10.0] * 20 + [np.nan] * 5])
+    z, recent, baseline = baseline_zscores(series, 5)
+    assert z[0] == 2.0 and recent[0] == 11.0 and baseline[0] == 10.0
+    assert np.isnan(z[1])
@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+
+from src.spanstore import QueryError, SpanStore, _split_pipeline, _tokenize, iter_spans, run_query
+
+BASE = 1_700_000_000
+
+
+def span(i, service, name, duration, status="OK", **extra):
+    return {
+        "traceId": f"t{i // 2}",
+        "spanId": f"s{i}",
+        "name": name,
+        "startTimeUnixNano": (BASE + i * 60) * 10**9,
+        "durationNano": duration,
+        "status": {"code": status},
+        "attributes": {"aws.local.service": service, **extra},
+    }
+
+
+SPANS = [
+    span(0, "checkout", "GET /cart", 100),
+    span(1, "checkout", "GET /cart", 300),
+    span(2, "checkout", "POST /pay", 2000, "ERROR"),
+    span(3, "payments", "charge", 900),
+    span(4, "payments", "charge", 1100, "ERROR"),
+    span(5, "inventory", "GET /stock", 50),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SpanStore(str(tmp_path / "spans"))
+    store.ingest(SPANS)
+    return store
+
+
+def query(store, text, **kwargs):
+    return run_query(store.table(), text, **kwargs)
+
+
+def test_tokenize():
+    assert _tokenize('attributes.aws.local.service = "a \\"b\\"" and durationNano >= 1e9') == [
+        ("word", "attributes.aws.local.service"),
+        ("op", "="),
+        ("string", 'a "b"'),
+        ("word", "and"),
+        ("word", "durationNano"),
+        ("op", ">="),
+        ("number", "1e9"),
+    ]
+    assert _tokenize("`odd field` like /^GET/i") == [("word", "odd field"), ("word", "like"), ("regex", "/^GET/i")]
+    assert _tokenize("@timestamp, status.code in [1, -2]")[0] == ("word", "@timestamp")
+    with pytest.raises(QueryError):
+        _tokenize("name = $x")
+
+
+def test_split_pipeline_ignores_quoted_bars():
+    assert _split_pipeline('filter name = "a|b" | filter name like /x|y/ | limit 1') == [
+        'filter name = "a|b"',
+        "filter name like /x|y/",
+        "limit 1",
+    ]
+
+
+def test_filter(store):
+    assert query(store, 'filter attributes.aws.local.service = "payments"').matched == 2
+    assert query(store, 'filter status.code != "OK" and durationNano > 1000').matched == 2
+    assert query(store, 'filter name like /^get/i or durationNano < 60').matched == 3
+    assert query(store, 'filter not (name in ["charge", "GET /cart"])').matched == 2
+    assert query(store, 'filter name not like "GET"').matched == 3
+    assert query(store, "filter ispresent(attributes.missing)").matched == 0
+
+
+def test_filter_by_time(store):
+    assert query(store, "fields spanId", start=BASE + 60, end=BASE + 180).matched == 3
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "frobnicate x",
+        "filter name",
+        "filter name = 'a' extra",
+        "filter durationNano > 'slow'",
+        "stats median(durationNano)",
+        "stats pct(durationNano)",
+        "stats sum(*)",
+        "stats count(*) by bin(5 minutes)",
+    ],
+)
+def test_invalid_queries(store, text):
+    with pytest.raises(QueryError):
+        query(store, text)
+
+
+def test_stats_by_group(store):
+    result = query(
+        store,
+        "stats count(*) as calls, avg(durationNano) as mean, max(durationNano), pct(durationNano, 50), "
+        "count_distinct(traceId) by attributes.aws.local.service as service | sort calls desc, service",
+    )
+    assert result.results == [
+        {"service": "checkout", "calls": 3, "mean": 800.0, "max(durationNano)": 2000.0,
+         "pct(durationNano, 50)": 300.0, "count_distinct(traceId)": 2},
+        {"service": "payments", "calls": 2, "mean": 1000.0, "max(durationNano)": 1100.0,
+         "pct(durationNano, 50)": 1000.0, "count_distinct(traceId)": 2},
+        {"service": "inventory", "calls": 1, "mean": 50.0, "max(durationNano)": 50.0,
+         "pct(durationNano, 50)": 50.0, "count_distinct(traceId)": 1},
+    ]
+    assert result.matched == result.scanned == 6
+
+
+def test_stats_without_groups_and_bins(store):
+    assert query(store, "stats sum(durationNano) as total, min(durationNano)").results == [
+        {"total": 4450.0, "min(durationNano)": 50.0}
+    ]
+    binned = query(store, "stats count(*) as n by bin(2m)").results
+    assert sum(row["n"] for row in binned) == 6
+    assert all(row["bin(2m)"].endswith("+00:00") for row in binned)
+
+
+def test_sort_and_limit(store):
+    rows = query(store, "sort durationNano desc | fields spanId | limit 3").results
+    assert [row["spanId"] for row in rows] == ["s2", "s4", "s3"]
+    rows = query(store, "sort name, durationNano desc | fields name, durationNano").results
+    assert [(row["name"], row["durationNano"]) for row in rows] == [
+        ("GET /cart", 300.0), ("GET /cart", 100.0), ("GET /stock", 50.0),
+        ("POST /pay", 2000.0), ("charge", 1100.0), ("charge", 900.0),
+    ]
+
+
+def test_ingest_skips_known_spans_and_merges_dictionaries(store):
+    assert store.ingest(SPANS[:2] + [span(6, "audit", "AUDIT", 10), span(7, "audit", "batch", 20)]) == (2, 2)
+    rows = query(store, "sort name | fields name | limit 100").results
+    assert [row["name"] for row in rows] == [
+        "AUDIT", "GET /cart", "GET /cart", "GET /stock", "POST /pay", "batch", "charge", "charge"
+    ]
+    assert query(store, 'filter attributes.aws.local.service = "checkout"').matched == 3
+
+
+def test_ingest_converts_column_kinds(store):
+    store.ingest([span(6, "audit", "x", 1, attempt="first"), span(7, "audit", "y", 2)])
+    store.ingest([span(8, "audit", "z", 3, attempt=2)])
+    rows = query(store, "filter ispresent(attributes.attempt) | sort spanId | fields attributes.attempt").results
+    assert [row["attributes.attempt"] for row in rows] == ["first", "2.0"]
+
+
+def test_concurrent_ingests(tmp_path):
+    path = str(tmp_path / "spans")
+
+    def ingest(prefix):
+        SpanStore(path).ingest({"traceId": prefix, "spanId": f"{prefix}{i}", "name": "n"} for i in range(2000))
+
+    threads = [threading.Thread(target=ingest, args=(prefix,)) for prefix in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SpanStore(path).table().rows == 8000
+
+
+def test_iter_spans_keeps_console_span_events():
+    console = {"name": "a", "context": {"trace_id": "0x1", "span_id": "0x2"}, "events": [{"name": "retry"}]}
+    assert list(iter_spans(console)) == [console]
+    logs = {"events": [{"message": '{"traceId": "t", "spanId": "s"}'}]}
+    assert list(iter_spans(logs)) == [{"traceId": "t", "spanId": "s"}]
@@ -0,0 +1,47 @@
+import asyncio
+
+from src.toolcache import ToolCache, cached_tool
+
+
+def test_forced_refresh_replaces_the_stored_result():
+    cache = ToolCache()
+    calls = []
+
+    @cached_tool(ttl=60, bypass="force_refresh", cache=cache)
+    async def tool(name: str, force_refresh: bool = False) -> str:
+        calls.append(name)
+        return f"{name} #{len(calls)}"
+
+    async def main():
+        return [
+            await tool("a"),
+            await tool("a"),
+            await tool("a", force_refresh=True),
+            await tool("a"),
+            await tool("b"),
+        ]
+
+    assert asyncio.run(main()) == ["a #1", "a #1", "a #2", "a #2", "b #3"]
+
+
+def test_refresh_overtakes_a_call_in_flight():
+    cache = ToolCache()
+
+    async def main():
+        slow_release = asyncio.Event()
+
+        async def slow():
+            await slow_release.wait()
+            return "old"
+
+        async def fast():
+            return "new"
+
+        stale = asyncio.ensure_future(cache.get_or_call("key", 60, slow))
+        await asyncio.sleep(0)
+        assert await cache.refresh("key", 60, fast) == "new"
+        slow_release.set()
+        assert await stale == "old"
+        return await cache.get_or_call("key", 60, slow)
+
+    assert asyncio.run(main()) == "new"